@@ -0,0 +1,139 @@
+"""session messages table
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 回填时每批处理的会话数
+BACKFILL_BATCH_SIZE = 500
+
+
+def _load_messages(value):
+    """兼容驱动返回字符串或已解析的JSON"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return json.loads(value) or []
+    return value
+
+
+def upgrade() -> None:
+    # Create session_messages table
+    op.create_table(
+        'session_messages',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('session_id', 'seq', name='uq_session_messages_session_id')
+    )
+    
+    # Backfill from sessions.messages JSON column (if present)
+    bind = op.get_bind()
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('sessions')}
+    if 'messages' not in columns:
+        return
+    
+    sessions = sa.table(
+        'sessions',
+        sa.column('id', sa.Integer()),
+        sa.column('messages', sa.JSON()),
+        sa.column('total_messages', sa.Integer()),
+    )
+    session_messages = sa.table(
+        'session_messages',
+        sa.column('session_id', sa.Integer()),
+        sa.column('seq', sa.Integer()),
+        sa.column('role', sa.String()),
+        sa.column('content', sa.Text()),
+    )
+    
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(sessions.c.id, sessions.c.messages)
+            .where(sessions.c.id > last_id)
+            .order_by(sessions.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        
+        for session_id, messages in rows:
+            values = [
+                {
+                    'session_id': session_id,
+                    'seq': seq,
+                    'role': message.get('role', 'user'),
+                    'content': message.get('content', ''),
+                }
+                for seq, message in enumerate(_load_messages(messages), start=1)
+            ]
+            if values:
+                bind.execute(session_messages.insert(), values)
+            bind.execute(
+                sessions.update()
+                .where(sessions.c.id == session_id)
+                .values(total_messages=len(values))
+            )
+        last_id = rows[-1][0]
+    
+    op.drop_column('sessions', 'messages')
+
+
+def downgrade() -> None:
+    op.add_column('sessions', sa.Column('messages', sa.JSON(), nullable=True))
+    
+    # Fold session_messages back into the JSON column
+    bind = op.get_bind()
+    sessions = sa.table(
+        'sessions',
+        sa.column('id', sa.Integer()),
+        sa.column('messages', sa.JSON()),
+    )
+    session_messages = sa.table(
+        'session_messages',
+        sa.column('session_id', sa.Integer()),
+        sa.column('seq', sa.Integer()),
+        sa.column('role', sa.String()),
+        sa.column('content', sa.Text()),
+    )
+    
+    history = {}
+    rows = bind.execute(
+        sa.select(
+            session_messages.c.session_id,
+            session_messages.c.role,
+            session_messages.c.content
+        ).order_by(session_messages.c.session_id, session_messages.c.seq)
+    )
+    for session_id, role, content in rows:
+        history.setdefault(session_id, []).append({'role': role, 'content': content})
+    
+    for session_id, messages in history.items():
+        bind.execute(
+            sessions.update()
+            .where(sessions.c.id == session_id)
+            .values(messages=messages)
+        )
+    
+    op.drop_table('session_messages')
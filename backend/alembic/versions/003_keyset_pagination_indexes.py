@@ -0,0 +1,39 @@
+"""keyset pagination indexes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_sessions_user_id_updated_at_id', 'sessions',
+        ['user_id', 'updated_at', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_files_user_id_created_at_id', 'files',
+        ['user_id', 'created_at', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_skills_created_at_id', 'skills',
+        ['created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_skills_created_at_id', table_name='skills')
+    op.drop_index('ix_files_user_id_created_at_id', table_name='files')
+    op.drop_index('ix_sessions_user_id_updated_at_id', table_name='sessions')
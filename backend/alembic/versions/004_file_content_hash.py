@@ -0,0 +1,28 @@
+"""file content hash
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_files_content_hash'), 'files', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_files_content_hash'), table_name='files')
+    op.drop_column('files', 'content_hash')
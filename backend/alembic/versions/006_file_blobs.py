@@ -0,0 +1,68 @@
+"""content-addressed file blobs
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 14:00:00.000000
+
+已有带 content_hash 的文件按哈希合并为内容块：每个哈希取一个已有文件作为存储位置，
+引用数为相同哈希的文件数，相同内容的文件记录统一指向该位置。
+迁移不移动或删除磁盘文件（迁移事务回滚时文件必须保持原样）：
+- 选中的副本（可能位于其他用户目录）由 relocate_legacy_blobs 任务移动到 blobs/ 下
+- 其余重复副本不再被任何记录引用，由对账任务（reconcile_storage）作为孤儿回收
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'file_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('storage_path', sa.String(length=500), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index(op.f('ix_file_blobs_ref_count'), 'file_blobs', ['ref_count'], unique=False)
+
+    # 回填：每个哈希一个内容块
+    op.execute(
+        """
+        INSERT INTO file_blobs (sha256, size, storage_path, ref_count)
+        SELECT content_hash, MAX(file_size), MIN(file_path), COUNT(*)
+        FROM files
+        WHERE content_hash IS NOT NULL
+        GROUP BY content_hash
+        """
+    )
+    op.execute(
+        """
+        UPDATE files SET file_path = (
+            SELECT file_blobs.storage_path FROM file_blobs
+            WHERE file_blobs.sha256 = files.content_hash
+        )
+        WHERE content_hash IS NOT NULL
+        """
+    )
+
+    op.create_foreign_key(
+        'fk_files_content_hash_file_blobs', 'files', 'file_blobs',
+        ['content_hash'], ['sha256']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('fk_files_content_hash_file_blobs', 'files', type_='foreignkey')
+    op.drop_index(op.f('ix_file_blobs_ref_count'), table_name='file_blobs')
+    op.drop_table('file_blobs')
@@ -0,0 +1,39 @@
+"""pg_trgm index for filename search
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 15:00:00.000000
+
+仅PostgreSQL：启用 pg_trgm 扩展并并发创建文件名三元组 GIN 索引（不锁表写入）
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_files_filename_trgm '
+            'ON files USING gin (filename gin_trgm_ops)'
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_files_filename_trgm')
@@ -0,0 +1,38 @@
+"""per-user storage usage and quota
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 16:00:00.000000
+
+storage_used 按已有文件记录回填
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('storage_used', sa.BigInteger(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('storage_quota', sa.BigInteger(), nullable=True))
+
+    op.execute(
+        """
+        UPDATE users SET storage_used = (
+            SELECT COALESCE(SUM(files.file_size), 0) FROM files
+            WHERE files.user_id = users.id
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'storage_quota')
+    op.drop_column('users', 'storage_used')
@@ -0,0 +1,36 @@
+"""derived metadata on file blobs
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 17:00:00.000000
+
+已有内容块标记为 pending，由 retry_file_metadata 分批计算
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('file_blobs', sa.Column('derived_metadata', sa.JSON(), nullable=True))
+    op.add_column(
+        'file_blobs',
+        sa.Column('metadata_status', sa.String(length=20), nullable=False, server_default='pending')
+    )
+    op.add_column('file_blobs', sa.Column('metadata_error', sa.Text(), nullable=True))
+    op.add_column('file_blobs', sa.Column('metadata_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('file_blobs', 'metadata_updated_at')
+    op.drop_column('file_blobs', 'metadata_error')
+    op.drop_column('file_blobs', 'metadata_status')
+    op.drop_column('file_blobs', 'derived_metadata')
@@ -0,0 +1,50 @@
+"""full-text search vector for skills
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 18:00:00.000000
+
+仅PostgreSQL：添加加权 tsvector 生成列（名称A、描述B、提示词模板C）并并发创建 GIN 索引。
+添加存储型生成列会重写 skills 表，需在维护窗口执行
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(
+        """
+        ALTER TABLE skills ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(prompt_template, '')), 'C')
+        ) STORED
+        """
+    )
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_skills_search_vector '
+            'ON skills USING gin (search_vector)'
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_skills_search_vector')
+    op.execute('ALTER TABLE skills DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,44 @@
+"""pattern_ops indexes for slug prefix lookups
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17 19:00:00.000000
+
+仅PostgreSQL：slug 的唯一索引使用数据库排序规则，不能用于 LIKE 'base-%' 前缀查询，
+为 skills 和 apps 并发创建 varchar_pattern_ops 索引
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_skills_slug_pattern '
+            'ON skills (slug varchar_pattern_ops)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_apps_slug_pattern '
+            'ON apps (slug varchar_pattern_ops)'
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_apps_slug_pattern')
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_skills_slug_pattern')
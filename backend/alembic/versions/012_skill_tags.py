@@ -0,0 +1,59 @@
+"""normalized skill tags
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17 20:00:00.000000
+
+skills.tags（JSON）中的标签写入 skill_tags，去除首尾空白和重复，空标签忽略
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'skill_tags',
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.Column('tag', sa.String(length=100), nullable=False),
+        sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('skill_id', 'tag')
+    )
+    op.create_index('ix_skill_tags_tag_skill_id', 'skill_tags', ['tag', 'skill_id'], unique=False)
+
+    # 回填
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            """
+            INSERT INTO skill_tags (skill_id, tag)
+            SELECT DISTINCT skills.id, left(btrim(t.tag), 100)
+            FROM skills
+            CROSS JOIN LATERAL json_array_elements_text(
+                CASE WHEN json_typeof(skills.tags) = 'array' THEN skills.tags ELSE '[]'::json END
+            ) AS t(tag)
+            WHERE btrim(t.tag) <> ''
+            """
+        )
+    else:
+        op.execute(
+            """
+            INSERT INTO skill_tags (skill_id, tag)
+            SELECT DISTINCT skills.id, substr(trim(json_each.value), 1, 100)
+            FROM skills, json_each(skills.tags)
+            WHERE json_valid(skills.tags) AND json_type(skills.tags) = 'array'
+              AND trim(json_each.value) <> ''
+            """
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_skill_tags_tag_skill_id', table_name='skill_tags')
+    op.drop_table('skill_tags')
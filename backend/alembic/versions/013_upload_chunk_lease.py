@@ -0,0 +1,29 @@
+"""upload chunk writer lease
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18 10:00:00.000000
+
+分块写入期间不再持有行锁，改为在上传会话上登记写入租约
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_sessions', sa.Column('writer_token', sa.String(length=36), nullable=True))
+    op.add_column('upload_sessions', sa.Column('writer_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_sessions', 'writer_expires_at')
+    op.drop_column('upload_sessions', 'writer_token')
@@ -0,0 +1,32 @@
+"""file blob metadata retry
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18 11:00:00.000000
+
+记录元数据计算的尝试次数，并为 retry_file_metadata 按状态筛选内容块建立索引
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '014'
+down_revision: Union[str, None] = '013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'file_blobs',
+        sa.Column('metadata_attempts', sa.Integer(), nullable=False, server_default='0')
+    )
+    op.create_index(op.f('ix_file_blobs_metadata_status'), 'file_blobs', ['metadata_status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_file_blobs_metadata_status'), table_name='file_blobs')
+    op.drop_column('file_blobs', 'metadata_attempts')
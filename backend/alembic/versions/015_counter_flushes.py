@@ -0,0 +1,35 @@
+"""counter flush records
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-18 12:00:00.000000
+
+记录已写回的计数增量批次，使计数写回可以安全重试
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '015'
+down_revision: Union[str, None] = '014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'counter_flushes',
+        sa.Column('flush_id', sa.String(length=36), nullable=False),
+        sa.Column('table_name', sa.String(length=50), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('flush_id')
+    )
+    op.create_index(op.f('ix_counter_flushes_applied_at'), 'counter_flushes', ['applied_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_counter_flushes_applied_at'), table_name='counter_flushes')
+    op.drop_table('counter_flushes')
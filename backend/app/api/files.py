@@ -3,27 +3,55 @@
 """
 import os
 import uuid
+import logging
 import mimetypes
-from typing import Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
-from fastapi.responses import FileResponse
+from typing import Any, AsyncIterator, Callable, Coroutine, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timezone
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from fastapi.responses import (
+    FileResponse as FileDownloadResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.database import get_db
+from sqlalchemy import select, func, Select
+from sqlalchemy.orm import selectinload
+from app.database import get_db, dialect_name
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.file import File as FileModel
 from app.schemas.file import (
-    FileUpdate, FileResponse, FileListResponse, FileUploadResponse
+    FileUpdate, FileResponse, FileDetailResponse, FileListResponse, FileUploadResponse, FileDedupeRequest,
+    SignedDownloadURLResponse, FilePreviewResponse
 )
 from app.config import settings
+from app.core.storage import UPLOAD_DIR, get_storage
+from app.utils.pagination import encode_cursor, keyset_before
+from app.utils.file_storage import FileTooLargeError, save_upload_to_temp, remove_file
+from app.utils.http_range import (
+    RangeNotSatisfiable,
+    make_etag,
+    http_date,
+    is_not_modified,
+    if_range_allows,
+    parse_range_header,
+    content_range,
+    multipart_part_header,
+    multipart_end
+)
+from app.utils.line_index import read_lines, read_tail
+from app.utils.blob_store import commit_blob, discard_blob, acquire_blob, release_blob
+from app.utils.text_search import trigram_match
+from app.utils.zip_stream import ZipEntry, stream_zip, unique_names
+from app.utils.storage_quota import ensure_quota, charge_usage, cache_usage, quota_exceeded
+from app.utils.signed_urls import InvalidSignedURL, create_download_token, verify_download_token
+from tasks.file_tasks import extract_file_metadata
 
-router = APIRouter()
-
-# 文件存储目录
-UPLOAD_DIR = os.path.join(getattr(settings, 'BASE_DIR', '/tmp'), 'uploads')
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
 
 # 允许的文件类型
 ALLOWED_EXTENSIONS = {
@@ -35,6 +63,46 @@ ALLOWED_EXTENSIONS = {
 
 # 最大文件大小（50MB）
 MAX_FILE_SIZE = 50 * 1024 * 1024
+# multipart 请求体中边界和分段头的额外开销上限
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def file_too_large() -> HTTPException:
+    """单文件大小超限的错误响应"""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB, "
+               f"use the resumable upload API for larger files"
+    )
+
+
+class _UploadSizeLimitRoute(APIRoute):
+    """
+    解析请求体之前按 Content-Length 拒绝超限的 multipart 请求
+
+    FastAPI 在调用路由函数（及其依赖）之前就会把整个 multipart 请求体读入临时文件，
+    在路由函数中检查大小已经无法节省带宽和磁盘；没有 Content-Length 的请求
+    （分块传输）仍由写盘时的大小限制兜底
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type", "")
+            content_length = request.headers.get("content-length", "")
+            if (
+                content_type.startswith("multipart/form-data")
+                and content_length.isdigit()
+                and int(content_length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD
+            ):
+                raise file_too_large()
+            return await handler(request)
+
+        return route_handler
+
+
+router = APIRouter(route_class=_UploadSizeLimitRoute)
 
 
 def get_file_extension(filename: str) -> str:
@@ -48,6 +116,40 @@ def is_allowed_file(filename: str) -> bool:
     return ext in ALLOWED_EXTENSIONS
 
 
+def build_file_record(
+    user_id: int,
+    filename: str,
+    description: Optional[str],
+    content_hash: str,
+    file_size: int,
+    storage_path: str
+) -> FileModel:
+    """创建引用内容块的文件记录（自动检测MIME类型）"""
+    mime_type, _ = mimetypes.guess_type(filename)
+    if not mime_type:
+        mime_type = "application/octet-stream"
+
+    return FileModel(
+        user_id=user_id,
+        filename=filename,
+        stored_filename=f"{uuid.uuid4()}{get_file_extension(filename)}",
+        file_path=storage_path,
+        file_size=file_size,
+        mime_type=mime_type,
+        content_hash=content_hash,
+        description=description
+    )
+
+
+def enqueue_metadata_extraction(db_file: FileModel) -> None:
+    """提交派生元数据计算任务（已计算过的内容块由任务直接跳过）"""
+    try:
+        extract_file_metadata.delay(db_file.content_hash)
+    except Exception as e:
+        # 任务队列不可用不影响上传，元数据保持 pending，由 retry_file_metadata 定期重新提交
+        logger.warning(f"Failed to enqueue metadata extraction for {db_file.content_hash}: {e}")
+
+
 @router.post("/upload", response_model=FileUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_file(
     file: UploadFile = File(...),
@@ -58,9 +160,12 @@ async def upload_file(
     """
     上传文件
     
-    - 支持50MB以内的文件
+    - 支持50MB以内的文件，更大的文件使用断点续传接口（/api/files/uploads）
+    - Content-Length 超限时在读取请求体之前返回413
+    - 分块流式写盘，不把整个文件读入内存
     - 自动检测MIME类型
-    - 存储到用户专属目录
+    - 按内容SHA-256去重存储
+    - 超出存储配额时返回413
     """
     # 检查文件名
     if not file.filename:
@@ -76,130 +181,525 @@ async def upload_file(
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # 读取文件内容
-    content = await file.read()
+    # 请求体已由框架缓存，这里的检查只避免把临时文件复制进存储
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise file_too_large()
     
-    # 检查文件大小
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
-        )
-    
-    # 生成唯一文件名
-    file_ext = get_file_extension(file.filename)
-    stored_filename = f"{uuid.uuid4()}{file_ext}"
+    # 配额检查（读缓存），剩余空间不足单文件上限时按剩余空间截断复制
+    usage = await ensure_quota(db, current_user.id, file.size or 0)
+    max_size = MAX_FILE_SIZE
+    if usage.available is not None and usage.available < max_size:
+        max_size = usage.available
     
-    # 创建用户目录
+    # 本地临时目录
     user_dir = os.path.join(UPLOAD_DIR, str(current_user.id))
-    os.makedirs(user_dir, exist_ok=True)
-    
-    # 保存文件
-    file_path = os.path.join(user_dir, stored_filename)
-    with open(file_path, "wb") as f:
-        f.write(content)
     
-    # 检测MIME类型
-    mime_type, _ = mimetypes.guess_type(file.filename)
-    if not mime_type:
-        mime_type = "application/octet-stream"
+    # 分块写入临时文件，边写边校验大小并计算哈希
+    try:
+        saved = await save_upload_to_temp(file, user_dir, max_size)
+    except FileTooLargeError:
+        if max_size < MAX_FILE_SIZE:
+            raise quota_exceeded()
+        raise file_too_large()
+    
+    # 计入用量（原子校验配额），再登记为内容块：相同内容只保存一份，否则存入存储后端
+    blob = None
+    try:
+        usage = await charge_usage(db, current_user.id, saved.size)
+        blob = await commit_blob(db, saved.path, saved.sha256, saved.size)
+        db_file = build_file_record(
+            current_user.id,
+            file.filename,
+            description,
+            saved.sha256,
+            saved.size,
+            blob.storage_path
+        )
+        db.add(db_file)
+        await db.flush()
+    except Exception:
+        # 回滚前删除本次新存入的对象
+        await discard_blob(blob)
+        await db.rollback()
+        await remove_file(saved.path)
+        raise
+    await db.commit()
+    await cache_usage(current_user.id, usage)
+    await db.refresh(db_file)
+    enqueue_metadata_extraction(db_file)
     
-    # 创建数据库记录
-    db_file = FileModel(
-        user_id=current_user.id,
-        filename=file.filename,
-        stored_filename=stored_filename,
-        file_path=file_path,
-        file_size=len(content),
-        mime_type=mime_type,
-        description=description
+    return FileUploadResponse(
+        id=db_file.id,
+        filename=db_file.filename,
+        file_size=db_file.file_size,
+        mime_type=db_file.mime_type,
+        content_hash=db_file.content_hash,
+        message="File uploaded successfully"
+    )
+
+
+@router.post("/dedupe", response_model=FileUploadResponse, status_code=status.HTTP_201_CREATED)
+async def dedupe_file(
+    dedupe_request: FileDedupeRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    秒传：按内容哈希直接创建文件，无需再次上传
+
+    - 仅当当前用户已拥有相同内容的文件时可用（避免通过哈希获取他人文件）
+    - 内容不存在时返回404，客户端改为正常上传
+    """
+    if not is_allowed_file(dedupe_request.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+    owned = await db.execute(
+        select(FileModel.id).where(
+            FileModel.user_id == current_user.id,
+            FileModel.content_hash == dedupe_request.sha256
+        ).limit(1)
+    )
+    blob = None
+    if owned.scalar_one_or_none() is not None:
+        blob = await acquire_blob(db, dedupe_request.sha256)
+    if blob is None or blob.size != dedupe_request.file_size:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Content not found, upload required"
+        )
+    usage = await charge_usage(db, current_user.id, blob.size)
+
+    db_file = build_file_record(
+        current_user.id,
+        dedupe_request.filename,
+        dedupe_request.description,
+        blob.sha256,
+        blob.size,
+        blob.storage_path
     )
-    
     db.add(db_file)
     await db.commit()
+    await cache_usage(current_user.id, usage)
     await db.refresh(db_file)
-    
+
     return FileUploadResponse(
         id=db_file.id,
         filename=db_file.filename,
         file_size=db_file.file_size,
         mime_type=db_file.mime_type,
-        message="File uploaded successfully"
+        content_hash=db_file.content_hash,
+        message="File created from existing content"
     )
 
 
+def _filter_files(
+    query: Select,
+    search: Optional[str],
+    mime_type: Optional[str],
+    dialect: str
+) -> Select:
+    """按文件名子串和MIME类型过滤（list_files 与批量导出共用）"""
+    if search:
+        condition, _ = trigram_match(FileModel.filename, search, dialect)
+        query = query.where(condition)
+    if mime_type:
+        query = query.where(FileModel.mime_type.like(f"{mime_type}%"))
+    return query
+
+
 @router.get("", response_model=FileListResponse)
 async def list_files(
     search: Optional[str] = Query(None, description="搜索文件名"),
+    search_mode: str = Query(
+        "substring",
+        pattern="^(substring|fuzzy)$",
+        description="substring：子串匹配；fuzzy：模糊匹配并按相似度排序（仅支持页码分页）"
+    ),
     mime_type: Optional[str] = Query(None, description="MIME类型过滤"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="游标（传入时忽略page）"),
+    include_total: Optional[bool] = Query(None, description="是否统计总数，默认仅页码分页时统计"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     列出文件
     
-    - 支持搜索文件名
+    - 支持搜索文件名（PostgreSQL 下使用 pg_trgm 索引）
     - 支持按MIME类型过滤
-    - 支持分页
+    - 支持页码分页和游标分页（按 created_at, id 倒序）
+    - 模糊搜索按相似度排序
     """
-    # 基础查询
-    query = select(FileModel).where(FileModel.user_id == current_user.id)
-    
-    # 搜索过滤
-    if search:
-        search_term = f"%{search}%"
-        query = query.where(FileModel.filename.ilike(search_term))
-    
-    # MIME类型过滤
-    if mime_type:
-        query = query.where(FileModel.mime_type.like(f"{mime_type}%"))
-    
-    # 计算总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size).order_by(FileModel.created_at.desc())
+    dialect = dialect_name(db)
+    rank = None
+    if search and search_mode == "fuzzy":
+        if cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor pagination is not supported with fuzzy search"
+            )
+        condition, rank = trigram_match(FileModel.filename, search, dialect, fuzzy=True)
+        query = _filter_files(
+            select(FileModel).where(FileModel.user_id == current_user.id, condition),
+            None,
+            mime_type,
+            dialect
+        )
+    else:
+        # 基础查询（搜索和MIME类型过滤）
+        query = _filter_files(
+            select(FileModel).where(FileModel.user_id == current_user.id),
+            search,
+            mime_type,
+            dialect
+        )
     
-    # 执行查询
-    result = await db.execute(query)
+    # 计算总数（可选）
+    total = None
+    count_total = include_total if include_total is not None else cursor is None
+    if count_total:
+        count_query = select(func.count()).select_from(query.subquery())
+        total_result = await db.execute(count_query)
+        total = total_result.scalar()
+    
+    # 分页：游标优先，否则按页码偏移
+    if rank is not None:
+        query = query.order_by(rank.desc())
+    query = query.order_by(FileModel.created_at.desc(), FileModel.id.desc())
+    if cursor:
+        query = query.where(keyset_before(FileModel.created_at, FileModel.id, cursor))
+    else:
+        query = query.offset((page - 1) * page_size)
+    
+    # 多取一条判断是否有更多
+    result = await db.execute(query.limit(page_size + 1))
     files = result.scalars().all()
+    has_more = len(files) > page_size
+    files = files[:page_size]
     
-    # 计算是否有更多
-    has_more = (offset + len(files)) < total
+    next_cursor = None
+    if has_more and rank is None:
+        next_cursor = encode_cursor(files[-1].created_at, files[-1].id)
     
     return FileListResponse(
         items=files,
         total=total,
-        page=page,
+        page=None if cursor else page,
         page_size=page_size,
-        has_more=has_more
+        has_more=has_more,
+        next_cursor=next_cursor
     )
 
 
-@router.get("/{file_id}")
-async def download_file(
-    file_id: int,
+class _DownloadTarget(NamedTuple):
+    """下载所需的文件信息（可来自数据库记录或签名令牌）"""
+    key: str
+    filename: str
+    media_type: str
+    content_hash: Optional[str]
+    last_modified: datetime
+
+
+def _target_from_record(db_file: FileModel) -> _DownloadTarget:
+    """从文件记录构造下载信息"""
+    return _DownloadTarget(
+        key=db_file.file_path,
+        filename=db_file.filename,
+        media_type=db_file.mime_type or "application/octet-stream",
+        content_hash=db_file.content_hash,
+        last_modified=db_file.created_at
+    )
+
+
+def _content_disposition(filename: str) -> str:
+    """生成下载用的Content-Disposition（非ASCII文件名使用RFC 5987编码）"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+async def _iter_byteranges(
+    key: str,
+    ranges: List[Tuple[int, int]],
+    size: int,
+    media_type: str,
+    boundary: str
+) -> AsyncIterator[bytes]:
+    """按 multipart/byteranges 格式输出多个区间"""
+    for start, end in ranges:
+        yield multipart_part_header(boundary, media_type, start, end, size)
+        async for block in get_storage().open_range(key, start, end):
+            yield block
+        yield b"\r\n"
+    yield multipart_end(boundary)
+
+
+def _offload_response(target: _DownloadTarget, headers: dict) -> Optional[Response]:
+    """
+    把文件内容交给前置代理或对象存储发送（DOWNLOAD_OFFLOAD 未开启或不适用时返回None）
+
+    - 对象存储：302 跳转到存储的临时URL
+    - x-accel：返回 X-Accel-Redirect，由 nginx 从内部 location 发送
+    - x-sendfile：返回 X-Sendfile，由 Apache / lighttpd 等发送
+
+    Range 和条件请求由代理处理
+    """
+    if not settings.DOWNLOAD_OFFLOAD:
+        return None
+
+    storage = get_storage()
+    presigned = storage.presigned_url(
+        target.key,
+        settings.DOWNLOAD_URL_EXPIRE_SECONDS,
+        target.filename,
+        target.media_type
+    )
+    if presigned is not None:
+        return RedirectResponse(presigned, status_code=status.HTTP_302_FOUND)
+
+    local_path = storage.local_path(target.key)
+    if local_path is None:
+        return None
+
+    if settings.DOWNLOAD_OFFLOAD == "x-accel":
+        relative = os.path.relpath(local_path, UPLOAD_DIR)
+        if relative.startswith(".."):
+            # 不在代理映射的目录下，由应用自己发送
+            return None
+        prefix = settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/")
+        headers["X-Accel-Redirect"] = f"{prefix}/{quote(relative.replace(os.sep, '/'))}"
+    elif settings.DOWNLOAD_OFFLOAD == "x-sendfile":
+        headers["X-Sendfile"] = local_path
+    else:
+        return None
+
+    return Response(media_type=target.media_type, headers=headers)
+
+
+async def _file_download_response(request: Request, target: _DownloadTarget) -> Response:
+    """
+    根据条件请求头和Range请求头生成下载响应
+
+    Args:
+        request: 请求
+        target: 下载信息
+
+    Returns:
+        Response: 200 / 206 / 302 / 304 响应
+    """
+    last_modified = target.last_modified
+    headers = {
+        "Last-Modified": http_date(last_modified),
+        "Accept-Ranges": "bytes",
+        # 私有内容，客户端每次使用前用ETag重新验证
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": _content_disposition(target.filename),
+    }
+
+    # 有内容哈希时ETag不依赖存储状态，可以在访问存储前返回304
+    if target.content_hash:
+        etag = make_etag(target.content_hash, 0, 0)
+        headers["ETag"] = etag
+        if is_not_modified(
+            request.headers.get("if-none-match"),
+            request.headers.get("if-modified-since"),
+            etag,
+            last_modified
+        ):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        offloaded = _offload_response(target, headers)
+        if offloaded is not None:
+            return offloaded
+
+    storage = get_storage()
+    stored = await storage.stat(target.key)
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found in storage"
+        )
+
+    size = stored.size
+    media_type = target.media_type
+    if not target.content_hash:
+        etag = make_etag(None, size, stored.modified.timestamp())
+        headers["ETag"] = etag
+        if is_not_modified(
+            request.headers.get("if-none-match"),
+            request.headers.get("if-modified-since"),
+            etag,
+            last_modified
+        ):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        offloaded = _offload_response(target, headers)
+        if offloaded is not None:
+            return offloaded
+
+    ranges = None
+    if if_range_allows(request.headers.get("if-range"), etag, last_modified):
+        try:
+            ranges = parse_range_header(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+
+    if ranges is None:
+        local_path = storage.local_path(target.key)
+        if local_path is not None:
+            # 本地存储直接发送文件
+            return FileDownloadResponse(
+                path=local_path,
+                media_type=media_type,
+                headers=headers
+            )
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            storage.open_range(target.key),
+            media_type=media_type,
+            headers=headers
+        )
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = content_range(start, end, size)
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            storage.open_range(target.key, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers
+        )
+
+    boundary = uuid.uuid4().hex
+    body_length = sum(
+        len(multipart_part_header(boundary, media_type, start, end, size)) + (end - start + 1) + 2
+        for start, end in ranges
+    ) + len(multipart_end(boundary))
+    headers["Content-Length"] = str(body_length)
+    return StreamingResponse(
+        _iter_byteranges(target.key, ranges, size, media_type, boundary),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers
+    )
+
+
+@router.get("/export")
+async def export_files(
+    file_ids: Optional[List[int]] = Query(None, description="要导出的文件ID，不传时按过滤条件导出"),
+    search: Optional[str] = Query(None, description="搜索文件名"),
+    mime_type: Optional[str] = Query(None, description="MIME类型过滤"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    下载文件
+    批量导出为ZIP
     
-    - 返回原始文件名
-    - 自动设置Content-Type
+    - 指定 file_ids，或使用与 list_files 相同的过滤条件
+    - 边读边压缩边发送，不生成临时压缩包
+    - 单次最多导出 EXPORT_MAX_FILES 个文件
     """
-    # 查询文件记录
-    result = await db.execute(
-        select(FileModel).where(
-            FileModel.id == file_id,
-            FileModel.user_id == current_user.id
+    query = _filter_files(
+        select(
+            FileModel.filename,
+            FileModel.file_path,
+            FileModel.file_size,
+            FileModel.mime_type,
+            FileModel.created_at
+        ).where(FileModel.user_id == current_user.id),
+        search,
+        mime_type,
+        dialect_name(db)
+    )
+    if file_ids:
+        query = query.where(FileModel.id.in_(file_ids))
+    
+    # 一次查询取出所有文件信息，多取一条判断是否超限
+    query = query.order_by(FileModel.created_at.desc(), FileModel.id.desc())
+    result = await db.execute(query.limit(settings.EXPORT_MAX_FILES + 1))
+    rows = result.all()
+    
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No files to export"
+        )
+    if len(rows) > settings.EXPORT_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files. Maximum is {settings.EXPORT_MAX_FILES} per export"
+        )
+    
+    entries = [
+        ZipEntry(
+            name=name,
+            key=row.file_path,
+            size=row.file_size,
+            modified=row.created_at,
+            mime_type=row.mime_type or "application/octet-stream"
         )
+        for name, row in zip(unique_names(row.filename for row in rows), rows)
+    ]
+    
+    archive_name = f"files-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_zip(entries, get_storage().open_range),
+        media_type="application/zip",
+        headers={"Content-Disposition": _content_disposition(archive_name)}
     )
+
+
+@router.get("/signed/{token}", name="download_signed_file")
+async def download_signed_file(token: str, request: Request):
+    """
+    通过签名URL下载文件
+
+    - 无需认证，只校验签名和有效期，不查询数据库
+    - 支持与普通下载相同的条件请求和 Range 请求
+    """
+    try:
+        claims = verify_download_token(token)
+    except InvalidSignedURL as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Invalid download URL: {e}"
+        )
+
+    target = _DownloadTarget(
+        key=claims["k"],
+        filename=claims["n"],
+        media_type=claims["t"],
+        content_hash=claims.get("h"),
+        last_modified=datetime.utcfromtimestamp(claims["m"])
+    )
+    return await _file_download_response(request, target)
+
+
+async def _get_user_file(
+    db: AsyncSession,
+    file_id: int,
+    user: User,
+    with_blob: bool = False
+) -> FileModel:
+    """查询当前用户的文件记录（with_blob 时同时加载内容块，用于读取派生元数据）"""
+    query = select(FileModel).where(
+        FileModel.id == file_id,
+        FileModel.user_id == user.id
+    )
+    if with_blob:
+        query = query.options(selectinload(FileModel.blob))
+    result = await db.execute(query)
     db_file = result.scalar_one_or_none()
     
     if not db_file:
@@ -207,21 +707,176 @@ async def download_file(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found"
         )
-    
-    # 检查文件是否存在
-    if not os.path.exists(db_file.file_path):
+    return db_file
+
+
+@router.get("/{file_id}/info", response_model=FileDetailResponse)
+async def get_file_info(
+    file_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    获取文件信息（含派生元数据及其计算进度）
+    """
+    return await _get_user_file(db, file_id, current_user, with_blob=True)
+
+
+def _preview_encoding(db_file: FileModel) -> str:
+    """预览使用的编码：优先使用派生元数据识别出的编码"""
+    text = (db_file.derived_metadata or {}).get("text") or {}
+    encoding = text.get("encoding") or "utf-8"
+    if encoding.startswith("utf-16"):
+        # 按字节查找换行符的方式不适用于UTF-16
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Preview is not supported for UTF-16 files"
+        )
+    return encoding
+
+
+@router.get("/{file_id}/preview", response_model=FilePreviewResponse)
+async def preview_file(
+    file_id: int,
+    start_line: Optional[int] = Query(None, ge=1, description="起始行号（从1开始）"),
+    end_line: Optional[int] = Query(None, ge=1, description="结束行号（包含）"),
+    tail: Optional[int] = Query(None, ge=1, le=settings.PREVIEW_MAX_LINES, description="读取最后N行"),
+    offset: Optional[int] = Query(None, ge=0, description="按字节读取的起始偏移"),
+    length: Optional[int] = Query(None, ge=1, le=settings.PREVIEW_MAX_BYTES, description="按字节读取的长度"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    预览文本文件的一部分
+
+    - 按行：start_line / end_line（默认从第1行开始读取 PREVIEW_DEFAULT_LINES 行）
+    - 从末尾：tail=N
+    - 按字节：offset / length
+    - 文件通过 mmap 读取并缓存行索引，只读取请求涉及的部分，大文件与小文件开销相同
+    """
+    db_file = await _get_user_file(db, file_id, current_user, with_blob=True)
+    encoding = _preview_encoding(db_file)
+    storage = get_storage()
+
+    if offset is not None:
+        start = min(offset, db_file.file_size)
+        end = min(start + (length or settings.PREVIEW_MAX_BYTES), db_file.file_size)
+        data = b""
+        if start < end:
+            data = b"".join([block async for block in storage.open_range(db_file.file_path, start, end - 1)])
+        return FilePreviewResponse(
+            file_id=db_file.id,
+            file_size=db_file.file_size,
+            encoding=encoding,
+            start_byte=start,
+            end_byte=start + len(data),
+            content=data.decode(encoding, errors="replace"),
+            has_more=start + len(data) < db_file.file_size
+        )
+
+    path = storage.local_path(db_file.file_path)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Line preview requires local storage, use offset and length instead"
+        )
+
+    try:
+        if tail is not None:
+            chunk = await run_in_threadpool(read_tail, path, tail, settings.PREVIEW_MAX_BYTES)
+        else:
+            first = start_line or 1
+            last = end_line or first + settings.PREVIEW_DEFAULT_LINES - 1
+            if last < first:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="end_line must not be less than start_line"
+                )
+            count = min(last - first + 1, settings.PREVIEW_MAX_LINES)
+            chunk = await run_in_threadpool(
+                read_lines, path, first - 1, count, settings.PREVIEW_MAX_BYTES
+            )
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on disk"
+            detail="File content not found"
         )
-    
-    return FileResponse(
-        path=db_file.file_path,
-        filename=db_file.filename,
-        media_type=db_file.mime_type
+
+    first_line = chunk.start_line + 1 if chunk.start_line is not None else None
+    return FilePreviewResponse(
+        file_id=db_file.id,
+        file_size=db_file.file_size,
+        encoding=encoding,
+        start_line=first_line,
+        end_line=first_line + len(chunk.lines) - 1 if first_line and chunk.lines else None,
+        total_lines=chunk.total_lines,
+        start_byte=chunk.start_byte,
+        end_byte=chunk.end_byte,
+        lines=[line.decode(encoding, errors="replace") for line in chunk.lines],
+        has_more=chunk.has_more
+    )
+
+
+@router.post("/{file_id}/signed-url", response_model=SignedDownloadURLResponse)
+async def create_signed_url(
+    file_id: int,
+    request: Request,
+    expires_in: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.DOWNLOAD_URL_MAX_EXPIRE_SECONDS,
+        description="有效期（秒），默认 DOWNLOAD_URL_EXPIRE_SECONDS"
+    ),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    生成短期有效的下载签名URL
+
+    - 可交给浏览器、编辑器或Agent直接下载，下载时不再查询数据库
+    - URL泄露后在有效期内任何人都可以下载，有效期应尽量短
+    """
+    db_file = await _get_user_file(db, file_id, current_user)
+    target = _target_from_record(db_file)
+
+    token, expires_at = create_download_token(
+        {
+            "k": target.key,
+            "n": target.filename,
+            "t": target.media_type,
+            "h": target.content_hash,
+            "m": int(target.last_modified.replace(tzinfo=timezone.utc).timestamp()),
+            "u": current_user.id,
+        },
+        expires_in or settings.DOWNLOAD_URL_EXPIRE_SECONDS
+    )
+
+    return SignedDownloadURLResponse(
+        url=str(request.url_for("download_signed_file", token=token)),
+        expires_at=datetime.utcfromtimestamp(expires_at)
     )
 
 
+@router.get("/{file_id}")
+async def download_file(
+    file_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    下载文件
+    
+    - 返回原始文件名
+    - 自动设置Content-Type
+    - 支持 ETag / If-None-Match / If-Modified-Since 条件请求（未变化时返回304）
+    - 支持单段和多段 Range 请求（206 Partial Content）
+    - 开启 DOWNLOAD_OFFLOAD 时由前置代理或对象存储发送文件内容
+    """
+    db_file = await _get_user_file(db, file_id, current_user)
+    return await _file_download_response(request, _target_from_record(db_file))
+
+
 @router.put("/{file_id}", response_model=FileResponse)
 async def update_file(
     file_id: int,
@@ -280,7 +935,8 @@ async def delete_file(
     删除文件
     
     - 删除数据库记录
-    - 删除物理文件
+    - 内容块只减少引用，引用归零后由回收任务删除
+    - 未登记为内容块的旧文件直接删除存储对象
     """
     # 查询文件记录
     result = await db.execute(
@@ -297,16 +953,22 @@ async def delete_file(
             detail="File not found"
         )
     
-    # 删除物理文件
-    if os.path.exists(db_file.file_path):
-        try:
-            os.remove(db_file.file_path)
-        except Exception as e:
-            # 记录错误但继续删除数据库记录
-            print(f"Error deleting file: {e}")
+    content_hash = db_file.content_hash
     
-    # 删除数据库记录
+    # 删除数据库记录、释放内容块引用并扣减用量
     await db.delete(db_file)
+    if content_hash:
+        await release_blob(db, content_hash)
+    usage = await charge_usage(db, current_user.id, -db_file.file_size)
     await db.commit()
+    await cache_usage(current_user.id, usage)
+    
+    # 旧文件没有内容块，直接删除存储对象
+    if not content_hash:
+        try:
+            await get_storage().delete(db_file.file_path)
+        except Exception as e:
+            # 数据库记录已删除，残留的存储对象由对账任务清理
+            logger.warning(f"Error deleting file {db_file.file_path}: {e}")
     
     return None
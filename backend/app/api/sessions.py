@@ -3,9 +3,10 @@
 """
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
+from sqlalchemy.orm import load_only
 from app.database import get_db
 from app.core.security import get_current_user
 from app.models.session import Session
@@ -14,10 +15,16 @@ from app.schemas.session import (
     SessionCreate,
     SessionUpdate,
     SessionResponse,
+    SessionSummary,
+    SessionMessage as SessionMessageSchema,
+    SessionMessageResponse,
+    SessionMessageListResponse,
     Message as MessageSchema,
     ChatRequest,
     ChatResponse
 )
+from app.utils.session_messages import append_message, list_messages
+from app.utils.pagination import encode_cursor, keyset_before
 from tasks.agent_tasks import execute_agent_task
 
 router = APIRouter()
@@ -33,10 +40,12 @@ async def create_session(
     创建新会话
     """
     # 创建会话
+    context = session_create.context or {}
     session = Session(
         user_id=current_user.id,
-        messages=[],
-        context=session_create.context or {}
+        title=session_create.title or context.get("title"),
+        description=session_create.description,
+        context=context
     )
 
     db.add(session)
@@ -46,26 +55,50 @@ async def create_session(
     return session
 
 
-@router.get("", response_model=List[SessionResponse])
+@router.get("", response_model=List[SessionSummary])
 async def list_sessions(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="游标（传入时忽略skip）"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     获取用户会话列表
+
+    按 updated_at, id 倒序；下一页游标通过 X-Next-Cursor 响应头返回。
+    只返回摘要字段，上下文等JSON字段不参与查询
     """
-    # 查询用户的会话
-    result = await db.execute(
+    # 查询用户的会话（只加载摘要列）
+    query = (
         select(Session)
+        .options(load_only(
+            Session.id,
+            Session.title,
+            Session.status,
+            Session.model_name,
+            Session.total_messages,
+            Session.total_tokens,
+            Session.created_at,
+            Session.updated_at
+        ))
         .where(Session.user_id == current_user.id)
-        .order_by(desc(Session.updated_at))
-        .offset(skip)
-        .limit(limit)
+        .order_by(desc(Session.updated_at), desc(Session.id))
     )
+    if cursor:
+        query = query.where(keyset_before(Session.updated_at, Session.id, cursor))
+    else:
+        query = query.offset(skip)
+
+    # 多取一条判断是否有更多
+    result = await db.execute(query.limit(limit + 1))
     sessions = result.scalars().all()
 
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(sessions[-1].updated_at, sessions[-1].id)
+
     return sessions
 
 
@@ -164,6 +197,81 @@ async def delete_session(
     return None
 
 
+@router.get("/{session_id}/messages", response_model=SessionMessageListResponse)
+async def get_session_messages(
+    session_id: int,
+    after_seq: Optional[int] = Query(None, ge=0, description="返回该序号之后的消息"),
+    before_seq: Optional[int] = Query(None, ge=1, description="返回该序号之前的消息"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    分页获取会话消息历史
+
+    - 默认返回最近的 limit 条
+    - after_seq 向后翻页，before_seq 向前翻页
+    """
+    result = await db.execute(
+        select(Session.id).where(
+            Session.id == session_id,
+            Session.user_id == current_user.id
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+
+    # 多取一条判断是否还有更多
+    messages = await list_messages(
+        db,
+        session_id,
+        limit=limit + 1,
+        after_seq=after_seq,
+        before_seq=before_seq
+    )
+    has_more = len(messages) > limit
+    if has_more:
+        # 向后翻页丢弃最后一条，向前翻页丢弃最早一条
+        messages = messages[:limit] if after_seq is not None else messages[1:]
+
+    return SessionMessageListResponse(items=messages, has_more=has_more)
+
+
+@router.post(
+    "/{session_id}/messages",
+    response_model=SessionMessageResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def add_session_message(
+    session_id: int,
+    message: SessionMessageSchema,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    追加一条会话消息
+    """
+    result = await db.execute(
+        select(Session.id).where(
+            Session.id == session_id,
+            Session.user_id == current_user.id
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+
+    db_message = await append_message(db, session_id, message.role, message.content)
+    await db.commit()
+
+    return db_message
+
+
 @router.post("/{session_id}/chat", response_model=ChatResponse)
 async def send_message(
     session_id: str,
@@ -191,6 +299,10 @@ async def send_message(
             detail="Session not found"
         )
 
+    # 记录用户消息
+    await append_message(db, session.id, "user", chat_request.message)
+    await db.commit()
+
     # 提交Celery任务
     task = execute_agent_task.delay(
         prompt=chat_request.message,
@@ -1,20 +1,124 @@
 """
 技能路由 - 完整实现
 """
-from typing import Optional
-import slugify
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
-from app.database import get_db
+from sqlalchemy import select, func, delete, insert, Select
+from sqlalchemy.sql.elements import ColumnElement
+from app.database import get_db, dialect_name
 from app.core.security import get_current_user
-from app.models.skill import Skill
+from app.core.permissions import is_superuser
+from app.models.skill import Skill, SKILL_SEARCH_CONFIG, skill_search_vector
+from app.models.skill_tag import SkillTag
 from app.models.user import User
-from app.schemas.skill import SkillCreate, SkillUpdate, SkillResponse, SkillListResponse
+from app.schemas.skill import (
+    SkillCreate, SkillUpdate, SkillResponse, SkillListResponse, SkillCatalogCacheStats,
+    SkillTagFacetsResponse
+)
+from app.utils.pagination import encode_cursor, keyset_before
+from app.utils.text_search import fulltext_match
+from app.utils.slugs import assign_unique_slug
+from app.utils.counters import increment, merge_pending
+from app.utils.skill_cache import (
+    CatalogItem,
+    bump_catalog_version,
+    get_or_compute,
+    get_public_window,
+    cache_stats,
+    merge_page
+)
 
 router = APIRouter()
 
 
+def _normalize_tags(tags: Iterable[str]) -> List[str]:
+    """去除空白和重复的标签（保持顺序）"""
+    return list(dict.fromkeys(tag.strip() for tag in tags if tag and tag.strip()))
+
+
+async def _sync_skill_tags(db: AsyncSession, skill: Skill) -> None:
+    """把 skill.tags 同步写入 skill_tags（技能已写入数据库，调用方负责提交）"""
+    tags = _normalize_tags(skill.tags or [])
+    skill.tags = tags
+    await db.execute(delete(SkillTag).where(SkillTag.skill_id == skill.id))
+    if tags:
+        await db.execute(insert(SkillTag), [{"skill_id": skill.id, "tag": tag} for tag in tags])
+
+
+def _filter_skills(
+    query: Select,
+    search: Optional[str],
+    category: Optional[str],
+    tags: Optional[str],
+    dialect: str
+) -> Tuple[Select, Optional[ColumnElement]]:
+    """
+    添加搜索、分类和标签过滤
+
+    Returns:
+        Tuple[Select, Optional[ColumnElement]]: (查询, 相关度排序表达式；未搜索时为None)
+    """
+    rank = None
+    if search:
+        condition, rank = fulltext_match(
+            skill_search_vector,
+            [Skill.name, Skill.description, Skill.prompt_template],
+            search,
+            dialect,
+            SKILL_SEARCH_CONFIG
+        )
+        query = query.where(condition)
+    
+    # 分类过滤
+    if category:
+        query = query.where(Skill.category == category)
+    
+    # 标签过滤：同时带有全部标签（走 skill_tags 的 (tag, skill_id) 索引）
+    tag_list = _normalize_tags(tags.split(",")) if tags else []
+    if tag_list:
+        tagged = (
+            select(SkillTag.skill_id)
+            .where(SkillTag.tag.in_(tag_list))
+            .group_by(SkillTag.skill_id)
+            .having(func.count() == len(tag_list))
+        )
+        query = query.where(Skill.id.in_(tagged))
+    
+    return query, rank
+
+
+def _catalog_item(skill: Skill, rank_value: Optional[float]) -> CatalogItem:
+    """转换为可缓存、可合并的条目（排序键与查询的排序一致）"""
+    return {
+        "key": [float(rank_value or 0), skill.created_at.isoformat(), skill.id],
+        "data": SkillResponse.model_validate(skill).model_dump(mode="json"),
+    }
+
+
+async def _fetch_catalog_items(
+    db: AsyncSession,
+    query: Select,
+    rank: Optional[ColumnElement],
+    offset: int,
+    limit: int
+) -> List[CatalogItem]:
+    """按（相关度，）created_at, id 倒序查询一段技能"""
+    if rank is not None:
+        query = query.add_columns(rank.label("rank")).order_by(rank.desc())
+    query = query.order_by(Skill.created_at.desc(), Skill.id.desc()).offset(offset).limit(limit)
+    result = await db.execute(query)
+    if rank is None:
+        return [_catalog_item(skill, None) for skill in result.scalars().all()]
+    return [_catalog_item(skill, value) for skill, value in result.all()]
+
+
+async def _count(db: AsyncSession, query: Select) -> int:
+    result = await db.execute(select(func.count()).select_from(query.subquery()))
+    return result.scalar()
+
+
 @router.get("", response_model=SkillListResponse)
 async def list_skills(
     search: Optional[str] = Query(None, description="搜索关键词"),
@@ -23,71 +127,168 @@ async def list_skills(
     is_public: Optional[bool] = Query(True, description="只显示公开技能"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="游标（传入时忽略page）"),
+    include_total: Optional[bool] = Query(None, description="是否统计总数，默认仅页码分页时统计"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     搜索技能（分页、过滤）
     
-    - 支持按名称、描述搜索
+    - 支持按名称、描述、提示词模板全文检索（PostgreSQL 使用 tsvector GIN 索引，词按前缀匹配）
     - 支持按分类、标签过滤
-    - 支持分页
+    - 支持页码分页和游标分页（按 created_at, id 倒序）
+    - 页码分页时搜索结果按相关度排序（名称 > 描述 > 提示词模板）；游标分页仍按时间倒序
+    - 公开技能部分的结果在Redis中缓存，与当前用户自己的非公开技能合并后返回
     """
-    # 基础查询 - 显示公开的或用户自己的技能
-    query = select(Skill).where(
-        or_(
-            Skill.is_public == True,
-            Skill.user_id == current_user.id
-        )
+    dialect = dialect_name(db)
+    # 公开的技能（可缓存）和用户自己的非公开技能（实时查询）
+    public_query, rank = _filter_skills(
+        select(Skill).where(Skill.is_public == True), search, category, tags, dialect
+    )
+    private_query, _ = _filter_skills(
+        select(Skill).where(Skill.user_id == current_user.id, Skill.is_public == False),
+        search, category, tags, dialect
     )
     
-    # 搜索过滤
-    if search:
-        search_term = f"%{search}%"
-        query = query.where(
-            or_(
-                Skill.name.ilike(search_term),
-                Skill.description.ilike(search_term),
-                Skill.prompt_template.ilike(search_term)
-            )
-        )
-    
-    # 分类过滤
-    if category:
-        query = query.where(Skill.category == category)
+    # 计算总数（可选）
+    count_total = include_total if include_total is not None else cursor is None
+    total = await _count(db, private_query) if count_total else None
+    
+    # 页码分页时搜索结果按相关度排序
+    ranked = rank is not None and not cursor
+    if not ranked:
+        rank = None
+    
+    # 分页：游标优先，否则按页码偏移；多取一条判断是否有更多
+    offset = 0
+    if cursor:
+        public_query = public_query.where(keyset_before(Skill.created_at, Skill.id, cursor))
+        private_query = private_query.where(keyset_before(Skill.created_at, Skill.id, cursor))
+    else:
+        offset = (page - 1) * page_size
+    limit = page_size + 1
+    
+    private = await _fetch_catalog_items(db, private_query, rank, 0, offset + limit)
+    
+    # 合并结果只需要公开技能中 [offset - 私有条数, offset + limit) 这一段，
+    # 从按固定大小缓存的公开目录页中截取（缓存键与用户无关）
+    public_start = max(0, offset - len(private))
+    filters = {
+        "search": search,
+        "category": category,
+        "tags": tags,
+        "cursor": cursor,
+        "ranked": ranked,
+    }
     
-    # 标签过滤
-    if tags:
-        tag_list = [tag.strip() for tag in tags.split(",")]
-        # 简单的标签包含检查（JSON数组）
-        for tag in tag_list:
-            query = query.where(Skill.tags.contains([tag]))
+    async def fetch_public_page(start: int, size: int) -> List[CatalogItem]:
+        return await _fetch_catalog_items(db, public_query, rank, start, size)
     
-    # 计算总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    public = await get_public_window(filters, public_start, offset + limit, fetch_public_page)
     
-    # 分页
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size).order_by(Skill.created_at.desc())
+    if count_total:
+        async def count_public() -> dict:
+            return {"total": await _count(db, public_query)}
+        
+        cached = await get_or_compute(dict(filters, kind="count"), count_public)
+        total += cached["total"]
     
-    # 执行查询
-    result = await db.execute(query)
-    skills = result.scalars().all()
+    items = merge_page(public, public_start, private, offset, limit)
+    has_more = len(items) > page_size
+    items = items[:page_size]
     
-    # 计算是否有更多
-    has_more = (offset + len(skills)) < total
+    # 按相关度排序的结果不能用时间游标续页
+    next_cursor = None
+    if has_more and not ranked:
+        _, created_at, skill_id = items[-1]["key"]
+        next_cursor = encode_cursor(datetime.fromisoformat(created_at), skill_id)
     
+    # 缓存中的计数可能已过时：重新查询使用/点赞计数并合并尚未写回数据库的增量
     return SkillListResponse(
-        items=skills,
+        items=await merge_pending(db, "skills", [dict(item["data"]) for item in items]),
         total=total,
-        page=page,
+        page=None if cursor else page,
         page_size=page_size,
-        has_more=has_more
+        has_more=has_more,
+        next_cursor=next_cursor
     )
 
 
+@router.get("/cache/stats", response_model=SkillCatalogCacheStats)
+async def get_catalog_cache_stats(
+    current_user: User = Depends(is_superuser)
+):
+    """
+    技能目录缓存命中统计（需要超级管理员权限）
+    """
+    try:
+        return await cache_stats()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Cache unavailable: {e}"
+        )
+
+
+@router.get("/tags/facets", response_model=SkillTagFacetsResponse)
+async def get_tag_facets(
+    search: Optional[str] = Query(None, description="搜索关键词"),
+    category: Optional[str] = Query(None, description="分类过滤"),
+    tags: Optional[str] = Query(None, description="已选标签（逗号分隔），统计同时带有这些标签的技能"),
+    limit: int = Query(50, ge=1, le=200, description="返回的标签数"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    标签分面统计：在当前过滤条件下每个标签的技能数（按数量倒序）
+
+    - 按 skill_tags 的 (tag, skill_id) 索引分组计数
+    - 公开技能部分的计数与技能列表共用缓存，当前用户的非公开技能实时统计后合并
+    """
+    dialect = dialect_name(db)
+    
+    def facet_query(visible: ColumnElement) -> Select:
+        query, _ = _filter_skills(
+            select(SkillTag.tag, func.count())
+            .join(Skill, Skill.id == SkillTag.skill_id)
+            .where(visible),
+            search, category, tags, dialect
+        )
+        return query.group_by(SkillTag.tag)
+    
+    async def fetch_public() -> dict:
+        result = await db.execute(
+            facet_query(Skill.is_public == True)
+            .order_by(func.count().desc(), SkillTag.tag)
+            .limit(limit)
+        )
+        return {"items": [[tag, count] for tag, count in result.all()]}
+    
+    cached = await get_or_compute(
+        {"kind": "tag_facets", "search": search, "category": category, "tags": tags, "limit": limit},
+        fetch_public
+    )
+    counts: Dict[str, int] = {tag: count for tag, count in cached["items"]}
+    
+    # 非公开技能的标签在公开目录中的计数可能不在前 limit 个之内，单独补查后合并
+    result = await db.execute(
+        facet_query((Skill.user_id == current_user.id) & (Skill.is_public == False))
+    )
+    private_counts = dict(result.all())
+    missing = [tag for tag in private_counts if tag not in counts]
+    if missing:
+        result = await db.execute(
+            facet_query(Skill.is_public == True).where(SkillTag.tag.in_(missing))
+        )
+        counts.update(dict(result.all()))
+    for tag, count in private_counts.items():
+        counts[tag] = counts.get(tag, 0) + count
+    
+    items = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return SkillTagFacetsResponse(items=[{"tag": tag, "count": count} for tag, count in items])
+
+
 @router.get("/{skill_id}", response_model=SkillResponse)
 async def get_skill(
     skill_id: int,
@@ -115,7 +316,9 @@ async def get_skill(
             detail="You don't have permission to access this skill"
         )
     
-    return skill
+    # 合并尚未写回数据库的使用/点赞计数
+    data = SkillResponse.model_validate(skill).model_dump()
+    return (await merge_pending(db, "skills", [data]))[0]
 
 
 @router.post("", response_model=SkillResponse, status_code=status.HTTP_201_CREATED)
@@ -146,26 +349,10 @@ async def create_skill(
             detail="Developer permission required to create skills"
         )
     
-    # 生成唯一slug
-    base_slug = slugify.slugify(skill_create.name)
-    slug = base_slug
-    counter = 1
-    
-    while True:
-        # 检查slug是否已存在
-        existing = await db.execute(
-            select(Skill).where(Skill.slug == slug)
-        )
-        if not existing.scalar_one_or_none():
-            break
-        slug = f"{base_slug}-{counter}"
-        counter += 1
-    
     # 创建技能
     skill = Skill(
         user_id=current_user.id,
         name=skill_create.name,
-        slug=slug,
         description=skill_create.description,
         category=skill_create.category,
         prompt_template=skill_create.prompt_template,
@@ -174,9 +361,13 @@ async def create_skill(
         is_public=skill_create.is_public
     )
     
-    db.add(skill)
+    # 生成唯一slug并写入
+    await assign_unique_slug(db, skill, skill_create.name, "skill")
+    await _sync_skill_tags(db, skill)
     await db.commit()
     await db.refresh(skill)
+    if skill.is_public:
+        await bump_catalog_version()
     
     return skill
 
@@ -214,31 +405,22 @@ async def update_skill(
     # 更新字段
     update_data = skill_update.model_dump(exclude_unset=True)
     
+    was_public = skill.is_public
+    for field, value in update_data.items():
+        setattr(skill, field, value)
+    
     # 如果更新名称，需要更新slug
     if "name" in update_data:
-        base_slug = slugify.slugify(update_data["name"])
-        slug = base_slug
-        counter = 1
-        
-        while True:
-            existing = await db.execute(
-                select(Skill).where(
-                    Skill.slug == slug,
-                    Skill.id != skill_id
-                )
-            )
-            if not existing.scalar_one_or_none():
-                break
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        
-        skill.slug = slug
+        await assign_unique_slug(db, skill, update_data["name"], "skill")
     
-    for field, value in update_data.items():
-        setattr(skill, field, value)
+    if "tags" in update_data:
+        await _sync_skill_tags(db, skill)
     
     await db.commit()
     await db.refresh(skill)
+    # 公开目录中新增、修改或移除了技能
+    if was_public or skill.is_public:
+        await bump_catalog_version()
     
     return skill
 
@@ -272,8 +454,11 @@ async def delete_skill(
             detail="Not enough permissions to delete this skill"
         )
     
+    was_public = skill.is_public
     await db.delete(skill)
     await db.commit()
+    if was_public:
+        await bump_catalog_version()
     
     return None
 
@@ -287,7 +472,7 @@ async def install_skill(
     """
     安装技能
     
-    - 增加使用计数
+    - 增加使用计数（写后计数器）
     - 返回技能配置供前端使用
     """
     result = await db.execute(
@@ -308,8 +493,8 @@ async def install_skill(
             detail="You don't have permission to install this skill"
         )
     
-    # 增加使用计数
-    skill.use_count += 1
+    # 增加使用计数（先在Redis累加，定期批量写回，不锁技能行）
+    await increment(db, "skills", skill_id, "use_count")
     await db.commit()
     
     # TODO: 实际安装逻辑（可以复制到用户的技能列表、发送到CLI等）
@@ -0,0 +1,423 @@
+"""
+断点续传上传路由
+
+协议：
+1. POST   /api/files/uploads                     创建上传，返回 upload_id
+2. PUT    /api/files/uploads/{upload_id}?offset=N 从偏移 N 写入请求体中的分块
+3. GET    /api/files/uploads/{upload_id}          查询当前偏移（断线后从这里继续）
+4. POST   /api/files/uploads/{upload_id}/complete 所有字节到齐后生成文件记录
+5. DELETE /api/files/uploads/{upload_id}          放弃上传
+
+进度保存在 upload_sessions 表，分块数据写入 UPLOAD_DIR/<user_id>/.uploads/ 下的本地临时文件，
+完成后存入存储后端（使用对象存储时，同一上传的请求需路由到同一API节点或共享临时目录）。
+
+分块写入和完成操作都不持有行锁，而是在会话上登记租约（writer_token）：
+- 分块先写入该租约独有的文件，确认租约仍然有效后才追加到临时文件，
+  租约过期后被接管的慢请求不会覆盖新请求写入的数据
+- 完成操作把会话标记为 completing 后计算哈希和存储内容，最后在短事务中创建文件记录
+过期未完成的上传由 tasks.file_tasks.expire_upload_sessions 标记为 expired 并删除临时文件
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from app.database import get_db
+from app.core.security import get_current_user
+from app.models.user import User
+from app.models.upload_session import UploadSession
+from app.schemas.file import UploadSessionCreate, UploadSessionResponse, FileUploadResponse
+from app.api.files import (
+    UPLOAD_DIR, ALLOWED_EXTENSIONS, is_allowed_file, build_file_record, enqueue_metadata_extraction
+)
+from app.utils.file_storage import (
+    FileTooLargeError,
+    copy_into,
+    create_empty_file,
+    write_stream_at,
+    hash_file,
+    remove_file
+)
+from app.utils.blob_store import commit_blob, discard_blob
+from app.utils.storage_quota import ensure_quota, charge_usage, cache_usage
+from app.config import settings
+
+router = APIRouter()
+
+# 分块临时文件目录名（位于用户目录下）
+STAGING_DIRNAME = ".uploads"
+
+
+def _to_response(upload: UploadSession) -> UploadSessionResponse:
+    """转换为响应模型"""
+    return UploadSessionResponse(
+        upload_id=upload.id,
+        filename=upload.filename,
+        total_size=upload.total_size,
+        offset=upload.received_bytes,
+        status=upload.status,
+        chunk_size=settings.RESUMABLE_CHUNK_SIZE,
+        file_id=upload.file_id,
+        expires_at=upload.expires_at
+    )
+
+
+async def _get_upload(
+    db: AsyncSession,
+    upload_id: str,
+    user: User,
+    for_update: bool = False
+) -> UploadSession:
+    """查询当前用户的上传会话"""
+    query = select(UploadSession).where(
+        UploadSession.id == upload_id,
+        UploadSession.user_id == user.id
+    )
+    if for_update:
+        # 只在校验和修改状态期间持有行锁，不跨越分块数据的传输
+        query = query.with_for_update()
+    result = await db.execute(query)
+    upload = result.scalar_one_or_none()
+
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return upload
+
+
+def lease_path(temp_path: str, token: str) -> str:
+    """分块写入租约独有的数据文件"""
+    return f"{temp_path}.{token}"
+
+
+def _take_lease(upload: UploadSession, now: datetime) -> str:
+    """登记新的写入租约（调用方负责提交），返回租约令牌"""
+    token = str(uuid.uuid4())
+    upload.writer_token = token
+    upload.writer_expires_at = now + timedelta(seconds=settings.RESUMABLE_CHUNK_LEASE_SECONDS)
+    return token
+
+
+async def _release_lease(db: AsyncSession, upload_id: str, token: str) -> None:
+    """释放写入租约并恢复为可上传状态（租约已被接管时不做任何事）"""
+    await db.rollback()
+    await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload_id, UploadSession.writer_token == token)
+        .values(status="uploading", writer_token=None, writer_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+def _ensure_uploading(upload: UploadSession, now: datetime) -> None:
+    """
+    检查上传是否仍可写入
+
+    完成操作中断（completing 且租约已过期）的上传视为仍在上传；
+    其他请求持有未过期的租约时返回409
+    """
+    lease_active = upload.writer_token is not None and upload.writer_expires_at > now
+    if upload.status == "expired" or upload.expires_at < now:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Upload expired"
+        )
+    if upload.status == "completing" and lease_active:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload is being completed"
+        )
+    if upload.status not in ("uploading", "completing"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is {upload.status}"
+        )
+    if lease_active:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another chunk is being uploaded"
+        )
+
+
+@router.post("", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload_create: UploadSessionCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    创建断点续传上传
+
+    - 校验文件类型、总大小和存储配额
+    - 创建空的分块临时文件
+    """
+    if not is_allowed_file(upload_create.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+    if upload_create.total_size > settings.RESUMABLE_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=(
+                "File too large. Maximum size is "
+                f"{settings.RESUMABLE_MAX_FILE_SIZE // (1024*1024)}MB"
+            )
+        )
+
+    # 配额预检查，在接收任何数据之前拒绝
+    await ensure_quota(db, current_user.id, upload_create.total_size)
+
+    upload_id = str(uuid.uuid4())
+    temp_path = os.path.join(
+        UPLOAD_DIR, str(current_user.id), STAGING_DIRNAME, f"{upload_id}.part"
+    )
+    await create_empty_file(temp_path)
+
+    upload = UploadSession(
+        id=upload_id,
+        user_id=current_user.id,
+        filename=upload_create.filename,
+        description=upload_create.description,
+        total_size=upload_create.total_size,
+        received_bytes=0,
+        temp_path=temp_path,
+        status="uploading",
+        expires_at=datetime.utcnow() + timedelta(hours=settings.RESUMABLE_UPLOAD_EXPIRE_HOURS)
+    )
+    db.add(upload)
+    try:
+        await db.commit()
+    except Exception:
+        await remove_file(temp_path)
+        raise
+    await db.refresh(upload)
+
+    return _to_response(upload)
+
+
+@router.get("/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    查询上传状态
+
+    断线后客户端从返回的 offset 继续上传
+    """
+    upload = await _get_upload(db, upload_id, current_user)
+    return _to_response(upload)
+
+
+@router.put("/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="分块起始偏移，必须等于当前offset"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    上传一个分块
+
+    - 请求体为原始字节，流式写入临时文件
+    - offset 与服务端记录不一致时返回409，客户端应先查询当前offset
+    - 另一个分块正在写入时返回409
+    - 连接中途断开时已收到的字节会被保留
+
+    行锁只用于校验offset并登记写入租约，提交后再接收分块数据（慢客户端不会阻塞
+    其他请求或占用数据库连接）；写完后按 offset 和租约条件更新进度
+    """
+    upload = await _get_upload(db, upload_id, current_user, for_update=True)
+    now = datetime.utcnow()
+    _ensure_uploading(upload, now)
+
+    if offset != upload.received_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Offset mismatch. Current offset is {upload.received_bytes}"
+        )
+
+    token = _take_lease(upload, now)
+    upload.status = "uploading"
+    temp_path = upload.temp_path
+    max_bytes = upload.total_size - offset
+    await db.commit()
+
+    # 写入租约独有的文件：租约过期被接管后，本请求迟到的数据不会影响临时文件
+    part_path = lease_path(temp_path, token)
+    try:
+        await create_empty_file(part_path)
+        written = await write_stream_at(part_path, 0, request.stream(), max_bytes=max_bytes)
+    except FileTooLargeError:
+        await remove_file(part_path)
+        await _release_lease(db, upload_id, token)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Chunk exceeds declared total size"
+        )
+    except Exception:
+        await remove_file(part_path)
+        await _release_lease(db, upload_id, token)
+        raise
+
+    try:
+        result = await db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == upload_id,
+                UploadSession.status == "uploading",
+                UploadSession.received_bytes == offset,
+                UploadSession.writer_token == token
+            )
+            .values(received_bytes=offset + written, writer_token=None, writer_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            # 更新持有行锁直到提交，追加期间租约不会被其他请求接管
+            await copy_into(temp_path, offset, part_path)
+            await db.commit()
+    except FileNotFoundError:
+        await _release_lease(db, upload_id, token)
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Upload data not found"
+        )
+    except Exception:
+        await _release_lease(db, upload_id, token)
+        raise
+    finally:
+        await remove_file(part_path)
+
+    if result.rowcount != 1:
+        # 写入期间上传被放弃，或租约过期后被其他请求接管
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload changed while the chunk was being written"
+        )
+
+    await db.refresh(upload)
+    return _to_response(upload)
+
+
+@router.post("/{upload_id}/complete", response_model=FileUploadResponse, status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    完成上传
+
+    - 所有字节到齐后计算哈希、登记为内容块并创建文件记录
+    - 会话先标记为 completing 并提交，计算哈希和存储内容期间不持有行锁；
+      最后按租约条件把会话标记为 completed，与文件记录在同一事务中提交
+    """
+    upload = await _get_upload(db, upload_id, current_user, for_update=True)
+    now = datetime.utcnow()
+    _ensure_uploading(upload, now)
+
+    if upload.received_bytes != upload.total_size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload incomplete. Received {upload.received_bytes} of {upload.total_size} bytes"
+        )
+
+    token = _take_lease(upload, now)
+    upload.status = "completing"
+    temp_path = upload.temp_path
+    total_size = upload.total_size
+    filename = upload.filename
+    description = upload.description
+    await db.commit()
+
+    try:
+        content_hash = await hash_file(temp_path)
+    except FileNotFoundError:
+        await _release_lease(db, upload_id, token)
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Upload data not found"
+        )
+    except Exception:
+        await _release_lease(db, upload_id, token)
+        raise
+
+    # 登记为内容块（相同内容只保存一份），再计入用量（原子校验配额）并创建文件记录
+    blob = None
+    try:
+        blob = await commit_blob(db, temp_path, content_hash, total_size)
+        usage = await charge_usage(db, current_user.id, total_size)
+        db_file = build_file_record(
+            current_user.id,
+            filename,
+            description,
+            content_hash,
+            total_size,
+            blob.storage_path
+        )
+        db.add(db_file)
+        await db.flush()
+        result = await db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == upload_id,
+                UploadSession.status == "completing",
+                UploadSession.writer_token == token
+            )
+            .values(status="completed", file_id=db_file.id, writer_token=None, writer_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            # 租约过期后被其他完成请求接管
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Upload changed while it was being completed"
+            )
+    except Exception:
+        # 回滚前删除本次新存入的对象
+        await discard_blob(blob)
+        await _release_lease(db, upload_id, token)
+        raise
+    await db.commit()
+    await cache_usage(current_user.id, usage)
+    await db.refresh(db_file)
+    enqueue_metadata_extraction(db_file)
+
+    return FileUploadResponse(
+        id=db_file.id,
+        filename=db_file.filename,
+        file_size=db_file.file_size,
+        mime_type=db_file.mime_type,
+        content_hash=db_file.content_hash,
+        message="File uploaded successfully"
+    )
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    放弃上传
+
+    - 删除分块临时文件
+    """
+    upload = await _get_upload(db, upload_id, current_user, for_update=True)
+
+    if upload.status == "uploading":
+        await remove_file(upload.temp_path)
+        upload.status = "aborted"
+        await db.commit()
+
+    return None
@@ -1,15 +1,20 @@
 """
 用户路由（增加输入验证）
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import validator, EmailStr
 from app.database import get_db
 from app.core.security import get_current_user, get_password_hash
+from app.core.permissions import is_superuser
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate, UserResponse
+from app.schemas.user import (
+    UserCreate, UserUpdate, UserResponse,
+    StorageUsageResponse, StorageReconcileResponse
+)
+from app.utils.storage_quota import get_usage, reconcile_usage, invalidate_usage
 
 router = APIRouter()
 
@@ -60,6 +65,40 @@ async def update_current_user(
     return current_user
 
 
+@router.get("/me/storage", response_model=StorageUsageResponse)
+async def get_storage_usage(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取当前用户的存储用量和配额"""
+    usage = await get_usage(db, current_user.id)
+    return StorageUsageResponse(
+        used=usage.used,
+        quota=usage.quota,
+        available=usage.available
+    )
+
+
+@router.post("/storage/reconcile", response_model=StorageReconcileResponse)
+async def reconcile_storage_usage(
+    user_id: Optional[int] = Query(None, description="只对账指定用户，默认所有用户"),
+    current_user: User = Depends(is_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    按文件表重新计算存储用量（仅管理员）
+
+    - 修正计数偏差并清除对应用户的用量缓存
+    """
+    corrected = await reconcile_usage(db, user_id)
+    await db.commit()
+
+    for corrected_id in corrected:
+        await invalidate_usage(corrected_id)
+
+    return StorageReconcileResponse(corrected_user_ids=corrected)
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
@@ -1,16 +1,29 @@
 """
 WebSocket路由 - 实时通信
 """
+import asyncio
 import json
 import logging
+import uuid
 from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.core.security import verify_token
+from app.core.redis import get_redis
+from app.core.permissions import is_superuser
+from app.core.events import (
+    parse_session_channel,
+    parse_ws_channel,
+    session_channel,
+    ws_channel
+)
+from app.config import settings
 from app.models.session import Session
 from app.models.user import User
 from app.schemas.session import Message
+from app.utils.session_messages import append_message
 from tasks.agent_tasks import execute_agent_task
 from datetime import datetime
 
@@ -19,47 +32,350 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+class _Connection:
+    """
+    单个WebSocket连接
+
+    每个连接有一个有界发送队列和独立的写任务，慢客户端不会阻塞其他连接
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str, user_id: str, queue_size: int):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+
 class ConnectionManager:
-    """WebSocket连接管理器"""
+    """
+    WebSocket连接管理器
+
+    发送不直接等待 send_json：消息进入每个连接的有界队列，由写任务并发发送。
+    队列溢出时按 slow_consumer_policy 处理：
+    - drop_oldest: 丢弃最旧的消息
+    - disconnect: 断开该慢客户端
 
-    def __init__(self):
-        # 存储活跃连接: {session_id: {user_id: WebSocket}}
-        self.active_connections: dict[str, dict[str, WebSocket]] = {}
+    分布式模式（WS_DISTRIBUTED=True）下通过Redis pub/sub在多个worker进程/节点间转发：
+    - 目标连接在本进程时直接发送（快速路径）
+    - 否则发布到 ws:session:<id> 频道，由持有连接的进程投递
+
+    每个进程只订阅本进程有连接的会话频道：会话的第一个本地连接建立时订阅，
+    最后一个断开时退订，不接收其他进程的会话流量
+    """
+
+    def __init__(
+        self,
+        distributed: bool = False,
+        queue_size: int = 100,
+        slow_consumer_policy: str = "disconnect"
+    ):
+        if slow_consumer_policy not in ("drop_oldest", "disconnect"):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+
+        # 存储活跃连接: {session_id: {user_id: _Connection}}
+        self.active_connections: dict[str, dict[str, _Connection]] = {}
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        # 统计
+        self.evictions = 0
+        self.dropped_messages = 0
+        # 是否跨进程转发
+        self.distributed = distributed
+        # 本进程标识，用于忽略自己发布的转发消息
+        self.node_id = uuid.uuid4().hex
+        # 事件监听任务（每个进程一个Redis订阅连接）
+        self._event_listener: Optional[asyncio.Task] = None
+        self._pubsub = None
+        # 已订阅的会话ID
+        self._subscribed: set[str] = set()
+        # 串行化订阅变更，避免同一会话的订阅/退订乱序
+        self._subscription_lock = asyncio.Lock()
+        # 有新订阅时唤醒空闲的监听任务
+        self._subscription_added = asyncio.Event()
+
+    def start_event_listener(self):
+        """启动事件监听（幂等）"""
+        if self._event_listener is None or self._event_listener.done():
+            self._event_listener = asyncio.create_task(self._listen())
+
+    async def stop_event_listener(self):
+        """停止事件监听"""
+        if self._event_listener is not None:
+            self._event_listener.cancel()
+            try:
+                await self._event_listener
+            except asyncio.CancelledError:
+                pass
+            self._event_listener = None
+        await self._reset_pubsub()
+
+    def _channels(self, session_id: str) -> list[str]:
+        """会话需要订阅的频道"""
+        channels = [session_channel(session_id)]
+        if self.distributed:
+            channels.append(ws_channel(session_id))
+        return channels
+
+    async def _sync_subscription(self, session_id: str):
+        """
+        按本进程是否持有会话连接订阅或退订会话频道（幂等）
+
+        订阅连接尚未建立（或正在重连）时不做处理，由监听任务建立连接后统一订阅
+        """
+        async with self._subscription_lock:
+            if self._pubsub is None:
+                return
+            wanted = session_id in self.active_connections
+            if wanted and session_id not in self._subscribed:
+                await self._pubsub.subscribe(*self._channels(session_id))
+                self._subscribed.add(session_id)
+                self._subscription_added.set()
+            elif not wanted and session_id in self._subscribed:
+                self._subscribed.discard(session_id)
+                await self._pubsub.unsubscribe(*self._channels(session_id))
+
+    async def _update_subscription(self, session_id: str):
+        """连接变更后同步订阅，失败只记录日志（监听任务重连时会重新订阅）"""
+        try:
+            await self._sync_subscription(session_id)
+        except Exception as e:
+            logger.warning(f"Failed to update subscription: session={session_id}, error={e}")
+
+    async def _resubscribe(self):
+        """建立新的订阅连接，并订阅本进程当前持有连接的所有会话"""
+        async with self._subscription_lock:
+            self._pubsub = get_redis().pubsub()
+            self._subscribed.clear()
+        for session_id in list(self.active_connections):
+            await self._sync_subscription(session_id)
+
+    async def _reset_pubsub(self):
+        """关闭订阅连接"""
+        async with self._subscription_lock:
+            pubsub, self._pubsub = self._pubsub, None
+            self._subscribed.clear()
+        if pubsub is not None:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+
+    async def _listen(self):
+        """
+        接收已订阅的会话事件频道（以及分布式模式下的转发频道），投递给本进程持有的连接
+
+        整个进程只使用一个订阅连接，Redis断开后自动重连并重新订阅
+        """
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._resubscribe()
+                if not self._subscribed:
+                    # 没有本地连接时不读取，等待第一个订阅
+                    self._subscription_added.clear()
+                    await self._subscription_added.wait()
+                    continue
+
+                item = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if item is None or item.get("type") != "message":
+                    continue
+                try:
+                    await self._dispatch(item["channel"], item["data"])
+                except Exception as e:
+                    logger.error(f"Failed to dispatch message on {item['channel']}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket event listener error: {e}")
+                await self._reset_pubsub()
+                await asyncio.sleep(1)
+
+    async def _dispatch(self, channel: str, data: str):
+        """处理订阅到的一条消息"""
+        session_id = parse_session_channel(channel)
+        if session_id is not None:
+            # Celery任务发布的会话事件：每个进程投递给自己持有的连接
+            if session_id in self.active_connections:
+                await self._broadcast_local(json.loads(data), session_id)
+            return
 
-    async def connect(self, websocket: WebSocket, session_id: str, user_id: str):
-        """建立WebSocket连接"""
+        session_id = parse_ws_channel(channel)
+        if session_id is None or session_id not in self.active_connections:
+            return
+
+        envelope = json.loads(data)
+        if envelope.get("origin") == self.node_id:
+            # 本进程已通过快速路径投递
+            return
+
+        target_user = envelope.get("user_id")
+        if target_user is None:
+            await self._broadcast_local(envelope["message"], session_id)
+        else:
+            await self._send_local(envelope["message"], session_id, target_user)
+
+    async def _publish(self, message: dict, session_id: str, user_id: Optional[str] = None):
+        """发布转发消息到其他进程"""
+        envelope = {"origin": self.node_id, "user_id": user_id, "message": message}
+        await get_redis().publish(ws_channel(session_id), json.dumps(envelope, ensure_ascii=False))
+
+    async def connect(self, websocket: WebSocket, session_id: str, user_id: str) -> _Connection:
+        """
+        建立WebSocket连接
+
+        Returns:
+            _Connection: 新连接，断开时传给 disconnect()
+        """
         await websocket.accept()
+        self.start_event_listener()
 
-        if session_id not in self.active_connections:
-            self.active_connections[session_id] = {}
+        # 同一用户重复连接时替换旧连接
+        previous = self.active_connections.get(session_id, {}).get(user_id)
+        if previous is not None:
+            self._remove(previous)
 
-        self.active_connections[session_id][user_id] = websocket
+        connection = _Connection(websocket, session_id, user_id, self.queue_size)
+        connection.writer = asyncio.create_task(self._writer(connection))
+        self.active_connections.setdefault(session_id, {})[user_id] = connection
+        # 会话的第一个本地连接：订阅会话频道
+        await self._update_subscription(session_id)
         logger.info(f"WebSocket connected: session={session_id}, user={user_id}")
+        return connection
+
+    def disconnect(self, connection: _Connection):
+        """
+        断开WebSocket连接
+
+        按连接对象移除：同一用户重新连接后，旧连接的断开不会移除新连接
+        """
+        self._remove(connection)
+        logger.info(
+            f"WebSocket disconnected: session={connection.session_id}, user={connection.user_id}"
+        )
+
+    def _remove(self, connection: _Connection):
+        """移除连接并停止其写任务"""
+        connections = self.active_connections.get(connection.session_id)
+        if connections is not None and connections.get(connection.user_id) is connection:
+            del connections[connection.user_id]
+            if not connections:
+                del self.active_connections[connection.session_id]
+                # 会话的最后一个本地连接：退订会话频道
+                asyncio.create_task(self._update_subscription(connection.session_id))
+
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    async def _writer(self, connection: _Connection):
+        """连接写任务：按顺序发送队列中的消息"""
+        try:
+            while True:
+                message = await connection.queue.get()
+                await connection.websocket.send_json(message)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(
+                f"WebSocket send failed: session={connection.session_id}, "
+                f"user={connection.user_id}, error={e}"
+            )
+            self._remove(connection)
+
+    async def _close_evicted(self, connection: _Connection):
+        """关闭已移除的慢客户端连接"""
+        try:
+            await connection.websocket.close(code=1013, reason="Slow consumer")
+        except Exception:
+            pass
+
+    def _enqueue(self, connection: _Connection, message: dict):
+        """放入连接的发送队列（不阻塞），溢出时执行慢客户端策略"""
+        try:
+            connection.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.slow_consumer_policy == "drop_oldest":
+            connection.queue.get_nowait()
+            connection.queue.put_nowait(message)
+            connection.dropped += 1
+            self.dropped_messages += 1
+        else:
+            self.evictions += 1
+            logger.warning(
+                f"Evicting slow WebSocket consumer: session={connection.session_id}, "
+                f"user={connection.user_id}"
+            )
+            # 立即移除，后续消息不会再进入该连接，也不会重复驱逐
+            self._remove(connection)
+            asyncio.create_task(self._close_evicted(connection))
 
-    def disconnect(self, session_id: str, user_id: str):
-        """断开WebSocket连接"""
-        if session_id in self.active_connections:
-            self.active_connections[session_id].pop(user_id, None)
+    async def _send_local(self, message: dict, session_id: str, user_id: str) -> bool:
+        """发送给本进程持有的连接，返回是否找到连接"""
+        connection = self.active_connections.get(session_id, {}).get(user_id)
+        if connection is None:
+            return False
+        self._enqueue(connection, message)
+        return True
 
-            if not self.active_connections[session_id]:
-                del self.active_connections[session_id]
+    async def _broadcast_local(self, message: dict, session_id: str):
+        """广播给本进程持有的会话连接"""
+        for connection in list(self.active_connections.get(session_id, {}).values()):
+            self._enqueue(connection, message)
 
-        logger.info(f"WebSocket disconnected: session={session_id}, user={user_id}")
+    def metrics(self) -> dict:
+        """
+        连接与发送队列统计
+
+        Returns:
+            dict: 连接数、队列深度、丢弃与驱逐次数
+        """
+        depths = [
+            connection.queue.qsize()
+            for connections in self.active_connections.values()
+            for connection in connections.values()
+        ]
+        return {
+            "sessions": len(self.active_connections),
+            "connections": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_size": self.queue_size,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "dropped_messages": self.dropped_messages,
+            "evictions": self.evictions,
+        }
 
     async def send_personal_message(self, message: dict, session_id: str, user_id: str):
         """发送个人消息"""
-        if session_id in self.active_connections and user_id in self.active_connections[session_id]:
-            websocket = self.active_connections[session_id][user_id]
-            await websocket.send_json(message)
+        if await self._send_local(message, session_id, user_id):
+            return
+        if self.distributed:
+            await self._publish(message, session_id, user_id)
 
     async def broadcast(self, message: dict, session_id: str):
         """广播消息到会话中的所有用户"""
-        if session_id in self.active_connections:
-            for websocket in self.active_connections[session_id].values():
-                await websocket.send_json(message)
+        await self._broadcast_local(message, session_id)
+        if self.distributed:
+            await self._publish(message, session_id)
 
 
-manager = ConnectionManager()
+manager = ConnectionManager(
+    distributed=settings.WS_DISTRIBUTED,
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    slow_consumer_policy=settings.WS_SLOW_CONSUMER_POLICY
+)
+
+
+@router.get("/api/ws/metrics")
+async def websocket_metrics(current_user: User = Depends(is_superuser)):
+    """
+    WebSocket连接与发送队列统计（仅超级管理员，本进程数据）
+    """
+    return manager.metrics()
 
 
 @router.websocket("/ws/session/{session_id}")
@@ -88,11 +404,24 @@ async def websocket_endpoint(
         await websocket.close(code=4001, reason="Unauthorized")
         return
 
-    # 验证会话
-    # TODO: 查询数据库验证session_id存在且属于该用户
+    # 验证会话存在且属于该用户（会话频道会推送任务输出，不能订阅他人的会话）
+    try:
+        session_pk = int(session_id)
+    except ValueError:
+        await websocket.close(code=4004, reason="Session not found")
+        return
+
+    result = await db.execute(select(Session.user_id).where(Session.id == session_pk))
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
+        await websocket.close(code=4004, reason="Session not found")
+        return
+    if str(owner_id) != str(user_id):
+        await websocket.close(code=4003, reason="Forbidden")
+        return
 
     # 建立连接
-    await manager.connect(websocket, session_id, user_id)
+    connection = await manager.connect(websocket, session_id, user_id)
 
     try:
         while True:
@@ -107,6 +436,11 @@ async def websocket_endpoint(
                     # 处理对话消息
                     prompt = message.get('content', '')
 
+                    # 记录用户消息（单行追加）
+                    async with AsyncSessionLocal() as message_db:
+                        await append_message(message_db, session_pk, "user", prompt)
+                        await message_db.commit()
+
                     # 提交Celery任务
                     task = execute_agent_task.delay(
                         prompt=prompt,
@@ -125,8 +459,8 @@ async def websocket_endpoint(
                         user_id
                     )
 
-                    # TODO: 轮询任务状态并推送更新
-                    # 或者使用Celery的事件系统实时推送
+                    # 任务进度、输出片段和完成事件由Celery任务发布到
+                    # Redis会话频道，经事件监听转发给本会话的连接
 
                 elif message_type == 'ping':
                     # 心跳检测
@@ -145,10 +479,10 @@ async def websocket_endpoint(
                 )
 
     except WebSocketDisconnect:
-        manager.disconnect(session_id, user_id)
+        manager.disconnect(connection)
         logger.info(f"WebSocket disconnected normally: session={session_id}")
 
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        manager.disconnect(session_id, user_id)
+        manager.disconnect(connection)
         await websocket.close(code=4000, reason=str(e))
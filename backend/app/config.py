@@ -2,7 +2,7 @@
 配置管理（使用环境变量）
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 
@@ -17,6 +17,13 @@ class Settings(BaseSettings):
     
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
+
+    # WebSocket配置
+    # 多worker/多节点部署时开启，通过Redis pub/sub转发广播和个人消息
+    WS_DISTRIBUTED: bool = False
+    # 每个连接的发送队列长度；溢出策略: drop_oldest 或 disconnect
+    WS_SEND_QUEUE_SIZE: int = 100
+    WS_SLOW_CONSUMER_POLICY: str = "disconnect"
     
     # JWT配置（必须通过环境变量设置）
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")  # 不提供默认值，强制从环境变量读取
@@ -28,8 +35,88 @@ class Settings(BaseSettings):
     
     # opencode配置
     OPENCODE_CLI_PATH: str = "opencode"
+    # 常驻进程池（实验性，默认关闭，每条消息单独启动opencode进程）
+    # worker命令是实现 app/utils/opencode_sidecar.py 中协议约定的适配程序，不是opencode CLI本身
+    OPENCODE_POOL_EXPERIMENTAL: bool = False
+    OPENCODE_POOL_SIZE: int = 0
+    OPENCODE_POOL_MAX_USES: int = 100
+    OPENCODE_POOL_WORKER_COMMAND: List[str] = []
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+    # 断点续传上传配置
+    RESUMABLE_MAX_FILE_SIZE: int = 5 * 1024 * 1024 * 1024  # 5GB
+    RESUMABLE_CHUNK_SIZE: int = 8 * 1024 * 1024  # 建议分块大小 8MB
+    RESUMABLE_UPLOAD_EXPIRE_HOURS: int = 24
+    RESUMABLE_CHUNK_LEASE_SECONDS: int = 600  # 单个分块写入或完成操作的最长时间
+    # 过期未完成的上传标记为 expired 并删除临时文件
+    UPLOAD_EXPIRE_INTERVAL_SECONDS: int = 3600
+    UPLOAD_EXPIRE_BATCH_SIZE: int = 500
+
+    # 文件存储后端（local / s3）
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO等S3兼容服务的地址
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_PREFIX: str = ""
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+
+    # 文件下载配置
+    DOWNLOAD_URL_EXPIRE_SECONDS: int = 300  # 签名URL默认有效期
+    DOWNLOAD_URL_MAX_EXPIRE_SECONDS: int = 3600
+    # 下载卸载方式：空（应用发送）/ x-accel（nginx）/ x-sendfile（Apache等）
+    # 使用对象存储时任一非空值都会跳转到存储的临时URL
+    DOWNLOAD_OFFLOAD: str = ""
+    DOWNLOAD_ACCEL_PREFIX: str = "/protected-uploads"
+    EXPORT_MAX_FILES: int = 1000  # 单次ZIP导出的文件数上限
+
+    # 派生元数据（按顺序执行的阶段，见 app.utils.file_metadata）
+    FILE_METADATA_STAGES: List[str] = ["text", "image"]
+    FILE_METADATA_EXCERPT_CHARS: int = 4096  # 文本摘录的最大字符数
+    # 重新提交未完成、失败或处理中断的计算
+    FILE_METADATA_RETRY_INTERVAL_SECONDS: int = 300
+    FILE_METADATA_RETRY_SECONDS: int = 900  # pending/failed 状态保持超过该时间才重试
+    FILE_METADATA_MAX_ATTEMPTS: int = 5  # 失败后自动重试的次数上限（再次上传仍会触发）
+    FILE_METADATA_RETRY_BATCH_SIZE: int = 200
+
+    # 文本预览（按行或按字节读取，不读取整个文件）
+    PREVIEW_DEFAULT_LINES: int = 200
+    PREVIEW_MAX_LINES: int = 2000
+    PREVIEW_MAX_BYTES: int = 1024 * 1024  # 单次预览返回的最大字节数
+    PREVIEW_LINE_INDEX_CACHE_SIZE: int = 256  # 进程内缓存的行索引数量
+
+    # 公开技能目录缓存（公开技能变化时通过版本号失效）
+    SKILL_CATALOG_CACHE_TTL: int = 300
+
+    # 写后计数器（use_count 等先在Redis累加，定期批量写回）
+    COUNTER_FLUSH_INTERVAL_SECONDS: int = 30
+    COUNTER_FLUSH_BATCH_SIZE: int = 500
+    COUNTER_FLUSH_LOCK_SECONDS: int = 300
+    COUNTER_FLUSH_RECORD_RETENTION_SECONDS: int = 7 * 86400  # 写回记录保留时间
+
+    # 存储配额（用户未单独设置时的默认值，0表示不限）
+    DEFAULT_STORAGE_QUOTA: int = 10 * 1024 * 1024 * 1024  # 10GB
+    STORAGE_USAGE_CACHE_TTL: int = 300  # 用量缓存秒数
+
+    # 内容块回收配置（引用归零后保留宽限期再删除）
+    BLOB_GC_INTERVAL_SECONDS: int = 3600
+    BLOB_GC_GRACE_SECONDS: int = 3600
+    BLOB_GC_BATCH_SIZE: int = 500
+    # 迁移前按用户存放的内容块移动到 blobs/ 下（每批数量）
+    BLOB_RELOCATE_INTERVAL_SECONDS: int = 600
+    BLOB_RELOCATE_BATCH_SIZE: int = 100
+
+    # 存储对账配置（每次运行处理部分分片，删除限速）
+    RECONCILE_INTERVAL_SECONDS: int = 3600
+    RECONCILE_GRACE_SECONDS: int = 86400  # 比该时间新的文件不视为孤儿
+    RECONCILE_SHARDS_PER_RUN: int = 16  # 内容块分片共256个
+    RECONCILE_USERS_PER_RUN: int = 50
+    RECONCILE_BATCH_SIZE: int = 500
+    RECONCILE_DELETE_ORPHANS: bool = True  # False时只报告不删除
+    RECONCILE_MAX_DELETES_PER_RUN: int = 1000
+    RECONCILE_DELETES_PER_SECOND: float = 50
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,95 @@
+"""
+会话事件模块
+
+Celery任务通过Redis pub/sub发布会话事件（进度、输出片段、完成），
+WebSocket层订阅后转发给客户端，无需轮询Celery结果后端
+"""
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from app.core.redis import get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+# 会话事件频道前缀
+SESSION_CHANNEL_PREFIX = "session:"
+SESSION_CHANNEL_SUFFIX = ":events"
+# 订阅所有会话事件的模式
+SESSION_CHANNEL_PATTERN = f"{SESSION_CHANNEL_PREFIX}*{SESSION_CHANNEL_SUFFIX}"
+
+# WebSocket跨进程转发频道（ConnectionManager分布式模式使用）
+WS_CHANNEL_PREFIX = "ws:session:"
+WS_CHANNEL_PATTERN = f"{WS_CHANNEL_PREFIX}*"
+
+
+def session_channel(session_id: Any) -> str:
+    """
+    获取会话事件频道名
+
+    Args:
+        session_id: 会话ID
+
+    Returns:
+        str: 频道名
+    """
+    return f"{SESSION_CHANNEL_PREFIX}{session_id}{SESSION_CHANNEL_SUFFIX}"
+
+
+def parse_session_channel(channel: str) -> Optional[str]:
+    """
+    从频道名解析会话ID
+
+    Args:
+        channel: 频道名
+
+    Returns:
+        Optional[str]: 会话ID，不是会话事件频道时返回None
+    """
+    if channel.startswith(SESSION_CHANNEL_PREFIX) and channel.endswith(SESSION_CHANNEL_SUFFIX):
+        return channel[len(SESSION_CHANNEL_PREFIX):-len(SESSION_CHANNEL_SUFFIX)]
+    return None
+
+
+def ws_channel(session_id: Any) -> str:
+    """
+    获取WebSocket跨进程转发频道名
+
+    Args:
+        session_id: 会话ID
+
+    Returns:
+        str: 频道名
+    """
+    return f"{WS_CHANNEL_PREFIX}{session_id}"
+
+
+def parse_ws_channel(channel: str) -> Optional[str]:
+    """
+    从WebSocket转发频道名解析会话ID
+
+    Args:
+        channel: 频道名
+
+    Returns:
+        Optional[str]: 会话ID，不是转发频道时返回None
+    """
+    if channel.startswith(WS_CHANNEL_PREFIX):
+        return channel[len(WS_CHANNEL_PREFIX):]
+    return None
+
+
+def publish_session_event(session_id: Any, event: Dict[str, Any]) -> None:
+    """
+    发布会话事件（同步，供Celery任务调用）
+
+    发布失败只记录日志，不影响任务执行
+
+    Args:
+        session_id: 会话ID
+        event: 事件内容，必须包含type字段
+    """
+    try:
+        get_sync_redis().publish(session_channel(session_id), json.dumps(event, ensure_ascii=False))
+    except Exception as e:
+        logger.warning(f"Failed to publish session event: session={session_id}, error={e}")
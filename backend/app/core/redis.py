@@ -0,0 +1,48 @@
+"""
+Redis客户端模块
+
+提供进程内共享的异步/同步Redis客户端
+"""
+from typing import Optional
+
+import redis
+from redis import asyncio as aioredis
+
+from app.config import settings
+
+_async_client: Optional[aioredis.Redis] = None
+_sync_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    """
+    获取异步Redis客户端（FastAPI进程使用）
+
+    Returns:
+        aioredis.Redis: 共享的异步客户端
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _async_client
+
+
+def get_sync_redis() -> redis.Redis:
+    """
+    获取同步Redis客户端（Celery worker使用）
+
+    Returns:
+        redis.Redis: 共享的同步客户端
+    """
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _sync_client
+
+
+async def close_redis() -> None:
+    """关闭异步Redis客户端"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
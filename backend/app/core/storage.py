@@ -0,0 +1,437 @@
+"""
+文件存储后端
+
+上传内容通过统一的存储接口读写，API节点不再依赖共享的本地目录：
+- local：本地磁盘（默认），对象键映射为 UPLOAD_DIR 下的相对路径
+- s3：S3兼容对象存储（AWS S3 / MinIO 等），需要安装 boto3
+
+对象键形如 "blobs/ab/cd/<sha256>"；历史记录中的绝对路径在本地后端下仍可直接使用。
+boto3 为同步客户端，所有调用都放到线程池执行，不阻塞事件循环
+"""
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, NamedTuple, Optional
+from urllib.parse import quote
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.file_storage import (
+    UPLOAD_CHUNK_SIZE,
+    iter_file_range,
+    move_into_place,
+    remove_file
+)
+
+# 本地存储根目录（同时用作上传临时文件目录）
+UPLOAD_DIR = os.path.join(getattr(settings, 'BASE_DIR', '/tmp'), 'uploads')
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+
+class StoredObject(NamedTuple):
+    """存储对象的元信息"""
+    size: int
+    modified: datetime
+
+
+class ListedObject(NamedTuple):
+    """列举得到的存储对象"""
+    key: str
+    size: int
+    modified: datetime
+
+
+class StorageBackend(ABC):
+    """存储后端接口"""
+
+    @abstractmethod
+    async def put_file(self, key: str, source_path: str) -> None:
+        """
+        把已写完的本地文件存入存储（成功后源文件不再存在）
+
+        Args:
+            key: 对象键
+            source_path: 本地文件路径
+        """
+
+    @abstractmethod
+    async def put_stream(self, key: str, stream: AsyncIterator[bytes]) -> int:
+        """
+        流式写入对象（大对象分段上传）
+
+        Args:
+            key: 对象键
+            stream: 数据块异步迭代器
+
+        Returns:
+            int: 写入的字节数
+        """
+
+    @abstractmethod
+    def open_range(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        分块读取对象的闭区间 [start, end]
+
+        Args:
+            key: 对象键
+            start: 起始偏移
+            end: 结束偏移（包含），None表示读到末尾
+
+        Returns:
+            AsyncIterator[bytes]: 数据块异步迭代器
+        """
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        """
+        查询对象元信息
+
+        Args:
+            key: 对象键
+
+        Returns:
+            Optional[StoredObject]: 元信息，对象不存在时返回None
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """
+        删除对象（不存在时忽略）
+
+        Args:
+            key: 对象键
+        """
+
+    @abstractmethod
+    def list_keys(self, prefix: str) -> AsyncIterator[ListedObject]:
+        """
+        列举键以 prefix 开头的对象（用于对账，不保证顺序）
+
+        Args:
+            prefix: 键前缀，如 "blobs/ab/"
+
+        Returns:
+            AsyncIterator[ListedObject]: 对象异步迭代器
+        """
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        对象对应的本地文件路径（可直接用 sendfile 发送），远程存储返回None
+
+        Args:
+            key: 对象键
+
+        Returns:
+            Optional[str]: 本地路径
+        """
+        return None
+
+    def presigned_url(self, key: str, expires_in: int, filename: str, media_type: str) -> Optional[str]:
+        """
+        生成可直接从存储下载对象的临时URL，不支持时返回None
+
+        Args:
+            key: 对象键
+            expires_in: 有效期（秒）
+            filename: 下载文件名
+            media_type: Content-Type
+
+        Returns:
+            Optional[str]: 临时URL
+        """
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """本地磁盘存储"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        """
+        对象键转换为本地路径
+
+        历史记录中的绝对路径同样允许，但和相对键一样必须位于存储根目录下
+        """
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+    async def put_file(self, key: str, source_path: str) -> None:
+        path = self._path(key)
+        await run_in_threadpool(os.makedirs, os.path.dirname(path), exist_ok=True)
+        await move_into_place(source_path, path)
+
+    async def put_stream(self, key: str, stream: AsyncIterator[bytes]) -> int:
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        await run_in_threadpool(os.makedirs, directory, exist_ok=True)
+        fd, temp_path = await run_in_threadpool(tempfile.mkstemp, dir=directory, suffix=".part")
+        written = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                async for chunk in stream:
+                    await run_in_threadpool(out.write, chunk)
+                    written += len(chunk)
+                await run_in_threadpool(out.flush)
+                await run_in_threadpool(os.fsync, out.fileno())
+            await move_into_place(temp_path, path)
+        except BaseException:
+            await remove_file(temp_path)
+            raise
+        return written
+
+    async def open_range(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        path = self._path(key)
+        if end is None:
+            end = (await run_in_threadpool(os.path.getsize, path)) - 1
+        async for block in iter_file_range(path, start, end):
+            yield block
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            st = await run_in_threadpool(os.stat, self._path(key))
+        except FileNotFoundError:
+            return None
+        return StoredObject(
+            size=st.st_size,
+            modified=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+        )
+
+    async def delete(self, key: str) -> None:
+        await remove_file(self._path(key))
+
+    def _scan(self, prefix: str) -> List[ListedObject]:
+        directory = self._path(prefix)
+        listed = []
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                listed.append(ListedObject(
+                    key=os.path.relpath(path, self.root).replace(os.sep, "/"),
+                    size=st.st_size,
+                    modified=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+                ))
+        return listed
+
+    async def list_keys(self, prefix: str) -> AsyncIterator[ListedObject]:
+        # 按前缀（目录）整体扫描，调用方按分片控制单次规模
+        for listed in await run_in_threadpool(self._scan, prefix):
+            yield listed
+
+
+class S3Storage(StorageBackend):
+    """S3兼容对象存储"""
+
+    # S3要求除最后一段外每段至少5MB
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        prefix: str = "",
+        part_size: int = 8 * 1024 * 1024
+    ):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError as e:
+            raise RuntimeError("boto3 is required for the s3 storage backend") from e
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.part_size,
+            multipart_chunksize=self.part_size
+        )
+
+    def _key(self, key: str) -> str:
+        """加上对象键前缀"""
+        key = key.lstrip("/")
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _is_missing(self, error: Exception) -> bool:
+        """判断是否为对象不存在错误"""
+        response = getattr(error, "response", None) or {}
+        code = str(response.get("Error", {}).get("Code", ""))
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def presigned_url(self, key: str, expires_in: int, filename: str, media_type: str) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentType": media_type,
+                "ResponseContentDisposition": f"attachment; filename*=utf-8''{quote(filename)}"
+            },
+            ExpiresIn=expires_in
+        )
+
+    async def put_file(self, key: str, source_path: str) -> None:
+        # upload_file 超过阈值时自动分段并发上传
+        await run_in_threadpool(
+            self.client.upload_file,
+            source_path,
+            self.bucket,
+            self._key(key),
+            Config=self.transfer_config
+        )
+        await remove_file(source_path)
+
+    async def put_stream(self, key: str, stream: AsyncIterator[bytes]) -> int:
+        object_key = self._key(key)
+        upload = await run_in_threadpool(
+            self.client.create_multipart_upload,
+            Bucket=self.bucket,
+            Key=object_key
+        )
+        upload_id = upload["UploadId"]
+        parts = []
+        buffer = bytearray()
+        written = 0
+
+        async def flush_part() -> None:
+            part_number = len(parts) + 1
+            result = await run_in_threadpool(
+                self.client.upload_part,
+                Bucket=self.bucket,
+                Key=object_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=bytes(buffer)
+            )
+            parts.append({"ETag": result["ETag"], "PartNumber": part_number})
+            buffer.clear()
+
+        try:
+            async for chunk in stream:
+                buffer.extend(chunk)
+                written += len(chunk)
+                if len(buffer) >= self.part_size:
+                    await flush_part()
+            # 最后一段可以小于5MB；空对象也需要一段
+            if buffer or not parts:
+                await flush_part()
+            await run_in_threadpool(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            await run_in_threadpool(
+                self.client.abort_multipart_upload,
+                Bucket=self.bucket,
+                Key=object_key,
+                UploadId=upload_id
+            )
+            raise
+        return written
+
+    async def open_range(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        # 读取整个对象时不发送Range：空对象上的 "bytes=0-" 会返回416
+        if end is not None:
+            params["Range"] = f"bytes={start}-{end}"
+        elif start > 0:
+            params["Range"] = f"bytes={start}-"
+        response = await run_in_threadpool(self.client.get_object, **params)
+        body = response["Body"]
+        try:
+            while True:
+                block = await run_in_threadpool(body.read, UPLOAD_CHUNK_SIZE)
+                if not block:
+                    break
+                yield block
+        finally:
+            body.close()
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            response = await run_in_threadpool(
+                self.client.head_object,
+                Bucket=self.bucket,
+                Key=self._key(key)
+            )
+        except Exception as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return StoredObject(
+            size=response["ContentLength"],
+            modified=response["LastModified"]
+        )
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(
+            self.client.delete_object,
+            Bucket=self.bucket,
+            Key=self._key(key)
+        )
+
+    async def list_keys(self, prefix: str) -> AsyncIterator[ListedObject]:
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        kwargs = {"Bucket": self.bucket, "Prefix": self._key(prefix)}
+        while True:
+            page = await run_in_threadpool(self.client.list_objects_v2, **kwargs)
+            for item in page.get("Contents", []):
+                yield ListedObject(
+                    key=item["Key"][strip:],
+                    size=item["Size"],
+                    modified=item["LastModified"]
+                )
+            if not page.get("IsTruncated"):
+                break
+            kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    获取当前进程的存储后端（由 STORAGE_BACKEND 配置选择）
+
+    Returns:
+        StorageBackend: 共享的存储后端实例
+    """
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "s3":
+            _storage = S3Storage(
+                bucket=settings.S3_BUCKET,
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                region=settings.S3_REGION,
+                access_key_id=settings.S3_ACCESS_KEY_ID,
+                secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+                prefix=settings.S3_PREFIX,
+                part_size=settings.S3_MULTIPART_CHUNK_SIZE
+            )
+        else:
+            _storage = LocalStorage(UPLOAD_DIR)
+    return _storage
@@ -65,6 +65,19 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def dialect_name(db: AsyncSession) -> str:
+    """
+    获取会话所连接数据库的方言名
+
+    Args:
+        db: 数据库会话
+
+    Returns:
+        str: 方言名（postgresql / sqlite 等）
+    """
+    return db.get_bind().dialect.name
+
+
 async def init_db() -> None:
     """初始化数据库（创建所有表）"""
     async with engine.begin() as conn:
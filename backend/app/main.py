@@ -5,6 +5,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.database import init_db, close_db
+from app.core.redis import close_redis
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -20,6 +21,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -32,6 +34,8 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭事件"""
+    await websocket.manager.stop_event_listener()
+    await close_redis()
     await close_db()
 
 
@@ -47,12 +51,13 @@ async def health_check():
     return {"status": "healthy"}
 
 # TODO: 添加API路由
-from app.api import auth, users, sessions, skills, apps, websocket, files
+from app.api import auth, users, sessions, skills, apps, websocket, files, uploads
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(sessions.router, prefix="/api/sessions", tags=["sessions"])
 app.include_router(skills.router, prefix="/api/skills", tags=["skills"])
 app.include_router(apps.router, prefix="/api/apps", tags=["apps"])
+app.include_router(uploads.router, prefix="/api/files/uploads", tags=["files"])
 app.include_router(files.router, prefix="/api/files", tags=["files"])
 app.include_router(websocket.router, tags=["websocket"])
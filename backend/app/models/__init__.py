@@ -3,8 +3,13 @@ SQLAlchemy数据模型
 """
 from app.models.user import User
 from app.models.session import Session
+from app.models.session_message import SessionMessage
 from app.models.skill import Skill
+from app.models.skill_tag import SkillTag
 from app.models.app import App
 from app.models.file import File
+from app.models.file_blob import FileBlob
+from app.models.upload_session import UploadSession
+from app.models.counter_flush import CounterFlush
 
-__all__ = ["User", "Session", "Skill", "App", "File"]
+__all__ = ["User", "Session", "SessionMessage", "Skill", "SkillTag", "App", "File", "FileBlob", "UploadSession", "CounterFlush"]
@@ -3,7 +3,7 @@
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import String, Text, DateTime, ForeignKey, JSON, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -16,6 +16,14 @@ class App(Base):
     存储用户创建的应用
     """
     __tablename__ = "apps"
+    __table_args__ = (
+        # slug 前缀查询（LIKE 'base-%'，PostgreSQL 需要 pattern_ops 索引）
+        Index(
+            "ix_apps_slug_pattern",
+            "slug",
+            postgresql_ops={"slug": "varchar_pattern_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
@@ -76,7 +84,8 @@ class App(Base):
     
     # 元数据
     tags: Mapped[Optional[list]] = mapped_column(JSON, default=list)
-    metadata: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    # metadata 是 Declarative 保留属性名，列名保持不变
+    app_metadata: Mapped[Optional[dict]] = mapped_column("metadata", JSON, default=dict)
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
@@ -0,0 +1,34 @@
+"""
+计数器写回记录数据模型
+"""
+from datetime import datetime
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class CounterFlush(Base):
+    """
+    已写回数据库的计数增量批次
+
+    与计数更新在同一事务中插入：写回中断后重新写回同一批增量时据此跳过，
+    读取时据此判断Redis中的增量是否已包含在数据库的值中
+    """
+    __tablename__ = "counter_flushes"
+
+    flush_id: Mapped[str] = mapped_column(
+        String(36),
+        primary_key=True,
+        comment="增量批次ID（记录在Redis计数哈希中）"
+    )
+    table_name: Mapped[str] = mapped_column(String(50), nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+        index=True
+    )
+
+    def __repr__(self) -> str:
+        return f"<CounterFlush(flush_id={self.flush_id}, table={self.table_name})>"
@@ -3,10 +3,11 @@
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, DateTime, ForeignKey, BigInteger, JSON
+from sqlalchemy import String, Text, DateTime, ForeignKey, BigInteger, JSON, Index, DDL, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
+from app.utils.file_metadata import enabled_stages
 
 
 class File(Base):
@@ -16,6 +17,17 @@ class File(Base):
     存储用户上传的文件信息
     """
     __tablename__ = "files"
+    __table_args__ = (
+        # 文件列表游标分页
+        Index("ix_files_user_id_created_at_id", "user_id", "created_at", "id"),
+        # 文件名子串/模糊搜索（pg_trgm 三元组索引，仅PostgreSQL）
+        Index(
+            "ix_files_filename_trgm",
+            "filename",
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
@@ -41,7 +53,7 @@ class File(Base):
     file_path: Mapped[str] = mapped_column(
         String(500),
         nullable=False,
-        comment="文件存储路径"
+        comment="文件存储路径（内容块路径）"
     )
     file_size: Mapped[int] = mapped_column(
         BigInteger,
@@ -53,13 +65,21 @@ class File(Base):
         nullable=False,
         comment="MIME类型"
     )
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        ForeignKey("file_blobs.sha256"),
+        index=True,
+        comment="内容SHA-256，引用 file_blobs"
+    )
     
     # 元数据
     description: Mapped[Optional[str]] = mapped_column(
         Text,
         comment="文件描述"
     )
-    metadata: Mapped[Optional[dict]] = mapped_column(
+    # metadata 是 Declarative 保留属性名，列名保持不变
+    file_metadata: Mapped[Optional[dict]] = mapped_column(
+        "metadata",
         JSON,
         default=dict,
         comment="文件元数据"
@@ -80,6 +100,37 @@ class File(Base):
     
     # 关系
     user = relationship("User", back_populates="files")
+    # 内容块（派生元数据在内容块上）；需要时显式加载，列表等查询不会顺带加载
+    blob = relationship("FileBlob", lazy="raise", viewonly=True)
+    
+    @property
+    def metadata_status(self) -> Optional[str]:
+        """派生元数据状态（旧文件没有内容块时为None）"""
+        return self.blob.metadata_status if self.blob else None
+    
+    @property
+    def derived_metadata(self) -> Optional[dict]:
+        """派生元数据"""
+        return self.blob.derived_metadata if self.blob else None
+    
+    @property
+    def metadata_progress(self) -> Optional[float]:
+        """已完成的元数据阶段比例（0-1）"""
+        if not self.blob:
+            return None
+        stages = enabled_stages()
+        if not stages:
+            return 1.0
+        done = self.blob.derived_metadata or {}
+        return sum(1 for name in stages if name in done) / len(stages)
     
     def __repr__(self) -> str:
         return f"<File(id={self.id}, filename={self.filename}, size={self.file_size})>"
+
+
+# create_all 建表前确保 pg_trgm 扩展存在（迁移中同样会创建）
+event.listen(
+    File.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
@@ -0,0 +1,87 @@
+"""
+文件内容块数据模型
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, DateTime, BigInteger, Integer, Text, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class FileBlob(Base):
+    """
+    内容寻址的文件内容块
+    
+    以SHA-256为主键，相同内容只存储一份；
+    每个引用它的 File 记录计入 ref_count，引用数归零后由回收任务删除
+    """
+    __tablename__ = "file_blobs"
+    
+    sha256: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+        comment="内容SHA-256（十六进制）"
+    )
+    size: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        comment="内容大小（字节）"
+    )
+    storage_path: Mapped[str] = mapped_column(
+        String(500),
+        nullable=False,
+        comment="内容存储路径"
+    )
+    ref_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+        index=True,
+        comment="引用该内容的文件记录数"
+    )
+    
+    # 派生元数据（按内容计算一次，见 app.utils.file_metadata）
+    derived_metadata: Mapped[Optional[dict]] = mapped_column(
+        JSON,
+        default=dict,
+        comment="各阶段计算结果，键为阶段名"
+    )
+    metadata_status: Mapped[str] = mapped_column(
+        String(20),
+        default="pending",
+        nullable=False,
+        index=True,
+        comment="pending / processing / ready / failed"
+    )
+    metadata_error: Mapped[Optional[str]] = mapped_column(
+        Text,
+        comment="元数据计算失败原因"
+    )
+    metadata_attempts: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="元数据计算的尝试次数"
+    )
+    metadata_updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        comment="元数据状态最近变化时间（updated_at 只随引用变化）"
+    )
+    
+    # 时间戳
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="最近一次引用变化时间"
+    )
+    
+    def __repr__(self) -> str:
+        return f"<FileBlob(sha256={self.sha256}, size={self.size}, refs={self.ref_count})>"
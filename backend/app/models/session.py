@@ -3,7 +3,7 @@
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, DateTime, ForeignKey, Integer, JSON
+from sqlalchemy import String, Text, DateTime, ForeignKey, Integer, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -16,6 +16,10 @@ class Session(Base):
     存储OpenCode会话信息
     """
     __tablename__ = "sessions"
+    __table_args__ = (
+        # 会话列表游标分页
+        Index("ix_sessions_user_id_updated_at_id", "user_id", "updated_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
@@ -52,18 +56,17 @@ class Session(Base):
         default=dict,
         comment="会话上下文信息"
     )
-    messages: Mapped[Optional[list]] = mapped_column(
-        JSON,
-        default=list,
-        comment="消息历史"
-    )
     
-    # 统计信息
-    total_messages: Mapped[int] = mapped_column(Integer, default=0)
+    # 统计信息（消息历史存储在 session_messages 表）
+    total_messages: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        comment="消息数，同时是最后一条消息的seq"
+    )
     total_tokens: Mapped[int] = mapped_column(Integer, default=0)
     
-    # 元数据
-    metadata: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    # 元数据（metadata 是 Declarative 保留属性名，列名保持不变）
+    session_metadata: Mapped[Optional[dict]] = mapped_column("metadata", JSON, default=dict)
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
@@ -0,0 +1,53 @@
+"""
+会话消息数据模型
+"""
+from datetime import datetime
+from sqlalchemy import String, Text, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SessionMessage(Base):
+    """
+    会话消息模型
+    
+    只追加写入的会话消息历史，每条消息一行，
+    seq 为会话内从1开始递增的序号
+    """
+    __tablename__ = "session_messages"
+    __table_args__ = (
+        UniqueConstraint("session_id", "seq"),
+    )
+    
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    
+    # 关联会话
+    session_id: Mapped[int] = mapped_column(
+        ForeignKey("sessions.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    seq: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="会话内消息序号"
+    )
+    
+    # 消息内容
+    role: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        comment="user, assistant, system"
+    )
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    tokens: Mapped[int] = mapped_column(Integer, default=0)
+    
+    # 时间戳
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+    
+    def __repr__(self) -> str:
+        return f"<SessionMessage(session_id={self.session_id}, seq={self.seq}, role={self.role})>"
@@ -3,7 +3,7 @@
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import String, Text, DateTime, ForeignKey, JSON, Boolean, Index, DDL, event, literal_column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -16,6 +16,16 @@ class Skill(Base):
     存储用户自定义技能
     """
     __tablename__ = "skills"
+    __table_args__ = (
+        # 技能列表游标分页
+        Index("ix_skills_created_at_id", "created_at", "id"),
+        # slug 前缀查询（LIKE 'base-%'，PostgreSQL 需要 pattern_ops 索引）
+        Index(
+            "ix_skills_slug_pattern",
+            "slug",
+            postgresql_ops={"slug": "varchar_pattern_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
@@ -72,7 +82,8 @@ class Skill(Base):
     
     # 元数据
     tags: Mapped[Optional[list]] = mapped_column(JSON, default=list)
-    metadata: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
+    # metadata 是 Declarative 保留属性名，列名保持不变
+    skill_metadata: Mapped[Optional[dict]] = mapped_column("metadata", JSON, default=dict)
     
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
@@ -92,3 +103,31 @@ class Skill(Base):
     
     def __repr__(self) -> str:
         return f"<Skill(id={self.id}, name={self.name}, slug={self.slug})>"
+
+
+# 全文检索向量（仅PostgreSQL）：名称、描述、提示词模板分别加权 A/B/C，
+# 由数据库生成列自动维护，不映射到ORM属性，避免查询技能时读取
+SKILL_SEARCH_CONFIG = "simple"
+SKILL_SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SKILL_SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SKILL_SEARCH_CONFIG}', coalesce(description, '')), 'B') || "
+    f"setweight(to_tsvector('{SKILL_SEARCH_CONFIG}', coalesce(prompt_template, '')), 'C')"
+)
+skill_search_vector = literal_column("skills.search_vector")
+
+# create_all 建表后添加生成列和 GIN 索引（迁移 010 中同样会创建）
+event.listen(
+    Skill.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE skills ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SKILL_SEARCH_VECTOR_SQL}) STORED"
+    ).execute_if(dialect="postgresql")
+)
+event.listen(
+    Skill.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS ix_skills_search_vector ON skills USING gin (search_vector)"
+    ).execute_if(dialect="postgresql")
+)
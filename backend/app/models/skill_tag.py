@@ -0,0 +1,30 @@
+"""
+技能标签数据模型
+"""
+from sqlalchemy import String, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SkillTag(Base):
+    """
+    技能标签（规范化）
+
+    skills.tags（JSON）仍用于返回给前端，本表在创建/更新技能时同步写入，
+    用于可走索引的标签过滤和标签分面统计
+    """
+    __tablename__ = "skill_tags"
+    __table_args__ = (
+        # 按标签查找技能、按标签分组计数
+        Index("ix_skill_tags_tag_skill_id", "tag", "skill_id"),
+    )
+
+    skill_id: Mapped[int] = mapped_column(
+        ForeignKey("skills.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    tag: Mapped[str] = mapped_column(String(100), primary_key=True)
+
+    def __repr__(self) -> str:
+        return f"<SkillTag(skill_id={self.skill_id}, tag={self.tag})>"
@@ -0,0 +1,102 @@
+"""
+断点续传上传会话数据模型
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Text, DateTime, ForeignKey, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class UploadSession(Base):
+    """
+    上传会话模型
+    
+    记录可续传上传的进度，分块数据写入临时文件，
+    worker重启后可根据 received_bytes 继续上传
+    """
+    __tablename__ = "upload_sessions"
+    
+    id: Mapped[str] = mapped_column(
+        String(36),
+        primary_key=True,
+        comment="上传ID（UUID）"
+    )
+    
+    # 关联用户
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    
+    # 目标文件信息
+    filename: Mapped[str] = mapped_column(
+        String(255),
+        nullable=False,
+        comment="原始文件名"
+    )
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    total_size: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        comment="文件总大小（字节）"
+    )
+    
+    # 上传进度
+    received_bytes: Mapped[int] = mapped_column(
+        BigInteger,
+        default=0,
+        nullable=False,
+        comment="已确认接收的字节数（下一个分块的偏移量）"
+    )
+    temp_path: Mapped[str] = mapped_column(
+        String(500),
+        nullable=False,
+        comment="分块数据临时文件路径"
+    )
+    status: Mapped[str] = mapped_column(
+        String(20),
+        default="uploading",
+        nullable=False,
+        comment="uploading, completing, completed, aborted, expired"
+    )
+    # 写入租约：分块写入和完成操作期间不持有行锁，由租约保证同一时刻只有一个请求在写
+    writer_token: Mapped[Optional[str]] = mapped_column(
+        String(36),
+        comment="当前分块写入或完成操作的租约令牌"
+    )
+    writer_expires_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        comment="租约过期时间，过期后其他请求可以接管"
+    )
+    file_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("files.id", ondelete="SET NULL"),
+        comment="完成后生成的文件ID"
+    )
+    
+    # 时间戳
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        index=True,
+        comment="过期时间，过期未完成的上传会被清理"
+    )
+    
+    def __repr__(self) -> str:
+        return (
+            f"<UploadSession(id={self.id}, filename={self.filename}, "
+            f"received={self.received_bytes}/{self.total_size})>"
+        )
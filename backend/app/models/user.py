@@ -3,7 +3,7 @@
 """
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import String, Boolean, DateTime, Text, JSON
+from sqlalchemy import String, Boolean, DateTime, Text, JSON, BigInteger
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -49,6 +49,19 @@ class User(Base):
     # 配置
     settings: Mapped[Optional[dict]] = mapped_column(JSON, default=dict)
     
+    # 存储配额（由 app.utils.storage_quota 维护）
+    storage_used: Mapped[int] = mapped_column(
+        BigInteger,
+        default=0,
+        nullable=False,
+        comment="已用存储空间（字节）"
+    )
+    storage_quota: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
+        nullable=True,
+        comment="存储配额（字节），为空时使用默认配额，0表示不限"
+    )
+    
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
@@ -1,16 +1,22 @@
 """
 Pydantic schemas
 """
-from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserLogin
+from app.schemas.user import (
+    UserCreate, UserUpdate, UserResponse, UserLogin,
+    StorageUsageResponse, StorageReconcileResponse
+)
 from app.schemas.session import (
-    SessionCreate, SessionUpdate, SessionResponse,
-    SessionMessage, SessionConfig
+    SessionCreate, SessionUpdate, SessionResponse, SessionSummary,
+    SessionMessage, SessionConfig,
+    SessionMessageResponse, SessionMessageListResponse
 )
 from app.schemas.skill import SkillCreate, SkillUpdate, SkillResponse
 
 __all__ = [
     "UserCreate", "UserUpdate", "UserResponse", "UserLogin",
-    "SessionCreate", "SessionUpdate", "SessionResponse", 
+    "StorageUsageResponse", "StorageReconcileResponse",
+    "SessionCreate", "SessionUpdate", "SessionResponse", "SessionSummary",
     "SessionMessage", "SessionConfig",
+    "SessionMessageResponse", "SessionMessageListResponse",
     "SkillCreate", "SkillUpdate", "SkillResponse"
 ]
@@ -37,6 +37,7 @@ class FileResponse(BaseModel):
     filename: str
     file_size: int
     mime_type: str
+    content_hash: Optional[str] = None
     description: Optional[str] = None
     created_at: datetime
     updated_at: datetime
@@ -44,13 +45,21 @@ class FileResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class FileDetailResponse(FileResponse):
+    """文件详情响应（含派生元数据，列表中不返回）"""
+    metadata_status: Optional[str] = Field(None, description="派生元数据状态：pending / processing / ready / failed")
+    metadata_progress: Optional[float] = Field(None, description="已完成的元数据阶段比例（0-1）")
+    derived_metadata: Optional[dict] = Field(None, description="派生元数据（行数、编码、文本摘录、图片尺寸等）")
+
+
 class FileListResponse(BaseModel):
     """文件列表响应"""
     items: List[FileResponse]
-    total: int
-    page: int
+    total: Optional[int] = Field(None, description="总数（include_total=false时不统计）")
+    page: Optional[int] = Field(None, description="页码（游标分页时为空）")
     page_size: int
     has_more: bool
+    next_cursor: Optional[str] = Field(None, description="下一页游标")
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -59,7 +68,8 @@ class FileListResponse(BaseModel):
                 "total": 10,
                 "page": 1,
                 "page_size": 20,
-                "has_more": False
+                "has_more": False,
+                "next_cursor": None
             }
         }
     )
@@ -71,6 +81,7 @@ class FileUploadResponse(BaseModel):
     filename: str
     file_size: int
     mime_type: str
+    content_hash: Optional[str] = None
     message: str
     
     model_config = ConfigDict(
@@ -84,3 +95,87 @@ class FileUploadResponse(BaseModel):
             }
         }
     )
+
+
+class FileDedupeRequest(BaseModel):
+    """秒传请求（按内容哈希创建文件）"""
+    filename: str = Field(..., min_length=1, max_length=255, description="文件名")
+    sha256: str = Field(..., pattern="^[0-9a-f]{64}$", description="内容SHA-256（小写十六进制）")
+    file_size: int = Field(..., ge=0, description="文件大小（字节）")
+    description: Optional[str] = Field(None, description="文件描述")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "filename": "dataset.zip",
+                "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+                "file_size": 1048576,
+                "description": "Training data"
+            }
+        }
+    )
+
+
+class SignedDownloadURLResponse(BaseModel):
+    """下载签名URL"""
+    url: str = Field(..., description="无需认证的下载地址")
+    expires_at: datetime = Field(..., description="过期时间")
+
+
+class FilePreviewResponse(BaseModel):
+    """文本预览响应模型（行号从1开始）"""
+    file_id: int
+    file_size: int
+    encoding: str
+    start_line: Optional[int] = Field(None, description="第一行的行号，按字节或从末尾读取且行号未知时为空")
+    end_line: Optional[int] = Field(None, description="最后一行的行号")
+    total_lines: Optional[int] = Field(None, description="总行数，尚未扫描到文件末尾时为空")
+    start_byte: int
+    end_byte: int = Field(..., description="结束偏移（不包含）")
+    lines: List[str] = Field(default_factory=list, description="按行读取的内容（不含换行符）")
+    content: Optional[str] = Field(None, description="按字节读取的内容")
+    has_more: bool = Field(..., description="读取范围之后（从末尾读取时为之前）是否还有内容")
+
+
+class UploadSessionCreate(BaseModel):
+    """创建断点续传上传"""
+    filename: str = Field(..., min_length=1, max_length=255, description="文件名")
+    total_size: int = Field(..., ge=0, description="文件总大小（字节）")
+    description: Optional[str] = Field(None, description="文件描述")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "filename": "dataset.zip",
+                "total_size": 1073741824,
+                "description": "Training data"
+            }
+        }
+    )
+
+
+class UploadSessionResponse(BaseModel):
+    """断点续传上传状态"""
+    upload_id: str
+    filename: str
+    total_size: int
+    offset: int = Field(..., description="下一个分块应写入的偏移量")
+    status: str
+    chunk_size: int = Field(..., description="建议的分块大小（字节）")
+    file_id: Optional[int] = None
+    expires_at: datetime
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "upload_id": "0b8f1e52-2f0a-4c47-9d51-5a0f6d3c1a2b",
+                "filename": "dataset.zip",
+                "total_size": 1073741824,
+                "offset": 8388608,
+                "status": "uploading",
+                "chunk_size": 8388608,
+                "file_id": None,
+                "expires_at": "2024-01-02T00:00:00Z"
+            }
+        }
+    )
@@ -83,6 +83,40 @@ class SessionMessage(BaseModel):
     )
 
 
+class SessionMessageResponse(BaseModel):
+    """会话消息响应模型"""
+    seq: int
+    role: str
+    content: str
+    tokens: int = 0
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SessionMessageListResponse(BaseModel):
+    """会话消息分页响应（按seq升序）"""
+    items: List[SessionMessageResponse]
+    has_more: bool
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "items": [
+                    {
+                        "seq": 1,
+                        "role": "user",
+                        "content": "如何写一个快速排序？",
+                        "tokens": 0,
+                        "created_at": "2024-01-01T00:00:00Z"
+                    }
+                ],
+                "has_more": False
+            }
+        }
+    )
+
+
 class SessionResponse(SessionBase):
     """会话响应模型"""
     id: int
@@ -90,7 +124,6 @@ class SessionResponse(SessionBase):
     status: str
     config: Optional[Dict[str, Any]] = None
     context: Optional[Dict[str, Any]] = None
-    messages: Optional[List[Dict[str, Any]]] = []
     total_messages: int = 0
     total_tokens: int = 0
     created_at: datetime
@@ -101,6 +134,20 @@ class SessionResponse(SessionBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SessionSummary(BaseModel):
+    """会话摘要模型（会话列表使用，不含上下文等大字段）"""
+    id: int
+    title: Optional[str] = None
+    status: str
+    model_name: Optional[str] = None
+    total_messages: int = 0
+    total_tokens: int = 0
+    created_at: datetime
+    updated_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
 class SessionListResponse(BaseModel):
     """会话列表响应"""
     items: List[SessionResponse]
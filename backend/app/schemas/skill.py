@@ -2,8 +2,11 @@
 技能相关的Pydantic schemas
 """
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Annotated, Optional, List
+from pydantic import BaseModel, Field, ConfigDict, StringConstraints
+
+# 单个标签（长度与 skill_tags.tag 列一致）
+TagStr = Annotated[str, StringConstraints(strip_whitespace=True, max_length=100)]
 
 
 class SkillBase(BaseModel):
@@ -12,7 +15,7 @@ class SkillBase(BaseModel):
     description: Optional[str] = Field(None, description="技能描述")
     category: Optional[str] = Field(None, max_length=50, description="分类")
     prompt_template: str = Field(..., description="提示词模板")
-    tags: Optional[List[str]] = Field(default=[], description="标签")
+    tags: Optional[List[TagStr]] = Field(default=[], description="标签")
     is_public: bool = Field(default=False, description="是否公开")
 
 
@@ -41,7 +44,7 @@ class SkillUpdate(BaseModel):
     description: Optional[str] = None
     category: Optional[str] = Field(None, max_length=50)
     prompt_template: Optional[str] = None
-    tags: Optional[List[str]] = None
+    tags: Optional[List[TagStr]] = None
     is_public: Optional[bool] = None
     config: Optional[dict] = None
     is_active: Optional[bool] = None
@@ -75,10 +78,11 @@ class SkillResponse(SkillBase):
 class SkillListResponse(BaseModel):
     """技能列表响应"""
     items: List[SkillResponse]
-    total: int
-    page: int
+    total: Optional[int] = Field(None, description="总数（include_total=false时不统计）")
+    page: Optional[int] = Field(None, description="页码（游标分页时为空）")
     page_size: int
     has_more: bool
+    next_cursor: Optional[str] = Field(None, description="下一页游标")
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -87,7 +91,27 @@ class SkillListResponse(BaseModel):
                 "total": 5,
                 "page": 1,
                 "page_size": 20,
-                "has_more": False
+                "has_more": False,
+                "next_cursor": None
             }
         }
     )
+
+
+class SkillCatalogCacheStats(BaseModel):
+    """技能目录缓存命中统计"""
+    hits: int
+    misses: int
+    hit_rate: Optional[float] = Field(None, description="命中率（尚无请求时为空）")
+    version: int = Field(..., description="当前目录版本号（每次公开技能变化加一）")
+
+
+class SkillTagFacet(BaseModel):
+    """标签分面计数"""
+    tag: str
+    count: int
+
+
+class SkillTagFacetsResponse(BaseModel):
+    """标签分面统计响应"""
+    items: List[SkillTagFacet]
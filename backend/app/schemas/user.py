@@ -68,6 +68,18 @@ class UserResponse(UserBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class StorageUsageResponse(BaseModel):
+    """存储用量"""
+    used: int = Field(..., description="已用空间（字节）")
+    quota: int = Field(..., description="配额（字节），0表示不限")
+    available: Optional[int] = Field(None, description="剩余空间（字节），不限时为空")
+
+
+class StorageReconcileResponse(BaseModel):
+    """存储用量对账结果"""
+    corrected_user_ids: List[int] = Field(default_factory=list, description="用量被修正的用户")
+
+
 class UserLogin(BaseModel):
     """用户登录模型"""
     username: str = Field(..., description="用户名或邮箱")
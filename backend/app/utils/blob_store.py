@@ -0,0 +1,140 @@
+"""
+内容寻址的文件内容存储
+
+上传内容按SHA-256存放在存储后端的 blobs/<前2位>/<3-4位>/<sha256>，
+相同内容只保存一份。File 记录通过 content_hash 引用内容块，
+file_blobs.ref_count 记录引用数，删除文件只减少引用，
+引用归零的内容块由回收任务（tasks.file_tasks.collect_unreferenced_blobs）删除。
+
+登记新内容块时先插入（未提交的）记录再存入对象：并发登记同一内容的请求和回收任务
+都会在插入同一主键时等待，因此对象不会在登记过程中被其他请求删除
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.storage import get_storage
+from app.models.file_blob import FileBlob
+from app.utils.file_storage import remove_file
+
+# 内容块目录名（位于 UPLOAD_DIR 下）
+BLOB_DIRNAME = "blobs"
+
+
+def blob_key(sha256: str) -> str:
+    """
+    内容块的对象键（按哈希前缀分两级目录，避免单目录文件过多）
+
+    Args:
+        sha256: 内容SHA-256
+
+    Returns:
+        str: 对象键
+    """
+    return f"{BLOB_DIRNAME}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+class CommittedBlob(NamedTuple):
+    """commit_blob 的结果"""
+    storage_path: str
+    created: bool  # 是否新存入了对象（事务失败时需调用 discard_blob）
+
+
+async def _add_reference(db: AsyncSession, sha256: str) -> Optional[str]:
+    """为已有内容块增加一个引用，返回对象键；内容块不存在时返回None"""
+    result = await db.execute(
+        update(FileBlob)
+        .where(FileBlob.sha256 == sha256)
+        .values(ref_count=FileBlob.ref_count + 1, updated_at=datetime.utcnow())
+        .returning(FileBlob.storage_path)
+    )
+    return result.scalar_one_or_none()
+
+
+async def commit_blob(
+    db: AsyncSession,
+    temp_path: str,
+    sha256: str,
+    size: int
+) -> CommittedBlob:
+    """
+    把临时文件登记为内容块并增加一个引用
+
+    内容已存在时直接丢弃临时文件；否则插入内容块记录并把临时文件存入存储后端。
+    并发上传同一内容时，插入冲突的一方回退为增加引用
+
+    Args:
+        db: 数据库会话（调用方负责提交；提交前失败时先调用 discard_blob 再回滚）
+        temp_path: 已写完的临时文件
+        sha256: 内容SHA-256
+        size: 内容大小
+
+    Returns:
+        CommittedBlob: 内容块对象键，以及是否新存入了对象
+    """
+    storage_path = await _add_reference(db, sha256)
+    if storage_path is not None:
+        await remove_file(temp_path)
+        return CommittedBlob(storage_path, False)
+
+    storage_path = blob_key(sha256)
+    try:
+        async with db.begin_nested():
+            db.add(FileBlob(sha256=sha256, size=size, storage_path=storage_path, ref_count=1))
+    except IntegrityError:
+        # 其他请求刚刚登记了同一内容块
+        await remove_file(temp_path)
+        return CommittedBlob(await _add_reference(db, sha256), False)
+
+    await get_storage().put_file(storage_path, temp_path)
+    return CommittedBlob(storage_path, True)
+
+
+async def discard_blob(blob: Optional[CommittedBlob]) -> None:
+    """
+    删除 commit_blob 新存入的对象（在回滚之前调用）
+
+    未提交的内容块记录仍然阻塞着并发登记同一内容的请求，它们会在回滚后重新存入对象，
+    因此此时删除不会影响其他请求。提交本身失败时记录锁已释放，不再删除，
+    遗留的对象由对账任务（reconcile_storage）清理
+
+    Args:
+        blob: commit_blob 的结果，未调用时为None
+    """
+    if blob is not None and blob.created:
+        await get_storage().delete(blob.storage_path)
+
+
+async def acquire_blob(db: AsyncSession, sha256: str) -> Optional[FileBlob]:
+    """
+    为已有内容块增加一个引用（秒传）
+
+    Args:
+        db: 数据库会话（调用方负责提交）
+        sha256: 内容SHA-256
+
+    Returns:
+        Optional[FileBlob]: 内容块，不存在时返回None
+    """
+    if await _add_reference(db, sha256) is None:
+        return None
+    result = await db.execute(select(FileBlob).where(FileBlob.sha256 == sha256))
+    return result.scalar_one_or_none()
+
+
+async def release_blob(db: AsyncSession, sha256: str) -> None:
+    """
+    释放内容块的一个引用（不删除数据，由回收任务处理）
+
+    Args:
+        db: 数据库会话（调用方负责提交）
+        sha256: 内容SHA-256
+    """
+    await db.execute(
+        update(FileBlob)
+        .where(FileBlob.sha256 == sha256)
+        .values(ref_count=FileBlob.ref_count - 1, updated_at=datetime.utcnow())
+    )
@@ -0,0 +1,181 @@
+"""
+写后计数器（use_count / like_count 等）
+
+计数先在Redis哈希中累加（HINCRBY，字段为 "{id}:{列名}"），
+由 Celery 定时任务（tasks.counter_tasks.flush_counters）把累计的增量批量写回数据库，
+热门技能的计数不再需要逐次读改写和行锁。读取时可把尚未写回的增量合并到数据库中的值上。
+
+每个增量哈希带有一个批次ID（字段 FLUSH_ID_FIELD），写回时与计数更新在同一事务中
+记录到 counter_flushes：重复写回同一批次会被跳过，读取时也据此判断哈希中的增量
+是否已包含在数据库的值中，写回提交到删除哈希之间不会重复计数。
+
+Redis不可用时退化为数据库原子自增（UPDATE ... SET col = col + n）
+"""
+import logging
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import false, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis import get_redis
+from app.database import Base
+from app.models.app import App
+from app.models.counter_flush import CounterFlush
+from app.models.skill import Skill
+
+logger = logging.getLogger(__name__)
+
+# 待写回的增量
+PENDING_KEY = "counters:pending:{table}"
+# 正在写回的增量（写回期间读取时同样需要合并）
+FLUSHING_KEY = "counters:flushing:{table}"
+# 哈希中记录批次ID的字段（计数字段总是 "{id}:{列名}"，不会与之冲突）
+FLUSH_ID_FIELD = "flush_id"
+
+# 允许使用计数器的表和列
+COUNTER_MODELS: Dict[str, Type[Base]] = {
+    "skills": Skill,
+    "apps": App,
+}
+COUNTER_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "skills": ("use_count", "like_count"),
+    "apps": ("use_count", "install_count"),
+}
+
+
+def _check(table: str, column: str) -> None:
+    if column not in COUNTER_COLUMNS.get(table, ()):
+        raise ValueError(f"Unknown counter: {table}.{column}")
+
+
+def counter_field(row_id: int, column: str) -> str:
+    """哈希字段名"""
+    return f"{row_id}:{column}"
+
+
+def parse_counter_field(field: str) -> Tuple[int, str]:
+    """解析哈希字段名为 (记录ID, 列名)"""
+    row_id, column = field.split(":", 1)
+    return int(row_id), column
+
+
+async def increment(
+    db: AsyncSession,
+    table: str,
+    row_id: int,
+    column: str,
+    amount: int = 1
+) -> None:
+    """
+    增加计数
+
+    Args:
+        db: 数据库会话（仅Redis不可用时使用，调用方负责提交）
+        table: 表名
+        row_id: 记录ID
+        column: 计数列
+        amount: 增量
+    """
+    _check(table, column)
+    key = PENDING_KEY.format(table=table)
+    try:
+        # 新建的待写回哈希在同一事务中获得批次ID
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.hsetnx(key, FLUSH_ID_FIELD, str(uuid.uuid4()))
+            pipe.hincrby(key, counter_field(row_id, column), amount)
+            await pipe.execute()
+        return
+    except Exception as e:
+        logger.warning(f"Failed to buffer counter {table}.{column} for {row_id}: {e}")
+
+    model = COUNTER_MODELS[table]
+    await db.execute(
+        update(model)
+        .where(model.id == row_id)
+        .values({column: getattr(model, column) + amount})
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _buffered_deltas(
+    table: str,
+    row_ids: List[int],
+    columns: Iterable[str]
+) -> List[Tuple[Optional[str], Dict[int, Dict[str, int]]]]:
+    """
+    读取待写回和写回中哈希里的增量（在同一个Redis事务中读取，哈希改名不会导致重复读取）
+
+    Returns:
+        List[Tuple[Optional[str], Dict[int, Dict[str, int]]]]:
+            每个哈希的 (批次ID, {记录ID: {列名: 增量}})；Redis不可用时为空
+    """
+    fields: List[str] = [counter_field(row_id, column) for row_id in row_ids for column in columns]
+    try:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            for key in (PENDING_KEY, FLUSHING_KEY):
+                pipe.hmget(key.format(table=table), [FLUSH_ID_FIELD] + fields)
+            results = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to read pending counters for {table}: {e}")
+        return []
+
+    buffers = []
+    for flush_id, *amounts in results:
+        deltas: Dict[int, Dict[str, int]] = {}
+        for field, amount in zip(fields, amounts):
+            if amount and int(amount):
+                row_id, column = parse_counter_field(field)
+                deltas.setdefault(row_id, {})[column] = int(amount)
+        if deltas:
+            buffers.append((flush_id, deltas))
+    return buffers
+
+
+async def merge_pending(db: AsyncSession, table: str, rows: List[dict]) -> List[dict]:
+    """
+    用数据库中的最新计数加上尚未写回的增量覆盖序列化后的记录（按 "id" 匹配）
+
+    记录可能来自缓存，计数列总是重新查询。计数值和批次是否已写回在同一条语句中查询，
+    与写回事务看到同一个快照：已写回的批次不再重复累加
+
+    Args:
+        db: 数据库会话
+        table: 表名
+        rows: 记录字典（会被原地修改）
+
+    Returns:
+        List[dict]: 同一个列表
+    """
+    if not rows:
+        return rows
+    model = COUNTER_MODELS[table]
+    columns = COUNTER_COLUMNS[table]
+    row_ids = [row["id"] for row in rows]
+    buffers = await _buffered_deltas(table, row_ids, columns)
+
+    applied = [
+        (
+            select(CounterFlush.flush_id).where(CounterFlush.flush_id == flush_id).exists()
+            if flush_id else false()
+        ).label(f"applied_{i}")
+        for i, (flush_id, _) in enumerate(buffers)
+    ]
+    result = await db.execute(
+        select(model.id, *[getattr(model, column) for column in columns], *applied)
+        .where(model.id.in_(row_ids))
+    )
+    current: Dict[int, Dict[str, int]] = {}
+    for record in result.all():
+        values = dict(zip(columns, record[1:1 + len(columns)]))
+        for (_, deltas), is_applied in zip(buffers, record[1 + len(columns):]):
+            if not is_applied:
+                for column, amount in deltas.get(record[0], {}).items():
+                    values[column] += amount
+        current[record[0]] = values
+
+    for row in rows:
+        for column, value in current.get(row["id"], {}).items():
+            if column in row:
+                row[column] = value
+    return rows
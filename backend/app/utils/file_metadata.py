@@ -0,0 +1,196 @@
+"""
+文件派生元数据
+
+上传完成后由 Celery 任务（tasks.file_tasks.extract_file_metadata）按内容哈希计算一次，
+结果保存在 file_blobs.derived_metadata，相同内容的文件共享，Agent 不必每次重新解析文件。
+
+每个阶段（stage）是一个函数，输入本地文件路径，返回该阶段的结果字典；
+返回None表示不适用于该文件。结果被所有引用该内容的文件共享，
+因此阶段只能根据内容判断是否适用，不能依赖某个文件的扩展名或MIME类型。
+新的阶段通过 register_stage 注册，由 FILE_METADATA_STAGES 配置启用和排序
+"""
+import codecs
+import struct
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+
+# 阶段函数：文件路径 -> 结果或None
+MetadataStage = Callable[[str], Optional[dict]]
+
+_STAGES: Dict[str, MetadataStage] = {}
+
+# 读取头部判断文本编码的字节数
+SNIFF_SIZE = 64 * 1024
+# 按行统计时每次读取的块大小
+READ_BLOCK_SIZE = 1024 * 1024
+
+# 文本中不应出现的控制字符（制表、换行、换页、回车、ESC 除外）
+BINARY_CONTROL_BYTES = bytes(
+    b for b in range(0x20) if b not in (0x09, 0x0A, 0x0C, 0x0D, 0x1B)
+) + b"\x7f"
+
+
+def register_stage(name: str) -> Callable[[MetadataStage], MetadataStage]:
+    """
+    注册元数据阶段（装饰器）
+
+    Args:
+        name: 阶段名（结果保存在 derived_metadata[name]）
+
+    Returns:
+        Callable: 装饰器
+    """
+    def decorator(func: MetadataStage) -> MetadataStage:
+        _STAGES[name] = func
+        return func
+    return decorator
+
+
+def enabled_stages() -> List[str]:
+    """按配置顺序返回已启用且已注册的阶段名"""
+    return [name for name in settings.FILE_METADATA_STAGES if name in _STAGES]
+
+
+def get_stage(name: str) -> MetadataStage:
+    """获取阶段函数"""
+    return _STAGES[name]
+
+
+def _detect_encoding(head: bytes) -> Optional[str]:
+    """根据BOM和内容推断编码，判断为二进制时返回None"""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    if b"\x00" in head:
+        return None
+    try:
+        # 头部可能截断在多字节字符中间
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    # 不是UTF-8：不含控制字符时按单字节文本处理，否则视为二进制
+    if any(b in BINARY_CONTROL_BYTES for b in head):
+        return None
+    return "latin-1"
+
+
+@register_stage("text")
+def text_stage(path: str) -> Optional[dict]:
+    """
+    文本信息：编码、行数、字符数和开头摘录
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        Optional[dict]: 结果，非文本文件返回None
+    """
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_SIZE)
+    encoding = _detect_encoding(head)
+    if encoding is None:
+        return None
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    lines = 0
+    chars = 0
+    last_char = ""
+    excerpt_parts: List[str] = []
+    excerpt_len = 0
+
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            text = decoder.decode(block, final=not block)
+            if text:
+                lines += text.count("\n")
+                chars += len(text)
+                last_char = text[-1]
+                if excerpt_len < settings.FILE_METADATA_EXCERPT_CHARS:
+                    part = text[:settings.FILE_METADATA_EXCERPT_CHARS - excerpt_len]
+                    excerpt_parts.append(part)
+                    excerpt_len += len(part)
+            if not block:
+                break
+
+    # 最后一行没有换行符时也算一行
+    if chars and last_char != "\n":
+        lines += 1
+
+    return {
+        "encoding": encoding,
+        "line_count": lines,
+        "char_count": chars,
+        "excerpt": "".join(excerpt_parts),
+        "truncated": chars > excerpt_len,
+    }
+
+
+def _png_size(head: bytes) -> Optional[tuple]:
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    return None
+
+
+def _gif_size(head: bytes) -> Optional[tuple]:
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    return None
+
+
+def _jpeg_size(path: str) -> Optional[tuple]:
+    """扫描JPEG段，找到SOF段中的宽高"""
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            return None
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            code = marker[1]
+            if code == 0xFF:
+                # 填充字节
+                f.seek(-1, 1)
+                continue
+            if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack(">H", length_bytes)[0]
+            if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                data = f.read(5)
+                if len(data) < 5:
+                    return None
+                height, width = struct.unpack(">HH", data[1:5])
+                return width, height
+            f.seek(length - 2, 1)
+
+
+@register_stage("image")
+def image_stage(path: str) -> Optional[dict]:
+    """
+    图片尺寸（只解析文件头，支持 PNG / GIF / JPEG）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        Optional[dict]: 结果，非图片或无法识别时返回None
+    """
+    with open(path, "rb") as f:
+        head = f.read(32)
+
+    size = _png_size(head) or _gif_size(head)
+    image_format = "png" if head.startswith(b"\x89PNG") else "gif"
+    if size is None:
+        size = _jpeg_size(path)
+        image_format = "jpeg"
+    if size is None:
+        return None
+
+    width, height = size
+    return {"format": image_format, "width": width, "height": height}
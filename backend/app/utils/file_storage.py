@@ -0,0 +1,216 @@
+"""
+上传文件存储工具
+
+上传内容按固定大小分块复制到同目录的临时文件，写盘和哈希计算在线程池中执行，
+不阻塞事件循环；大小在复制过程中校验，完成后原子重命名到最终位置
+"""
+import hashlib
+import os
+import tempfile
+from typing import AsyncIterator, NamedTuple
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+# 每次读取/写入的块大小（1MB）
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class FileTooLargeError(Exception):
+    """上传内容超过大小限制"""
+
+
+class SavedUpload(NamedTuple):
+    """已写入临时文件的上传内容"""
+    path: str
+    size: int
+    sha256: str
+
+
+def _remove_quietly(path: str) -> None:
+    """删除文件，忽略不存在等错误"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def save_upload_to_temp(upload: UploadFile, directory: str, max_size: int) -> SavedUpload:
+    """
+    把上传内容分块写入 directory 下的临时文件，同时计算大小和SHA-256
+
+    临时文件与最终文件位于同一目录，之后可以原子重命名
+
+    Args:
+        upload: 上传文件
+        directory: 临时文件所在目录
+        max_size: 最大字节数
+
+    Returns:
+        SavedUpload: 临时文件路径、大小和SHA-256
+
+    Raises:
+        FileTooLargeError: 超过 max_size（临时文件已删除）
+    """
+    await run_in_threadpool(os.makedirs, directory, exist_ok=True)
+    fd, temp_path = await run_in_threadpool(tempfile.mkstemp, dir=directory, suffix=".part")
+    out = os.fdopen(fd, "wb")
+    hasher = hashlib.sha256()
+    size = 0
+
+    def write_chunk(chunk: bytes) -> None:
+        hasher.update(chunk)
+        out.write(chunk)
+
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLargeError()
+            await run_in_threadpool(write_chunk, chunk)
+        await run_in_threadpool(out.flush)
+        await run_in_threadpool(os.fsync, out.fileno())
+    except BaseException:
+        out.close()
+        await run_in_threadpool(_remove_quietly, temp_path)
+        raise
+
+    out.close()
+    return SavedUpload(temp_path, size, hasher.hexdigest())
+
+
+async def move_into_place(temp_path: str, final_path: str) -> None:
+    """
+    原子地把临时文件重命名到最终位置
+
+    Args:
+        temp_path: 临时文件路径
+        final_path: 最终文件路径
+    """
+    await run_in_threadpool(os.replace, temp_path, final_path)
+
+
+async def remove_file(path: str) -> None:
+    """在线程池中删除文件（忽略不存在）"""
+    await run_in_threadpool(_remove_quietly, path)
+
+
+def _create_empty(path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+async def create_empty_file(path: str) -> None:
+    """创建空文件（包括父目录）"""
+    await run_in_threadpool(_create_empty, path)
+
+
+async def write_stream_at(path: str, offset: int, stream: AsyncIterator[bytes], max_bytes: int) -> int:
+    """
+    从 offset 处开始把数据流写入已有文件
+
+    先截断到 offset，丢弃上次未确认的数据；客户端中途断开时保留已写入部分
+
+    Args:
+        path: 文件路径
+        offset: 写入起始偏移
+        stream: 数据流
+        max_bytes: 本次最多写入的字节数
+
+    Returns:
+        int: 实际写入的字节数
+
+    Raises:
+        FileTooLargeError: 数据超过 max_bytes
+    """
+    out = await run_in_threadpool(open, path, "r+b")
+    written = 0
+    try:
+        await run_in_threadpool(out.truncate, offset)
+        await run_in_threadpool(out.seek, offset)
+        try:
+            async for chunk in stream:
+                if not chunk:
+                    continue
+                if written + len(chunk) > max_bytes:
+                    raise FileTooLargeError()
+                await run_in_threadpool(out.write, chunk)
+                written += len(chunk)
+        except ClientDisconnect:
+            pass
+        await run_in_threadpool(out.flush)
+        await run_in_threadpool(os.fsync, out.fileno())
+    finally:
+        out.close()
+    return written
+
+
+def _copy_into(path: str, offset: int, source: str) -> None:
+    with open(source, "rb") as src, open(path, "r+b") as out:
+        out.truncate(offset)
+        out.seek(offset)
+        while True:
+            block = src.read(UPLOAD_CHUNK_SIZE)
+            if not block:
+                break
+            out.write(block)
+        out.flush()
+        os.fsync(out.fileno())
+
+
+async def copy_into(path: str, offset: int, source: str) -> None:
+    """
+    把 source 的全部内容写入已有文件的 offset 处（先截断到 offset，在线程池中执行）
+
+    Args:
+        path: 目标文件路径
+        offset: 写入起始偏移
+        source: 源文件路径
+    """
+    await run_in_threadpool(_copy_into, path, offset, source)
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(UPLOAD_CHUNK_SIZE)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+async def hash_file(path: str) -> str:
+    """在线程池中计算文件的SHA-256"""
+    return await run_in_threadpool(_hash_file, path)
+
+
+async def iter_file_range(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    """
+    分块读取文件的闭区间 [start, end]（读盘在线程池中执行）
+
+    Args:
+        path: 文件路径
+        start: 起始偏移
+        end: 结束偏移（包含）
+
+    Yields:
+        bytes: 文件内容块
+    """
+    f = await run_in_threadpool(open, path, "rb")
+    try:
+        await run_in_threadpool(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = await run_in_threadpool(f.read, min(UPLOAD_CHUNK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        f.close()
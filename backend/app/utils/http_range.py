@@ -0,0 +1,215 @@
+"""
+HTTP 条件请求与 Range 请求工具
+
+- ETag：有内容哈希的文件使用强校验值 "<sha256>"，旧文件使用弱校验值
+- If-None-Match / If-Modified-Since：内容未变化时返回304
+- Range：解析 bytes=... 请求头，支持单段和多段（multipart/byteranges）
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+# 单个请求最多允许的区间数，超过时忽略Range返回完整内容
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    """Range 请求的所有区间都超出文件范围"""
+
+
+def make_etag(content_hash: Optional[str], size: int, mtime: float) -> str:
+    """
+    生成ETag
+
+    Args:
+        content_hash: 内容SHA-256（没有时退化为基于大小和修改时间的弱ETag）
+        size: 文件大小
+        mtime: 文件修改时间戳
+
+    Returns:
+        str: 带引号的ETag
+    """
+    if content_hash:
+        return f'"{content_hash}"'
+    return f'W/"{size:x}-{int(mtime):x}"'
+
+
+def http_date(dt: datetime) -> str:
+    """格式化为HTTP日期（naive时间视为UTC）"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def _opaque_tag(etag: str) -> str:
+    """去掉弱校验前缀，用于弱比较"""
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    If-None-Match 弱比较
+
+    Args:
+        header: If-None-Match 请求头
+        etag: 当前ETag
+
+    Returns:
+        bool: 是否匹配
+    """
+    header = header.strip()
+    if header == "*":
+        return True
+    current = _opaque_tag(etag)
+    return any(
+        _opaque_tag(candidate.strip()) == current
+        for candidate in header.split(",")
+        if candidate.strip()
+    )
+
+
+def is_not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: datetime
+) -> bool:
+    """
+    判断是否可以返回304
+
+    存在 If-None-Match 时忽略 If-Modified-Since（RFC 9110 13.2.2）
+
+    Args:
+        if_none_match: If-None-Match 请求头
+        if_modified_since: If-Modified-Since 请求头
+        etag: 当前ETag
+        last_modified: 最后修改时间（naive时间视为UTC）
+
+    Returns:
+        bool: 内容是否未变化
+    """
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP日期精度为秒
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def if_range_allows(if_range: Optional[str], etag: str, last_modified: datetime) -> bool:
+    """
+    判断 If-Range 条件是否成立（不成立时应忽略Range返回完整内容）
+
+    ETag 形式要求强比较；日期形式要求与最后修改时间完全一致
+
+    Args:
+        if_range: If-Range 请求头
+        etag: 当前ETag
+        last_modified: 最后修改时间
+
+    Returns:
+        bool: 是否按Range返回部分内容
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return not etag.startswith("W/") and if_range == etag
+    return if_range == http_date(last_modified)
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    解析 Range 请求头
+
+    Args:
+        header: Range 请求头，如 "bytes=0-99,200-"
+        size: 文件大小
+
+    Returns:
+        Optional[List[Tuple[int, int]]]: 闭区间列表 [(start, end), ...]；
+            请求头缺失、格式错误或区间过多时返回None（按完整内容响应）
+
+    Raises:
+        RangeNotSatisfiable: 所有区间都不可满足
+    """
+    if not header:
+        return None
+    unit, sep, spec = header.partition("=")
+    if not sep or unit.strip().lower() != "bytes":
+        return None
+
+    parts = [part.strip() for part in spec.split(",")]
+    if not parts or len(parts) > MAX_RANGES:
+        return None
+
+    ranges: List[Tuple[int, int]] = []
+    for part in parts:
+        first, dash, last = part.partition("-")
+        first, last = first.strip(), last.strip()
+        if not dash or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+
+        if not first:
+            # 后缀区间：最后N个字节
+            if not last:
+                return None
+            length = int(last)
+            if length == 0 or size == 0:
+                continue
+            ranges.append((max(size - length, 0), size - 1))
+            continue
+
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            continue
+        end = min(int(last), size - 1) if last else size - 1
+        ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+    return ranges
+
+
+def content_range(start: int, end: int, size: int) -> str:
+    """生成 Content-Range 响应头"""
+    return f"bytes {start}-{end}/{size}"
+
+
+def multipart_part_header(boundary: str, media_type: str, start: int, end: int, size: int) -> bytes:
+    """
+    生成 multipart/byteranges 中一个分段的头部
+
+    Args:
+        boundary: 分隔符
+        media_type: 文件的Content-Type
+        start: 起始偏移
+        end: 结束偏移（包含）
+        size: 文件大小
+
+    Returns:
+        bytes: 分段头部（含分隔行和空行）
+    """
+    return (
+        f"--{boundary}\r\n"
+        f"Content-Type: {media_type}\r\n"
+        f"Content-Range: {content_range(start, end, size)}\r\n"
+        "\r\n"
+    ).encode("latin-1")
+
+
+def multipart_end(boundary: str) -> bytes:
+    """multipart/byteranges 的结束分隔行"""
+    return f"--{boundary}--\r\n".encode("latin-1")
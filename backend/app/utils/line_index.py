@@ -0,0 +1,196 @@
+"""
+大文本文件的按行读取
+
+文件通过 mmap 映射，只访问请求涉及的页面：
+- 行号到字节偏移使用稀疏索引（每 LINE_INDEX_STRIDE 行记录一个检查点），
+  按需向后扩展并缓存在进程内，跳转到已扫描过的行只需从最近的检查点向后查找
+- 文件尾部从末尾反向查找，不需要索引
+因此预览大文件的开头、结尾或已访问过的区域，开销与小文件相同
+"""
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+
+# 稀疏索引的检查点间隔（行）
+LINE_INDEX_STRIDE = 1000
+
+
+class LineChunk(NamedTuple):
+    """读取到的连续行（行号从0开始，不含换行符）"""
+    lines: List[bytes]
+    start_line: Optional[int]  # 尾部读取且总行数未知时为None
+    start_byte: int
+    end_byte: int  # 不包含
+    has_more: bool  # 读取范围之外（尾部读取时为之前）是否还有内容
+    total_lines: Optional[int]  # 索引扫描到文件末尾前未知
+
+
+class LineIndex:
+    """
+    稀疏行索引
+
+    checkpoints[i] 是第 i * stride 行的起始偏移；
+    scanned_line / scanned_offset 是已扫描到的最后一行及其起始偏移
+    """
+
+    def __init__(self, size: int, stride: int = LINE_INDEX_STRIDE):
+        self.stride = stride
+        self.checkpoints = array("q", [0])
+        self.scanned_line = 0
+        self.scanned_offset = 0
+        self.total_lines: Optional[int] = 0 if size == 0 else None
+        self.lock = threading.Lock()
+
+    def _extend(self, mm: mmap.mmap, target_line: int) -> None:
+        """向后扫描，直到 target_line 的起始偏移已知或到达文件末尾"""
+        size = len(mm)
+        while self.total_lines is None and self.scanned_line < target_line:
+            newline = mm.find(b"\n", self.scanned_offset)
+            if newline == -1 or newline + 1 == size:
+                # 当前行是最后一行（末尾的换行符不产生新行）
+                self.total_lines = self.scanned_line + 1
+                break
+            self.scanned_line += 1
+            self.scanned_offset = newline + 1
+            if self.scanned_line % self.stride == 0:
+                self.checkpoints.append(self.scanned_offset)
+
+    def line_start(self, mm: mmap.mmap, line: int) -> Optional[int]:
+        """
+        查询行的起始偏移
+
+        Args:
+            mm: 文件映射
+            line: 行号（从0开始）
+
+        Returns:
+            Optional[int]: 起始偏移，超出文件行数时返回None
+        """
+        if line > self.scanned_line:
+            self._extend(mm, line)
+        if self.total_lines is not None and line >= self.total_lines:
+            return None
+
+        offset = self.checkpoints[line // self.stride]
+        for _ in range(line % self.stride):
+            offset = mm.find(b"\n", offset) + 1
+        return offset
+
+
+_index_cache: "OrderedDict[Tuple[str, int, int], LineIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _get_index(path: str, st: os.stat_result) -> LineIndex:
+    """按路径、大小和修改时间获取缓存的索引（LRU）"""
+    key = (path, st.st_size, st.st_mtime_ns)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is None:
+            index = LineIndex(st.st_size)
+            _index_cache[key] = index
+            while len(_index_cache) > settings.PREVIEW_LINE_INDEX_CACHE_SIZE:
+                _index_cache.popitem(last=False)
+        else:
+            _index_cache.move_to_end(key)
+        return index
+
+
+def _strip_cr(line: bytes) -> bytes:
+    return line[:-1] if line.endswith(b"\r") else line
+
+
+def read_lines(path: str, start_line: int, count: int, max_bytes: int) -> LineChunk:
+    """
+    读取从 start_line 开始的最多 count 行（阻塞，需在线程池中调用）
+
+    超过 max_bytes 时提前结束，最后一行可能被截断
+
+    Args:
+        path: 文件路径
+        start_line: 起始行号（从0开始）
+        count: 最多读取的行数
+        max_bytes: 最多读取的字节数
+
+    Returns:
+        LineChunk: 读取结果
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        if size == 0:
+            return LineChunk([], start_line, 0, 0, False, 0)
+
+        index = _get_index(path, st)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, index.lock:
+            pos = index.line_start(mm, start_line)
+            if pos is None:
+                return LineChunk([], start_line, size, size, False, index.total_lines)
+
+            begin = pos
+            limit = min(size, pos + max_bytes)
+            lines: List[bytes] = []
+            while len(lines) < count and pos < limit:
+                newline = mm.find(b"\n", pos, limit)
+                end = limit if newline == -1 else newline
+                lines.append(_strip_cr(mm[pos:end]))
+                pos = end if newline == -1 else newline + 1
+
+            if pos == size:
+                # 读到了文件末尾：由索引扫描到末尾得到总行数（同时补齐检查点，
+                # 只扫描本次读过的部分）
+                index.line_start(mm, start_line + len(lines))
+            return LineChunk(lines, start_line, begin, pos, pos < size, index.total_lines)
+
+
+def read_tail(path: str, count: int, max_bytes: int) -> LineChunk:
+    """
+    读取文件最后 count 行（阻塞，需在线程池中调用）
+
+    从末尾反向查找换行符；超过 max_bytes 时第一行可能不完整
+
+    Args:
+        path: 文件路径
+        count: 最多读取的行数
+        max_bytes: 最多读取的字节数
+
+    Returns:
+        LineChunk: 读取结果
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        if size == 0 or count <= 0:
+            return LineChunk([], None, size, size, size > 0, 0 if size == 0 else None)
+
+        index = _get_index(path, st)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # 末尾的换行符不产生新行
+            end = size - 1 if mm[size - 1] == ord("\n") else size
+            lower = max(0, end - max_bytes)
+            start = lower
+            pos = end
+            for _ in range(count):
+                newline = mm.rfind(b"\n", lower, pos)
+                if newline == -1:
+                    start = lower
+                    break
+                start = newline + 1
+                pos = newline
+
+            lines = [_strip_cr(line) for line in mm[start:end].split(b"\n")]
+
+        total_lines = index.total_lines
+        if start == 0:
+            start_line: Optional[int] = 0
+            total_lines = len(lines)
+        elif total_lines is not None:
+            start_line = total_lines - len(lines)
+        else:
+            start_line = None
+        return LineChunk(lines, start_line, start, size, start > 0, total_lines)
@@ -2,22 +2,336 @@
 OpenCode Sidecar模块
 
 用于调用opencode CLI工具
+
+支持两种执行方式：
+- 单次模式：每条消息启动一个opencode进程（默认）
+- 进程池模式（实验性）：复用常驻worker进程，避免每轮对话的冷启动开销
+
+execute() 返回完整输出；execute_stream() 在CLI写出内容时逐块产出文本
+
+进程池协议约定
+--------------
+opencode CLI 本身不提供下面的 stdin/stdout 协议，进程池不直接启动opencode，
+而是启动 worker_command 指定的适配程序（例如包装 opencode 服务模式的脚本），
+由适配程序负责与opencode交互。适配程序必须满足：
+- 启动后常驻，依次处理请求，同一时刻只处理一个请求
+- 每个请求是stdin上的一行JSON: {"session": ..., "user": ..., "message": ...}
+- 响应写到stdout，每行一个JSON：零或多行 {"type": "chunk", "content": ...}，
+  最后以 {"type": "done"} 或 {"type": "error", "error": ...} 结束
+- stdout 只能输出协议行，日志写到stderr
+- 出现无法恢复的错误时直接退出（进程池会丢弃并重建该worker）
+tests/fixtures/opencode_pool_worker.py 是满足该约定的最小参考实现。
+
+该模式默认关闭，需同时设置 OPENCODE_POOL_EXPERIMENTAL、OPENCODE_POOL_SIZE
+和 OPENCODE_POOL_WORKER_COMMAND 才会启用
 """
 import asyncio
-from typing import Dict, Any, Optional
+import codecs
+import json
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, AsyncIterator, Deque, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 流式读取时每次读取的字节数
+STREAM_CHUNK_SIZE = 4096
+
+
+class OpenCodeExecutionError(Exception):
+    """opencode执行失败（流式接口使用）"""
+
+
+class _PooledProcess:
+    """进程池中的单个常驻worker进程"""
+
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self.uses = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        """进程是否仍在运行"""
+        return self.proc.returncode is None
+
+
+class OpenCodeProcessPool:
+    """
+    常驻worker进程池（实验性，协议见模块说明）
+
+    - 按需启动，最多 size 个worker
+    - 每次请求独占一个worker（checkout/release）
+    - worker使用 max_uses 次后、崩溃或超时后回收并重建
+    """
+
+    def __init__(
+        self,
+        worker_command: Sequence[str],
+        size: int = 4,
+        max_uses: int = 100
+    ):
+        """
+        初始化进程池
+
+        Args:
+            worker_command: 启动常驻worker（协议适配程序）的命令及参数
+            size: 最大worker数量
+            max_uses: 单个worker处理的最大请求数，超过后回收
+        """
+        if not worker_command:
+            raise ValueError("Worker command is required")
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        self.worker_command = list(worker_command)
+        self.size = size
+        self.max_uses = max_uses
+
+        # 空闲worker和名额的变化都通过条件变量通知等待者，等待者醒来后重新检查
+        self._idle: Deque[_PooledProcess] = deque()
+        self._spawned = 0
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+    async def _spawn(self) -> _PooledProcess:
+        """启动一个新的worker进程"""
+        proc = await asyncio.create_subprocess_exec(
+            *self.worker_command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        logger.info(f"Spawned opencode worker pid={proc.pid}")
+        return _PooledProcess(proc)
+
+    async def _reserve(self) -> bool:
+        """占用一个名额（调用方随后启动worker），已满时返回False"""
+        async with self._cond:
+            if self._closed or self._spawned >= self.size:
+                return False
+            self._spawned += 1
+            return True
+
+    async def _free_slot(self) -> None:
+        """释放一个名额并唤醒一个等待者（它可以自己启动新worker）"""
+        async with self._cond:
+            self._spawned -= 1
+            self._cond.notify()
+
+    async def _terminate(self, worker: _PooledProcess) -> None:
+        """终止worker进程并释放名额"""
+        await self._free_slot()
+        if worker.alive:
+            try:
+                worker.proc.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await worker.proc.wait()
+        except Exception:
+            pass
+
+    async def _put_idle(self, worker: _PooledProcess) -> None:
+        """放回空闲worker并唤醒一个等待者"""
+        async with self._cond:
+            self._idle.append(worker)
+            self._cond.notify()
+
+    async def start(self, warm: Optional[int] = None) -> None:
+        """
+        预热进程池
+
+        Args:
+            warm: 预先启动的worker数量，默认启动满 size 个
+        """
+        count = self.size if warm is None else min(warm, self.size)
+        for _ in range(count):
+            if not await self._reserve():
+                break
+            try:
+                worker = await self._spawn()
+            except Exception:
+                await self._free_slot()
+                raise
+            await self._put_idle(worker)
+
+    async def acquire(self) -> _PooledProcess:
+        """
+        取出一个健康的worker
+
+        优先复用空闲worker；没有空闲且未达到上限时启动新worker；
+        否则等待其他请求归还worker或释放名额。
+
+        Raises:
+            RuntimeError: 进程池已关闭（包括等待期间被关闭）
+        """
+        while True:
+            async with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Process pool is closed")
+                    if self._idle:
+                        worker: Optional[_PooledProcess] = self._idle.popleft()
+                        break
+                    if self._spawned < self.size:
+                        self._spawned += 1
+                        worker = None
+                        break
+                    await self._cond.wait()
+
+            if worker is None:
+                try:
+                    return await self._spawn()
+                except Exception:
+                    await self._free_slot()
+                    raise
+
+            # 健康检查：丢弃已退出的worker
+            if worker.alive:
+                return worker
+            logger.warning(f"Discarding dead opencode worker pid={worker.proc.pid}")
+            await self._terminate(worker)
+
+    async def release(self, worker: _PooledProcess, healthy: bool = True) -> None:
+        """
+        归还worker
+
+        Args:
+            worker: 要归还的worker
+            healthy: 本次请求是否正常完成；异常的worker直接回收
+        """
+        worker.uses += 1
+        if self._closed or not healthy or not worker.alive or worker.uses >= self.max_uses:
+            await self._terminate(worker)
+            await self._replenish()
+            return
+        await self._put_idle(worker)
+
+    async def _replenish(self) -> None:
+        """
+        回收worker后补充一个新worker，保持池处于预热状态
+
+        启动失败时释放名额，等待者醒来后会自己尝试启动
+        """
+        if not await self._reserve():
+            return
+        try:
+            worker = await self._spawn()
+        except Exception as e:
+            await self._free_slot()
+            logger.error(f"Failed to respawn opencode worker: {e}")
+            return
+        await self._put_idle(worker)
+
+    async def stream(
+        self,
+        message: str,
+        session_id: str,
+        user_id: str,
+        timeout: int = 60
+    ) -> AsyncIterator[str]:
+        """
+        使用池中的worker执行一条消息，逐块产出输出
+
+        Raises:
+            OpenCodeExecutionError: 执行失败、超时或worker异常退出
+        """
+        worker = await self.acquire()
+        healthy = False
+        try:
+            request = json.dumps(
+                {"session": session_id, "user": user_id, "message": message},
+                ensure_ascii=False
+            )
+            worker.proc.stdin.write(request.encode("utf-8") + b"\n")
+            await worker.proc.stdin.drain()
+
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OpenCodeExecutionError("Timeout")
+                try:
+                    line = await asyncio.wait_for(
+                        worker.proc.stdout.readline(),
+                        timeout=remaining
+                    )
+                except asyncio.TimeoutError:
+                    raise OpenCodeExecutionError("Timeout")
+                if not line:
+                    raise OpenCodeExecutionError("Worker exited unexpectedly")
+
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    event = None
+                if not isinstance(event, dict):
+                    raise OpenCodeExecutionError(f"Invalid worker output: {line[:200]!r}")
+                event_type = event.get("type")
+                if event_type == "chunk":
+                    content = event.get("content", "")
+                    if content:
+                        yield content
+                elif event_type == "done":
+                    healthy = True
+                    return
+                elif event_type == "error":
+                    healthy = True
+                    raise OpenCodeExecutionError(event.get("error") or "Unknown error")
+        finally:
+            # 未读完响应就中断的worker状态不可信，直接回收
+            await self.release(worker, healthy=healthy)
+
+    async def execute(
+        self,
+        message: str,
+        session_id: str,
+        user_id: str,
+        timeout: int = 60
+    ) -> Dict[str, Any]:
+        """
+        使用池中的worker执行一条消息
+
+        返回值格式与 OpenCodeSidecar.execute 相同
+        """
+        try:
+            chunks = [
+                chunk async for chunk in self.stream(message, session_id, user_id, timeout)
+            ]
+            return {"success": True, "output": "".join(chunks), "error": None}
+        except Exception as e:
+            return {"success": False, "output": None, "error": str(e)}
+
+    async def close(self) -> None:
+        """关闭进程池，终止所有空闲worker并唤醒所有等待者（使用中的worker归还时终止）"""
+        async with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for worker in idle:
+            await self._terminate(worker)
 
 
 class OpenCodeSidecar:
     """OpenCode Sidecar - 用于调用opencode CLI"""
     
-    def __init__(self, opencode_path: str = "opencode"):
+    def __init__(
+        self,
+        opencode_path: str = "opencode",
+        pool: Optional[OpenCodeProcessPool] = None
+    ):
         """
         初始化OpenCode Sidecar
         
         Args:
             opencode_path: opencode CLI路径
+            pool: 常驻进程池（实验性）；提供时 execute() 复用池中的worker
         """
         self.opencode_path = opencode_path
+        self.pool = pool
     
     async def execute(
         self,
@@ -38,6 +352,9 @@ class OpenCodeSidecar:
         Returns:
             Dict包含执行结果
         """
+        if self.pool is not None:
+            return await self.pool.execute(message, session_id, user_id, timeout)
+
         try:
             # 构建命令
             cmd = [
@@ -87,6 +404,91 @@ class OpenCodeSidecar:
                 "error": str(e)
             }
     
+    async def execute_stream(
+        self,
+        message: str,
+        session_id: str,
+        user_id: str,
+        timeout: int = 60
+    ) -> AsyncIterator[str]:
+        """
+        流式执行opencode命令，按CLI写出的顺序逐块产出文本
+
+        使用增量解码，跨读取边界的多字节UTF-8字符也能正确输出
+        
+        Args:
+            message: 要发送的消息
+            session_id: 会话ID
+            user_id: 用户ID
+            timeout: 超时时间（秒），覆盖整个执行过程
+        
+        Yields:
+            str: 解码后的输出片段
+        
+        Raises:
+            OpenCodeExecutionError: 执行失败或超时
+        """
+        if self.pool is not None:
+            async for chunk in self.pool.stream(message, session_id, user_id, timeout):
+                yield chunk
+            return
+
+        cmd = [
+            self.opencode_path,
+            "--session", session_id,
+            "--user", user_id,
+            message
+        ]
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except Exception as e:
+            raise OpenCodeExecutionError(str(e)) from e
+
+        # 并发读取stderr，避免stderr管道写满阻塞子进程
+        stderr_task = asyncio.ensure_future(proc.stderr.read())
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        deadline = time.monotonic() + timeout
+
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                data = await asyncio.wait_for(
+                    proc.stdout.read(STREAM_CHUNK_SIZE),
+                    timeout=remaining
+                )
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+
+            remaining = max(deadline - time.monotonic(), 0)
+            returncode = await asyncio.wait_for(proc.wait(), timeout=remaining)
+            if returncode != 0:
+                stderr = await stderr_task
+                raise OpenCodeExecutionError(stderr.decode("utf-8", errors="replace"))
+        except asyncio.TimeoutError:
+            raise OpenCodeExecutionError("Timeout")
+        finally:
+            if not stderr_task.done():
+                stderr_task.cancel()
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+    
     async def check_health(self) -> bool:
         """
         检查opencode CLI是否可用
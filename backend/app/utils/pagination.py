@@ -0,0 +1,72 @@
+"""
+游标（keyset）分页
+
+按 (排序时间, id) 倒序翻页，游标是对上一页最后一行的不透明编码，
+翻页代价与页深无关，也不需要每次统计总数
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """
+    编码游标
+
+    Args:
+        sort_value: 上一页最后一行的排序时间
+        row_id: 上一页最后一行的id
+
+    Returns:
+        str: URL安全的游标字符串
+    """
+    raw = json.dumps({"v": sort_value.isoformat(), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解码游标
+
+    Args:
+        cursor: 游标字符串
+
+    Returns:
+        Tuple[datetime, int]: (排序时间, id)
+
+    Raises:
+        HTTPException: 游标无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["v"]), int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def keyset_before(sort_column, id_column, cursor: str) -> ColumnElement:
+    """
+    生成“位于游标之后”的过滤条件（适用于按 sort_column DESC, id DESC 排序）
+
+    Args:
+        sort_column: 排序列
+        id_column: id列
+        cursor: 游标字符串
+
+    Returns:
+        ColumnElement: WHERE条件
+    """
+    sort_value, row_id = decode_cursor(cursor)
+    return or_(
+        sort_column < sort_value,
+        and_(sort_column == sort_value, id_column < row_id)
+    )
@@ -0,0 +1,101 @@
+"""
+会话消息存储
+
+消息以单行INSERT追加到 session_messages 表，
+按 (session_id, seq) 分页读取，不再整体重写JSON数组
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.session import Session
+from app.models.session_message import SessionMessage
+
+
+async def append_message(
+    db: AsyncSession,
+    session_id: int,
+    role: str,
+    content: str,
+    tokens: int = 0
+) -> Optional[SessionMessage]:
+    """
+    追加一条会话消息
+
+    先原子地递增会话的消息计数作为新消息的seq（同一会话的并发追加在该行上串行化），
+    再插入一行消息
+
+    Args:
+        db: 数据库会话
+        session_id: 会话ID
+        role: 消息角色
+        content: 消息内容
+        tokens: 消息token数
+
+    Returns:
+        Optional[SessionMessage]: 新消息，会话不存在时返回None
+    """
+    result = await db.execute(
+        update(Session)
+        .where(Session.id == session_id)
+        .values(
+            total_messages=Session.total_messages + 1,
+            total_tokens=Session.total_tokens + tokens,
+            updated_at=datetime.utcnow()
+        )
+        .returning(Session.total_messages)
+    )
+    seq = result.scalar_one_or_none()
+    if seq is None:
+        return None
+
+    message = SessionMessage(
+        session_id=session_id,
+        seq=seq,
+        role=role,
+        content=content,
+        tokens=tokens
+    )
+    db.add(message)
+    await db.flush()
+    return message
+
+
+async def list_messages(
+    db: AsyncSession,
+    session_id: int,
+    limit: int,
+    after_seq: Optional[int] = None,
+    before_seq: Optional[int] = None
+) -> List[SessionMessage]:
+    """
+    分页读取会话消息（按seq升序返回）
+
+    - 指定 after_seq：返回其后的最多 limit 条
+    - 指定 before_seq：返回其前的最近 limit 条
+    - 都不指定：返回最近的 limit 条
+
+    Args:
+        db: 数据库会话
+        session_id: 会话ID
+        limit: 最大条数
+        after_seq: 起始序号（不含）
+        before_seq: 结束序号（不含）
+
+    Returns:
+        List[SessionMessage]: 消息列表
+    """
+    query = select(SessionMessage).where(SessionMessage.session_id == session_id)
+
+    if after_seq is not None:
+        query = query.where(SessionMessage.seq > after_seq).order_by(SessionMessage.seq)
+        result = await db.execute(query.limit(limit))
+        return list(result.scalars().all())
+
+    if before_seq is not None:
+        query = query.where(SessionMessage.seq < before_seq)
+    query = query.order_by(SessionMessage.seq.desc()).limit(limit)
+    result = await db.execute(query)
+    return list(reversed(result.scalars().all()))
@@ -0,0 +1,88 @@
+"""
+下载签名URL
+
+令牌格式：base64url(JSON载荷).base64url(HMAC-SHA256签名)
+载荷中包含下载所需的全部信息（存储对象键、文件名、类型、过期时间等），
+校验只需重新计算签名，不查询数据库
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, Tuple
+
+from app.config import settings
+
+
+class InvalidSignedURL(Exception):
+    """签名无效或已过期"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signing_key() -> bytes:
+    """从 SECRET_KEY 派生专用签名密钥，避免与JWT等其他用途混用"""
+    return hmac.new(
+        settings.SECRET_KEY.encode("utf-8"),
+        b"file-download-url",
+        hashlib.sha256
+    ).digest()
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_signing_key(), payload.encode("utf-8"), hashlib.sha256).digest())
+
+
+def create_download_token(claims: Dict[str, Any], expires_in: int) -> Tuple[str, int]:
+    """
+    生成下载令牌
+
+    Args:
+        claims: 下载信息
+        expires_in: 有效期（秒）
+
+    Returns:
+        Tuple[str, int]: (令牌, 过期时间戳)
+    """
+    expires_at = int(time.time()) + expires_in
+    body = dict(claims, exp=expires_at)
+    payload = _b64encode(json.dumps(body, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}", expires_at
+
+
+def verify_download_token(token: str) -> Dict[str, Any]:
+    """
+    校验下载令牌
+
+    Args:
+        token: 令牌
+
+    Returns:
+        Dict[str, Any]: 下载信息（含过期时间 exp）
+
+    Raises:
+        InvalidSignedURL: 格式错误、签名不匹配或已过期
+    """
+    payload, sep, signature = token.partition(".")
+    if not sep or not payload or not signature:
+        raise InvalidSignedURL("Malformed token")
+
+    # 按字节比较：compare_digest 不接受含非ASCII字符的字符串
+    if not hmac.compare_digest(signature.encode("utf-8"), _sign(payload).encode("ascii")):
+        raise InvalidSignedURL("Invalid signature")
+
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise InvalidSignedURL("Malformed token")
+
+    if not isinstance(claims, dict) or claims.get("exp", 0) < time.time():
+        raise InvalidSignedURL("Token expired")
+    return claims
@@ -0,0 +1,231 @@
+"""
+公开技能目录缓存
+
+技能列表中公开技能部分按固定大小（CATALOG_PAGE_SIZE）分页缓存在Redis中，缓存键只由过滤条件
+和页号决定，所有用户共享；总数单独缓存。当前用户自己的非公开技能每次实时查询
+（按 user_id 索引，数量少），再与从缓存页中截取的公开技能按排序键合并。
+
+缓存键包含目录版本号：公开技能被创建、修改或删除时版本号加一，旧版本的键不再被读取，
+随TTL自然过期，不需要逐个删除。Redis不可用时直接查询数据库
+"""
+import hashlib
+import heapq
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = "skills:catalog:version"
+CATALOG_PAGE_KEY = "skills:catalog:v{version}:{digest}"
+CATALOG_STATS_KEY = "skills:catalog:stats"
+
+# 公开目录的缓存页大小（条）
+CATALOG_PAGE_SIZE = 100
+
+# 缓存条目：{"key": 排序键（越大越靠前）, "data": SkillResponse 的JSON}
+CatalogItem = Dict[str, Any]
+
+
+async def catalog_version() -> Optional[int]:
+    """
+    读取当前目录版本号
+
+    Returns:
+        Optional[int]: 版本号，Redis不可用时返回None（不使用缓存）
+    """
+    try:
+        return int(await get_redis().get(CATALOG_VERSION_KEY) or 0)
+    except Exception as e:
+        logger.warning(f"Failed to read skill catalog version: {e}")
+        return None
+
+
+async def bump_catalog_version() -> None:
+    """使所有已缓存的目录页失效（公开技能变化并提交后调用）"""
+    try:
+        await get_redis().incr(CATALOG_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate skill catalog cache: {e}")
+
+
+def page_key(version: int, params: Dict[str, Any]) -> str:
+    """
+    生成目录页缓存键
+
+    Args:
+        version: 目录版本号
+        params: 决定查询结果的全部参数
+
+    Returns:
+        str: 缓存键
+    """
+    digest = hashlib.sha1(
+        json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return CATALOG_PAGE_KEY.format(version=version, digest=digest)
+
+
+async def get_cached_page(key: str) -> Optional[Dict[str, Any]]:
+    """
+    读取缓存的目录页并记录命中/未命中
+
+    Args:
+        key: 缓存键
+
+    Returns:
+        Optional[Dict[str, Any]]: {"items": [...], "total": ...}，未命中返回None
+    """
+    try:
+        redis = get_redis()
+        cached = await redis.get(key)
+        await redis.hincrby(CATALOG_STATS_KEY, "hits" if cached else "misses", 1)
+    except Exception as e:
+        logger.warning(f"Failed to read skill catalog cache: {e}")
+        return None
+    return json.loads(cached) if cached else None
+
+
+async def set_cached_page(key: str, page: Dict[str, Any]) -> None:
+    """
+    写入目录页缓存
+
+    Args:
+        key: 缓存键
+        page: {"items": [...], "total": ...}
+    """
+    try:
+        await get_redis().set(key, json.dumps(page), ex=settings.SKILL_CATALOG_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to write skill catalog cache: {e}")
+
+
+async def get_or_compute(
+    params: Dict[str, Any],
+    compute: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    读取当前版本的缓存，未命中时计算并写入
+
+    版本号在计算前读取：计算期间目录发生变化时，结果写入旧版本的键，不会被再次读取
+
+    Args:
+        params: 决定结果的全部参数
+        compute: 计算结果的函数
+
+    Returns:
+        Dict[str, Any]: 结果
+    """
+    version = await catalog_version()
+    key = page_key(version, params) if version is not None else None
+    if key:
+        cached = await get_cached_page(key)
+        if cached is not None:
+            return cached
+
+    value = await compute()
+    if key:
+        await set_cached_page(key, value)
+    return value
+
+
+async def get_public_window(
+    filters: Dict[str, Any],
+    start: int,
+    end: int,
+    fetch_page: Callable[[int, int], Awaitable[List[CatalogItem]]]
+) -> List[CatalogItem]:
+    """
+    读取公开技能序列中 [start, end) 的条目
+
+    按 CATALOG_PAGE_SIZE 把序列切成固定的页分别缓存，窗口从覆盖它的页中截取：
+    私有技能数不同的用户请求的窗口起点不同，但读取的是同一批缓存页
+
+    Args:
+        filters: 决定公开技能序列的全部参数
+        start: 起始位置
+        end: 结束位置（不包含）
+        fetch_page: 查询一页的函数 (起始位置, 条数) -> 条目
+
+    Returns:
+        List[CatalogItem]: 条目（序列不足时更少）
+    """
+    if end <= start:
+        return []
+    first = start // CATALOG_PAGE_SIZE
+    items: List[CatalogItem] = []
+    for page in range(first, (end - 1) // CATALOG_PAGE_SIZE + 1):
+        async def compute(page: int = page) -> Dict[str, Any]:
+            return {"items": await fetch_page(page * CATALOG_PAGE_SIZE, CATALOG_PAGE_SIZE)}
+
+        cached = await get_or_compute(dict(filters, kind="page", page=page), compute)
+        items.extend(cached["items"])
+        if len(cached["items"]) < CATALOG_PAGE_SIZE:
+            # 已到序列末尾
+            break
+    offset = first * CATALOG_PAGE_SIZE
+    return items[start - offset:end - offset]
+
+
+async def cache_stats() -> Dict[str, Any]:
+    """
+    缓存命中统计
+
+    Returns:
+        Dict[str, Any]: hits / misses / hit_rate / version
+    """
+    redis = get_redis()
+    stats = await redis.hgetall(CATALOG_STATS_KEY)
+    version = await redis.get(CATALOG_VERSION_KEY)
+    hits = int(stats.get("hits", 0))
+    misses = int(stats.get("misses", 0))
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+        "version": int(version or 0),
+    }
+
+
+def merge_page(
+    public: Sequence[CatalogItem],
+    public_start: int,
+    private: Sequence[CatalogItem],
+    offset: int,
+    limit: int
+) -> List[CatalogItem]:
+    """
+    合并公开技能和用户私有技能，返回合并序列中 [offset, offset + limit) 的条目
+
+    两个序列都已按排序键降序排列。设私有条目数为 p，公开条目只需从
+    max(0, offset - p) 开始取 offset + limit 之前的部分（public_start 即该起点）：
+    先数出合并序列前 offset 个条目中有几个私有条目，再从两边对应位置归并
+
+    Args:
+        public: 公开技能窗口 public[public_start : offset + limit]
+        public_start: 窗口起点在公开序列中的位置
+        private: 私有技能的前 offset + limit 个条目
+        offset: 合并序列中的起始位置
+        limit: 条目数
+
+    Returns:
+        List[CatalogItem]: 合并后的条目
+    """
+    # 第 j 个私有条目排在合并序列前 offset 个之内，当且仅当它排在第 offset - j 个公开条目之前
+    skipped_private = 0
+    for j, item in enumerate(private[:offset]):
+        index = offset - j - 1 - public_start
+        if index < len(public) and item["key"] <= public[index]["key"]:
+            break
+        skipped_private += 1
+
+    merged = heapq.merge(
+        public[offset - skipped_private - public_start:],
+        private[skipped_private:],
+        key=lambda item: item["key"],
+        reverse=True
+    )
+    return [item for _, item in zip(range(limit), merged)]
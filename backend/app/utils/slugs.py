@@ -0,0 +1,109 @@
+"""
+唯一slug分配（Skill、App 共用）
+
+一次前缀查询取出 base 和 base-N 形式的已有slug，直接选用下一个空闲序号；
+并发请求可能选中同一个slug，写入时由唯一约束发现冲突，回滚保存点后重新分配
+"""
+from typing import Optional, Type
+
+from slugify import slugify
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Base
+from app.utils.text_search import escape_like
+
+# slug 列长度为100，为 "-N" 序号预留空间
+SLUG_MAX_LENGTH = 90
+# 唯一约束冲突时的最大重试次数
+SLUG_ALLOCATE_ATTEMPTS = 5
+
+
+def base_slug(name: str, fallback: str) -> str:
+    """
+    由名称生成基础slug（非ASCII字符转写为拉丁字母）
+
+    Args:
+        name: 名称
+        fallback: 名称无法生成slug时使用的值
+
+    Returns:
+        str: 基础slug
+    """
+    return slugify(name, max_length=SLUG_MAX_LENGTH, word_boundary=True) or fallback
+
+
+async def allocate_slug(
+    db: AsyncSession,
+    model: Type[Base],
+    base: str,
+    exclude_id: Optional[int] = None
+) -> str:
+    """
+    查找 base 或 base-N 中第一个未被占用的slug
+
+    Args:
+        db: 数据库会话
+        model: 带 slug 列的模型
+        base: 基础slug
+        exclude_id: 忽略的记录（更新时为记录本身）
+
+    Returns:
+        str: 可用的slug
+    """
+    query = select(model.slug).where(
+        or_(model.slug == base, model.slug.like(f"{escape_like(base)}-%", escape="\\"))
+    )
+    if exclude_id is not None:
+        query = query.where(model.id != exclude_id)
+    taken = (await db.execute(query)).scalars().all()
+
+    if base not in taken:
+        return base
+
+    prefix = f"{base}-"
+    suffixes = [
+        int(slug[len(prefix):])
+        for slug in taken
+        if slug.startswith(prefix) and slug[len(prefix):].isdigit()
+    ]
+    return f"{base}-{max(suffixes, default=0) + 1}"
+
+
+async def assign_unique_slug(db: AsyncSession, obj: Base, name: str, fallback: str) -> str:
+    """
+    为新建或改名的记录分配唯一slug并写入数据库（不提交）
+
+    记录的其他改动先写入，slug在保存点中写入，冲突时只回滚slug并重新分配
+
+    Args:
+        db: 数据库会话（调用方负责提交）
+        obj: 带 slug 列的记录（新建的记录会被加入会话）
+        name: 用于生成slug的名称
+        fallback: 名称无法生成slug时使用的值
+
+    Returns:
+        str: 分配的slug
+
+    Raises:
+        IntegrityError: 重试次数用尽
+    """
+    model = type(obj)
+    # 保存点回滚会使记录过期，过期后不能再在异步会话中隐式加载属性
+    obj_id = obj.id
+    base = base_slug(name, fallback)
+    await db.flush()
+
+    error: Optional[IntegrityError] = None
+    for _ in range(SLUG_ALLOCATE_ATTEMPTS):
+        slug = await allocate_slug(db, model, base, exclude_id=obj_id)
+        try:
+            async with db.begin_nested():
+                obj.slug = slug
+                db.add(obj)
+                await db.flush()
+            return slug
+        except IntegrityError as e:
+            error = e
+    raise error
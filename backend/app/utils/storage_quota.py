@@ -0,0 +1,191 @@
+"""
+用户存储配额
+
+users.storage_used 记录用户所有文件记录的 file_size 之和（秒传和去重的文件同样计入），
+在创建/删除文件的同一事务内用条件UPDATE原子增减，超出配额时更新不生效。
+用量在Redis中缓存，上传前的预检查只读缓存，不访问数据库；
+缓存不可用时回退到按主键查询 users 表
+"""
+import logging
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.redis import get_redis
+from app.models.file import File as FileModel
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 用量缓存键
+USAGE_CACHE_KEY = "quota:user:{user_id}"
+
+
+class StorageUsage(NamedTuple):
+    """存储用量（quota 为0表示不限）"""
+    used: int
+    quota: int
+
+    @property
+    def available(self) -> Optional[int]:
+        """剩余空间，不限时为None"""
+        if not self.quota:
+            return None
+        return max(self.quota - self.used, 0)
+
+
+def effective_quota(user_quota: Optional[int]) -> int:
+    """用户未单独设置配额时使用默认配额"""
+    return user_quota if user_quota is not None else settings.DEFAULT_STORAGE_QUOTA
+
+
+def _cache_key(user_id: int) -> str:
+    return USAGE_CACHE_KEY.format(user_id=user_id)
+
+
+async def cache_usage(user_id: int, usage: StorageUsage) -> None:
+    """
+    写入用量缓存（事务提交后调用）
+
+    Args:
+        user_id: 用户ID
+        usage: 用量
+    """
+    try:
+        await get_redis().set(
+            _cache_key(user_id),
+            f"{usage.used}:{usage.quota}",
+            ex=settings.STORAGE_USAGE_CACHE_TTL
+        )
+    except Exception as e:
+        logger.warning(f"Failed to cache storage usage for user {user_id}: {e}")
+
+
+async def invalidate_usage(user_id: int) -> None:
+    """删除用量缓存"""
+    try:
+        await get_redis().delete(_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"Failed to invalidate storage usage for user {user_id}: {e}")
+
+
+async def get_usage(db: AsyncSession, user_id: int) -> StorageUsage:
+    """
+    查询用量（优先读缓存）
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+
+    Returns:
+        StorageUsage: 用量
+    """
+    try:
+        cached = await get_redis().get(_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"Failed to read storage usage cache for user {user_id}: {e}")
+        cached = None
+
+    if cached:
+        used, quota = cached.split(":")
+        return StorageUsage(used=int(used), quota=int(quota))
+
+    result = await db.execute(
+        select(User.storage_used, User.storage_quota).where(User.id == user_id)
+    )
+    used, user_quota = result.one()
+    usage = StorageUsage(used=used, quota=effective_quota(user_quota))
+    await cache_usage(user_id, usage)
+    return usage
+
+
+def quota_exceeded() -> HTTPException:
+    """超出配额的错误响应"""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Storage quota exceeded"
+    )
+
+
+async def ensure_quota(db: AsyncSession, user_id: int, incoming: int) -> StorageUsage:
+    """
+    预检查：写入 incoming 字节后是否超出配额（在读取上传内容之前调用）
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        incoming: 即将写入的字节数（未知时传0，只检查是否已满）
+
+    Returns:
+        StorageUsage: 当前用量
+
+    Raises:
+        HTTPException: 超出配额
+    """
+    usage = await get_usage(db, user_id)
+    if usage.quota and usage.used + incoming > usage.quota:
+        raise quota_exceeded()
+    return usage
+
+
+async def charge_usage(db: AsyncSession, user_id: int, delta: int) -> StorageUsage:
+    """
+    在当前事务中增减用量（增加时原子校验配额）
+
+    Args:
+        db: 数据库会话（调用方负责提交，提交后调用 cache_usage）
+        user_id: 用户ID
+        delta: 用量变化（字节，删除时为负数）
+
+    Returns:
+        StorageUsage: 变化后的用量
+
+    Raises:
+        HTTPException: 增加后超出配额
+    """
+    quota = func.coalesce(User.storage_quota, settings.DEFAULT_STORAGE_QUOTA)
+    query = (
+        update(User)
+        .where(User.id == user_id)
+        .values(storage_used=User.storage_used + delta)
+        .returning(User.storage_used, quota)
+    )
+    if delta > 0:
+        query = query.where((quota == 0) | (User.storage_used + delta <= quota))
+
+    row = (await db.execute(query)).one_or_none()
+    if row is None:
+        raise quota_exceeded()
+    return StorageUsage(used=row[0], quota=row[1])
+
+
+async def reconcile_usage(db: AsyncSession, user_id: Optional[int] = None) -> List[int]:
+    """
+    按 files 表重新计算用量并修正计数（管理员使用）
+
+    Args:
+        db: 数据库会话（调用方负责提交，提交后清除被修正用户的缓存）
+        user_id: 只修正指定用户，None表示所有用户
+
+    Returns:
+        List[int]: 被修正的用户ID
+    """
+    actual = (
+        select(func.coalesce(func.sum(FileModel.file_size), 0))
+        .where(FileModel.user_id == User.id)
+        .scalar_subquery()
+    )
+    query = (
+        update(User)
+        .where(User.storage_used != actual)
+        .values(storage_used=actual)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    if user_id is not None:
+        query = query.where(User.id == user_id)
+
+    return list((await db.execute(query)).scalars().all())
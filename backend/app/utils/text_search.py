@@ -0,0 +1,112 @@
+"""
+文本搜索条件
+
+PostgreSQL 使用 pg_trgm：ILIKE '%词%' 可以走三元组 GIN 索引，
+模糊模式额外用 word_similarity（<% 运算符）匹配拼写相近的文件名并按相似度排序。
+全文检索使用 tsvector 列和 GIN 索引，按 ts_rank_cd 排序。
+其他数据库（测试用的SQLite）退化为 ILIKE，前缀匹配的结果排在前面
+"""
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, literal, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def escape_like(term: str) -> str:
+    """
+    转义 LIKE 通配符，使 % 和 _ 按字面匹配
+
+    Args:
+        term: 搜索词
+
+    Returns:
+        str: 转义后的搜索词（转义符为反斜杠）
+    """
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def trigram_match(
+    column: ColumnElement,
+    term: str,
+    dialect_name: str,
+    fuzzy: bool = False
+) -> Tuple[ColumnElement, Optional[ColumnElement]]:
+    """
+    生成文本匹配条件和相关度排序表达式
+
+    Args:
+        column: 被搜索的列
+        term: 搜索词
+        dialect_name: 数据库方言名（postgresql / sqlite ...）
+        fuzzy: 是否模糊匹配并按相关度排序
+
+    Returns:
+        Tuple[ColumnElement, Optional[ColumnElement]]:
+            (WHERE条件, 相关度排序表达式；非模糊模式为None，相关度越高越靠前需 desc 排序)
+    """
+    pattern = f"%{escape_like(term)}%"
+    condition = column.ilike(pattern, escape="\\")
+    if not fuzzy:
+        return condition, None
+
+    if dialect_name == "postgresql":
+        # term <% column：term 与 column 中某一段足够相似（阈值 pg_trgm.word_similarity_threshold）
+        similar = literal(term).op("<%")(column)
+        return condition | similar, func.word_similarity(term, column)
+
+    prefix = column.ilike(f"{escape_like(term)}%", escape="\\")
+    return condition, case((prefix, 1), else_=0)
+
+
+def prefix_tsquery(term: str) -> Optional[str]:
+    """
+    把用户输入转换为 to_tsquery 表达式：每个词按前缀匹配，词之间为 AND
+
+    只保留词字符，用户输入中的 tsquery 运算符（& | ! : 括号等）不会导致语法错误
+
+    Args:
+        term: 搜索词
+
+    Returns:
+        Optional[str]: 如 "open:* & code:*"，没有可用的词时返回None
+    """
+    words: List[str] = [word for word in re.findall(r"\w+", term) if word.strip("_")]
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def fulltext_match(
+    vector: ColumnElement,
+    columns: Sequence[ColumnElement],
+    term: str,
+    dialect_name: str,
+    config: str = "simple"
+) -> Tuple[ColumnElement, ColumnElement]:
+    """
+    生成全文检索条件和相关度排序表达式
+
+    Args:
+        vector: tsvector 列（仅PostgreSQL使用）
+        columns: 其他数据库回退为 ILIKE 时搜索的列，按权重从高到低排列
+        term: 搜索词
+        dialect_name: 数据库方言名
+        config: 文本检索配置，需与生成 tsvector 时一致
+
+    Returns:
+        Tuple[ColumnElement, ColumnElement]: (WHERE条件, 相关度排序表达式，需 desc 排序)
+    """
+    query = prefix_tsquery(term) if dialect_name == "postgresql" else None
+    if query is not None:
+        tsquery = func.to_tsquery(config, query)
+        return vector.op("@@")(tsquery), func.ts_rank_cd(vector, tsquery)
+
+    pattern = f"%{escape_like(term)}%"
+    conditions = [column.ilike(pattern, escape="\\") for column in columns]
+    # 命中权重越高的列排序越靠前
+    rank = case(
+        *[(condition, len(conditions) - i) for i, condition in enumerate(conditions)],
+        else_=0
+    )
+    return or_(*conditions), rank
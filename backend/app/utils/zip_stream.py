@@ -0,0 +1,162 @@
+"""
+流式ZIP打包
+
+边读取边压缩边输出，不写临时文件，内存占用与文件数量和大小无关。
+输出目标不可定位时 zipfile 会为每个条目写数据描述符（data descriptor），
+压缩在线程池中执行，不阻塞事件循环
+"""
+import logging
+import os
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterable, NamedTuple
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# 本身已压缩的类型直接存储，避免浪费CPU
+STORED_MIME_PREFIXES = ("image/", "video/", "audio/")
+STORED_MIME_TYPES = {
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-tar",
+    "application/pdf",
+}
+
+
+class ZipEntry(NamedTuple):
+    """ZIP中的一个文件"""
+    name: str
+    key: str
+    size: int
+    modified: datetime
+    mime_type: str
+
+
+class _ZipSink:
+    """
+    zipfile 的输出目标：写入内容暂存在缓冲区，由生成器取走
+
+    不提供 tell/seek，zipfile 会按不可定位的流处理
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+# 文件名清理后为空时使用的条目名
+FALLBACK_ENTRY_NAME = "file"
+
+
+def safe_entry_name(name: str) -> str:
+    """
+    把用户提供的文件名转换为安全的ZIP条目名
+
+    只保留最后一段（/ 和 \\ 都视为路径分隔符），去掉控制字符，
+    解压时不会写到目标目录之外（zip-slip）
+
+    Args:
+        name: 原始文件名
+
+    Returns:
+        str: 不含路径的条目名
+    """
+    name = name.replace("\\", "/").rsplit("/", 1)[-1]
+    name = "".join(ch for ch in name if ch >= " ").strip()
+    if name in ("", ".", ".."):
+        return FALLBACK_ENTRY_NAME
+    return name
+
+
+def unique_names(names: Iterable[str]) -> Iterable[str]:
+    """
+    清理文件名并为重复的文件名加序号：a.txt, a (1).txt, a (2).txt
+
+    Args:
+        names: 原始文件名
+
+    Yields:
+        str: 安全且不重复的条目名
+    """
+    seen = set()
+    for name in names:
+        name = safe_entry_name(name)
+        candidate = name
+        base, ext = os.path.splitext(name)
+        index = 1
+        while candidate in seen:
+            candidate = f"{base} ({index}){ext}"
+            index += 1
+        seen.add(candidate)
+        yield candidate
+
+
+def _compress_type(mime_type: str) -> int:
+    if mime_type in STORED_MIME_TYPES or mime_type.startswith(STORED_MIME_PREFIXES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+async def stream_zip(
+    entries: Iterable[ZipEntry],
+    open_stream: Callable[[str], AsyncIterator[bytes]]
+) -> AsyncIterator[bytes]:
+    """
+    生成ZIP字节流
+
+    读取失败的文件（如存储中已不存在）会被跳过并记录日志，
+    因为响应头已经发出，无法再返回错误状态
+
+    Args:
+        entries: 要打包的文件
+        open_stream: 按对象键打开内容流的函数
+
+    Yields:
+        bytes: ZIP数据块
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", allowZip64=True)
+
+    for entry in entries:
+        stream = open_stream(entry.key).__aiter__()
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = b""
+        except Exception as e:
+            logger.warning(f"Skipping {entry.key} in zip export: {e}")
+            continue
+
+        info = zipfile.ZipInfo(entry.name, date_time=entry.modified.timetuple()[:6])
+        info.compress_type = _compress_type(entry.mime_type)
+        # 大小超过4GB时必须提前声明ZIP64
+        with archive.open(info, mode="w", force_zip64=entry.size >= zipfile.ZIP64_LIMIT) as dest:
+            block = first
+            while True:
+                if block:
+                    await run_in_threadpool(dest.write, block)
+                    data = sink.drain()
+                    if data:
+                        yield data
+                try:
+                    block = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+        yield sink.drain()
+
+    archive.close()
+    yield sink.drain()
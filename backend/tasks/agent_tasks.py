@@ -3,15 +3,97 @@ Agent执行任务
 """
 import asyncio
 import json
-from typing import Optional
+from datetime import datetime
+from typing import Optional, Any, Dict
 from celery import current_task
 from tasks.celery_app import celery_app
-from app.utils.opencode_sidecar import OpenCodeSidecar
+from app.utils.opencode_sidecar import OpenCodeSidecar, OpenCodeProcessPool
 from app.core.security import get_current_user_id
+from app.core.events import publish_session_event
+from app.database import AsyncSessionLocal
+from app.utils.session_messages import append_message
+from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 每个worker进程共享一个Sidecar（进程池模式下复用常驻opencode进程）
+_sidecar: Optional[OpenCodeSidecar] = None
+
+
+def get_sidecar() -> OpenCodeSidecar:
+    """
+    获取当前worker进程的Sidecar实例
+
+    同时设置 OPENCODE_POOL_EXPERIMENTAL、OPENCODE_POOL_SIZE > 0 和
+    OPENCODE_POOL_WORKER_COMMAND 时启用实验性的常驻进程池
+    """
+    global _sidecar
+    if _sidecar is None:
+        pool = None
+        if settings.OPENCODE_POOL_SIZE > 0:
+            if settings.OPENCODE_POOL_EXPERIMENTAL and settings.OPENCODE_POOL_WORKER_COMMAND:
+                logger.warning("Using experimental opencode worker pool")
+                pool = OpenCodeProcessPool(
+                    worker_command=settings.OPENCODE_POOL_WORKER_COMMAND,
+                    size=settings.OPENCODE_POOL_SIZE,
+                    max_uses=settings.OPENCODE_POOL_MAX_USES
+                )
+            else:
+                logger.warning(
+                    "OPENCODE_POOL_SIZE is set but the worker pool is experimental; "
+                    "set OPENCODE_POOL_EXPERIMENTAL and OPENCODE_POOL_WORKER_COMMAND to enable it"
+                )
+        _sidecar = OpenCodeSidecar(
+            opencode_path=settings.OPENCODE_CLI_PATH,
+            pool=pool
+        )
+    return _sidecar
+
+
+def _publish(session_id: str, event_type: str, task_id: str, **data: Any) -> None:
+    """发布任务事件到会话频道"""
+    event: Dict[str, Any] = {
+        'type': event_type,
+        'task_id': task_id,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    event.update(data)
+    publish_session_event(session_id, event)
+
+
+async def _run_streaming(
+    sidecar: OpenCodeSidecar,
+    task_id: str,
+    prompt: str,
+    session_id: str,
+    user_id: str,
+    timeout: int
+) -> str:
+    """
+    流式执行opencode，并把每个输出片段发布到会话频道
+
+    Returns:
+        str: 完整输出
+    """
+    chunks = []
+    async for chunk in sidecar.execute_stream(
+        message=prompt,
+        session_id=str(session_id),
+        user_id=str(user_id),
+        timeout=timeout
+    ):
+        chunks.append(chunk)
+        _publish(session_id, 'task_output', task_id, content=chunk)
+    return ''.join(chunks)
+
+
+async def _save_assistant_message(session_id: str, content: str) -> None:
+    """把助手回复追加到会话消息历史"""
+    async with AsyncSessionLocal() as db:
+        await append_message(db, int(session_id), 'assistant', content)
+        await db.commit()
+
 
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
 def execute_agent_task(
@@ -41,33 +123,36 @@ def execute_agent_task(
             state='PROGRESS',
             meta={'status': 'executing', 'progress': 0}
         )
+        _publish(session_id, 'task_progress', self.request.id, status='executing', progress=0)
 
-        # 创建Sidecar实例
-        sidecar = OpenCodeSidecar()
+        # 获取Sidecar实例（进程池模式下跨任务复用）
+        sidecar = get_sidecar()
 
-        # 执行opencode
+        # 流式执行opencode，输出片段实时推送到WebSocket
         loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(
-            sidecar.execute(
-                prompt=prompt,
-                session_id=session_id,
-                user_id=user_id,
-                timeout=timeout
-            )
+        output = loop.run_until_complete(
+            _run_streaming(sidecar, self.request.id, prompt, session_id, user_id, timeout)
         )
 
+        # 保存助手回复（失败不影响任务结果）
+        try:
+            loop.run_until_complete(_save_assistant_message(session_id, output))
+        except Exception as e:
+            logger.error(f"Failed to save assistant message for session {session_id}: {e}")
+
         # 更新任务状态
         self.update_state(
             state='PROGRESS',
             meta={'status': 'completed', 'progress': 100}
         )
+        _publish(session_id, 'task_completed', self.request.id, output=output)
 
         logger.info(f"Agent task {self.request.id} completed successfully")
 
         return {
             'success': True,
             'task_id': self.request.id,
-            'output': result.get('output', ''),
+            'output': output,
             'session_id': session_id,
             'user_id': user_id
         }
@@ -78,6 +163,7 @@ def execute_agent_task(
             state='FAILURE',
             meta={'error': 'Task timeout', 'detail': str(e)}
         )
+        _publish(session_id, 'task_failed', self.request.id, error='Task timeout')
         raise self.retry(exc=e, countdown=60)
 
     except Exception as e:
@@ -86,6 +172,7 @@ def execute_agent_task(
             state='FAILURE',
             meta={'error': str(e)}
         )
+        _publish(session_id, 'task_failed', self.request.id, error=str(e))
         raise self.retry(exc=e, countdown=60)
 
 
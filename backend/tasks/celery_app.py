@@ -8,7 +8,7 @@ celery_app = Celery(
     'opencode_tasks',
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=['tasks.agent_tasks']
+    include=['tasks.agent_tasks', 'tasks.file_tasks', 'tasks.counter_tasks']
 )
 
 # Celery配置
@@ -24,3 +24,31 @@ celery_app.conf.update(
     worker_prefetch_multiplier=1,  # 每次只取1个任务
     worker_max_tasks_per_child=50,  # 每个worker处理50个任务后重启
 )
+
+# 定时任务（需启动 celery beat）
+celery_app.conf.beat_schedule = {
+    'collect-unreferenced-blobs': {
+        'task': 'tasks.file_tasks.collect_unreferenced_blobs',
+        'schedule': settings.BLOB_GC_INTERVAL_SECONDS,
+    },
+    'relocate-legacy-blobs': {
+        'task': 'tasks.file_tasks.relocate_legacy_blobs',
+        'schedule': settings.BLOB_RELOCATE_INTERVAL_SECONDS,
+    },
+    'expire-upload-sessions': {
+        'task': 'tasks.file_tasks.expire_upload_sessions',
+        'schedule': settings.UPLOAD_EXPIRE_INTERVAL_SECONDS,
+    },
+    'retry-file-metadata': {
+        'task': 'tasks.file_tasks.retry_file_metadata',
+        'schedule': settings.FILE_METADATA_RETRY_INTERVAL_SECONDS,
+    },
+    'reconcile-storage': {
+        'task': 'tasks.file_tasks.reconcile_storage',
+        'schedule': settings.RECONCILE_INTERVAL_SECONDS,
+    },
+    'flush-counters': {
+        'task': 'tasks.counter_tasks.flush_counters',
+        'schedule': settings.COUNTER_FLUSH_INTERVAL_SECONDS,
+    },
+}
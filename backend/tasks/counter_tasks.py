@@ -0,0 +1,161 @@
+"""
+计数器写回任务
+
+- flush_counters：把Redis中累计的计数增量批量写回数据库（由 celery beat 定期调度）
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from redis.exceptions import ResponseError
+from sqlalchemy import case, delete, update
+
+from tasks.celery_app import celery_app
+from app.database import AsyncSessionLocal
+from app.core.redis import get_sync_redis
+from app.models.counter_flush import CounterFlush
+from app.utils.counters import (
+    COUNTER_COLUMNS,
+    COUNTER_MODELS,
+    FLUSH_ID_FIELD,
+    FLUSHING_KEY,
+    PENDING_KEY,
+    parse_counter_field
+)
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 防止两次写回重叠（如某次写回耗时超过调度间隔）
+FLUSH_LOCK_KEY = "counters:flush_lock"
+
+# 只删除自己持有的锁（锁过期后可能已被其他写回获取）
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _take_pending(table: str) -> Tuple[Optional[str], Dict[str, str]]:
+    """
+    取出待写回的增量
+
+    把待写回哈希原子地重命名为写回中哈希，之后的自增写入新的待写回哈希；
+    上次写回中断时写回中哈希仍然存在，直接重新写回（已提交的批次由批次ID跳过）
+
+    Returns:
+        Tuple[Optional[str], Dict[str, str]]: (批次ID, 计数字段)；没有增量时为 (None, {})
+    """
+    redis = get_sync_redis()
+    flushing_key = FLUSHING_KEY.format(table=table)
+    if not redis.exists(flushing_key):
+        try:
+            redis.rename(PENDING_KEY.format(table=table), flushing_key)
+        except ResponseError:
+            # 没有待写回的增量（键不存在）
+            return None, {}
+    # 升级前写入的哈希没有批次ID
+    redis.hsetnx(flushing_key, FLUSH_ID_FIELD, str(uuid.uuid4()))
+    raw = redis.hgetall(flushing_key)
+    return raw.pop(FLUSH_ID_FIELD), raw
+
+
+async def _apply_deltas(
+    table: str,
+    flush_id: str,
+    deltas: Dict[int, Dict[str, int]],
+    batch_size: int
+) -> bool:
+    """
+    按批执行 UPDATE ... SET col = col + CASE id WHEN ... END WHERE id IN (...)，
+    与批次记录在同一事务中提交
+
+    Returns:
+        bool: 是否写回；批次已写回过时返回False
+    """
+    model = COUNTER_MODELS[table]
+    row_ids = sorted(deltas)
+
+    async with AsyncSessionLocal() as db:
+        if await db.get(CounterFlush, flush_id) is not None:
+            return False
+        db.add(CounterFlush(flush_id=flush_id, table_name=table))
+
+        for i in range(0, len(row_ids), batch_size):
+            batch = row_ids[i:i + batch_size]
+            values = {}
+            for column in COUNTER_COLUMNS[table]:
+                changes = {row_id: deltas[row_id][column] for row_id in batch if column in deltas[row_id]}
+                if changes:
+                    values[column] = getattr(model, column) + case(changes, value=model.id, else_=0)
+            await db.execute(
+                update(model)
+                .where(model.id.in_(batch))
+                .values(values)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+    return True
+
+
+async def _prune_flush_records(retention_seconds: int) -> None:
+    """删除过期的批次记录（写回中哈希在提交后即删除，记录只需覆盖中断重试的时间）"""
+    cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(CounterFlush).where(CounterFlush.applied_at < cutoff))
+        await db.commit()
+
+
+async def _flush_counters(batch_size: int) -> Dict[str, int]:
+    """
+    写回所有表的计数增量
+
+    Returns:
+        Dict[str, int]: 每个表更新的记录数
+    """
+    redis = get_sync_redis()
+    flushed: Dict[str, int] = {}
+
+    for table in COUNTER_MODELS:
+        flush_id, raw = _take_pending(table)
+        deltas: Dict[int, Dict[str, int]] = defaultdict(dict)
+        for field, amount in raw.items():
+            row_id, column = parse_counter_field(field)
+            if column in COUNTER_COLUMNS[table] and int(amount):
+                deltas[row_id][column] = int(amount)
+
+        applied = bool(deltas) and await _apply_deltas(table, flush_id, deltas, batch_size)
+        if deltas and not applied:
+            logger.warning(f"Counter batch {flush_id} for {table} was already applied, discarding")
+        # 提交后才删除：删除前失败时下次重新写回，批次ID保证只生效一次
+        redis.delete(FLUSHING_KEY.format(table=table))
+        flushed[table] = len(deltas) if applied else 0
+
+    await _prune_flush_records(settings.COUNTER_FLUSH_RECORD_RETENTION_SECONDS)
+    return flushed
+
+
+@celery_app.task
+def flush_counters() -> dict:
+    """
+    把计数增量写回数据库（由 celery beat 定期调度）
+    """
+    redis = get_sync_redis()
+    token = str(uuid.uuid4())
+    if not redis.set(FLUSH_LOCK_KEY, token, nx=True, ex=settings.COUNTER_FLUSH_LOCK_SECONDS):
+        return {"skipped": True}
+
+    try:
+        loop = asyncio.get_event_loop()
+        flushed = loop.run_until_complete(_flush_counters(settings.COUNTER_FLUSH_BATCH_SIZE))
+    finally:
+        redis.eval(RELEASE_LOCK_SCRIPT, 1, FLUSH_LOCK_KEY, token)
+
+    if any(flushed.values()):
+        logger.info(f"Flushed counters: {flushed}")
+    return flushed
@@ -0,0 +1,676 @@
+"""
+文件存储维护任务
+
+- collect_unreferenced_blobs：回收引用数归零的内容块
+- relocate_legacy_blobs：把迁移前按用户存放的内容块移动到 blobs/ 下
+- reconcile_storage：对比存储与数据库，清理孤儿文件并报告悬空记录
+- expire_upload_sessions：把过期未完成的断点续传上传标记为 expired 并删除临时文件
+- extract_file_metadata：按内容块计算派生元数据（上传完成后触发）
+- retry_file_metadata：重新提交未完成、失败或处理中断的元数据计算
+"""
+import asyncio
+import glob
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, update, and_, or_, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tasks.celery_app import celery_app
+from app.database import AsyncSessionLocal
+from app.core.redis import get_sync_redis
+from app.core.storage import UPLOAD_DIR, LocalStorage, StorageBackend, get_storage
+from app.models.file import File as FileModel
+from app.models.file_blob import FileBlob
+from app.models.upload_session import UploadSession
+from app.utils.blob_store import BLOB_DIRNAME, blob_key
+from app.utils.file_storage import remove_file
+from app.utils.file_metadata import enabled_stages, get_stage
+from app.utils.text_search import escape_like
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 对账进度游标（Redis键）
+RECONCILE_SHARD_CURSOR_KEY = "reconcile:next_shard"
+RECONCILE_USER_CURSOR_KEY = "reconcile:last_user"
+
+# 处理中的状态超过该时间视为worker已中断，允许重新领取
+METADATA_PROCESSING_TIMEOUT = timedelta(hours=1)
+
+
+async def _delete_blob_object(sha256: str, storage_path: str) -> bool:
+    """
+    删除已删除记录的内容块对象
+
+    先插入同一主键的占位记录（不提交）再删除对象：并发上传同一内容的请求会在插入时等待，
+    占位记录回滚后再存入对象；插入冲突说明内容已被重新上传，对象不能删除
+
+    Returns:
+        bool: 是否删除了对象
+    """
+    async with AsyncSessionLocal() as db:
+        db.add(FileBlob(sha256=sha256, size=0, storage_path=storage_path, ref_count=0))
+        try:
+            await db.flush()
+        except IntegrityError:
+            await db.rollback()
+            return False
+        try:
+            await get_storage().delete(storage_path)
+        finally:
+            await db.rollback()
+    return True
+
+
+async def _collect_unreferenced_blobs(grace_seconds: int, batch_size: int) -> int:
+    """
+    删除引用数归零且超过宽限期的内容块
+
+    先提交记录的删除，再删除存储对象：提交失败时对象仍然存在，不会留下指向缺失对象的记录；
+    删除对象失败时遗留的对象由对账任务清理
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    removed = 0
+
+    async with AsyncSessionLocal() as db:
+        candidates = (
+            select(FileBlob.sha256)
+            .where(FileBlob.ref_count <= 0, FileBlob.updated_at < cutoff)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            delete(FileBlob)
+            .where(FileBlob.sha256.in_(candidates))
+            .returning(FileBlob.sha256, FileBlob.storage_path)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = result.all()
+        await db.commit()
+
+    for sha256, storage_path in deleted:
+        if await _delete_blob_object(sha256, storage_path):
+            removed += 1
+
+    return removed
+
+
+@celery_app.task
+def collect_unreferenced_blobs() -> dict:
+    """
+    回收无引用的内容块（由 celery beat 定期调度）
+    """
+    loop = asyncio.get_event_loop()
+    removed = loop.run_until_complete(
+        _collect_unreferenced_blobs(
+            settings.BLOB_GC_GRACE_SECONDS,
+            settings.BLOB_GC_BATCH_SIZE
+        )
+    )
+    if removed:
+        logger.info(f"Collected {removed} unreferenced blobs")
+    return {'removed': removed}
+
+
+def _legacy_local_path(storage: StorageBackend, storage_path: str) -> str:
+    """迁移前的内容块位于本地磁盘（绝对路径或 UPLOAD_DIR 下的相对路径）"""
+    if isinstance(storage, LocalStorage):
+        return storage.local_path(storage_path)
+    return storage_path if os.path.isabs(storage_path) else os.path.join(UPLOAD_DIR, storage_path)
+
+
+def _copy_to_temp(source: str) -> str:
+    """把文件复制到 UPLOAD_DIR 下的临时文件"""
+    fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out, open(source, "rb") as src:
+            shutil.copyfileobj(src, out)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+async def _relocate_legacy_blob(storage: StorageBackend, sha256: str, old_path: str) -> bool:
+    """
+    把一个迁移前的内容块复制到 blob_key(sha256)，提交后删除原位置
+
+    迁移 006 把相同内容的文件记录统一指向其中一个已有副本（可能位于其他用户目录），
+    移动到 blobs/ 后该副本不再与用户目录混在一起，用户目录对账不会误删
+
+    Returns:
+        bool: 是否完成移动
+    """
+    new_path = blob_key(sha256)
+    try:
+        source = _legacy_local_path(storage, old_path)
+        temp_path = _copy_to_temp(source)
+    except FileNotFoundError:
+        logger.error(f"Legacy blob {sha256} is missing from storage ({old_path})")
+        return False
+    except ValueError:
+        # 本地存储拒绝根目录之外的路径
+        logger.error(f"Legacy blob {sha256} is outside the storage root ({old_path})")
+        return False
+
+    try:
+        await storage.put_file(new_path, temp_path)
+    except BaseException:
+        await remove_file(temp_path)
+        raise
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(FileBlob)
+            .where(FileBlob.sha256 == sha256, FileBlob.storage_path == old_path)
+            # 保持 updated_at 不变，它只记录引用变化，供回收任务判断宽限期
+            .values(storage_path=new_path, updated_at=FileBlob.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            # 内容块已被回收或已移动，新对象（若无记录）由对账任务清理
+            await db.rollback()
+            return False
+        await db.execute(
+            update(FileModel)
+            .where(FileModel.content_hash == sha256)
+            .values(file_path=new_path)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    # 提交后才删除原位置
+    await remove_file(source)
+    return True
+
+
+async def _relocate_legacy_blobs(batch_size: int) -> int:
+    """移动一批 storage_path 不在 blobs/ 下的内容块"""
+    storage = get_storage()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(FileBlob.sha256, FileBlob.storage_path)
+            .where(~FileBlob.storage_path.like(f"{BLOB_DIRNAME}/%"))
+            .limit(batch_size)
+        )
+        legacy = result.all()
+
+    moved = 0
+    for sha256, storage_path in legacy:
+        if await _relocate_legacy_blob(storage, sha256, storage_path):
+            moved += 1
+    return moved
+
+
+@celery_app.task
+def relocate_legacy_blobs() -> dict:
+    """
+    把迁移前的内容块移动到 blobs/ 下（由 celery beat 定期调度，全部移动后为空操作）
+    """
+    loop = asyncio.get_event_loop()
+    moved = loop.run_until_complete(_relocate_legacy_blobs(settings.BLOB_RELOCATE_BATCH_SIZE))
+    if moved:
+        logger.info(f"Relocated {moved} legacy blobs")
+    return {'moved': moved}
+
+
+class _DeleteBudget:
+    """对账删除的速率和数量限制，避免占满磁盘/对象存储I/O"""
+
+    def __init__(self, enabled: bool, max_deletes: int, per_second: float):
+        self.enabled = enabled
+        self.remaining = max_deletes
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._last = 0.0
+
+    async def acquire(self) -> bool:
+        """获取一次删除配额，不允许删除时返回False（只报告）"""
+        if not self.enabled or self.remaining <= 0:
+            return False
+        loop = asyncio.get_event_loop()
+        wait = self._last + self.interval - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last = loop.time()
+        self.remaining -= 1
+        return True
+
+
+def _next_shards(count: int) -> List[str]:
+    """从Redis中的进度游标开始取下一批内容块分片（00-ff 循环）"""
+    redis_client = get_sync_redis()
+    start = int(redis_client.get(RECONCILE_SHARD_CURSOR_KEY) or 0) % 256
+    redis_client.set(RECONCILE_SHARD_CURSOR_KEY, (start + count) % 256)
+    return [f"{(start + i) % 256:02x}" for i in range(min(count, 256))]
+
+
+async def _reconcile_blob_shard(
+    db: AsyncSession,
+    storage: StorageBackend,
+    shard: str,
+    cutoff: datetime,
+    budget: _DeleteBudget,
+    batch_size: int,
+    report: Dict[str, Any]
+) -> None:
+    """
+    对账一个内容块分片（blobs/<shard>/）
+
+    - 存储中有、file_blobs 中没有且超过宽限期的对象：孤儿，删除或报告
+    - file_blobs 中有、存储中没有的内容块：悬空，报告（引用它的文件已无法下载）
+    """
+    prefix = f"{BLOB_DIRNAME}/{shard}/"
+    listed = [obj async for obj in storage.list_keys(prefix)]
+    listed_keys = {obj.key for obj in listed}
+
+    for i in range(0, len(listed), batch_size):
+        batch = listed[i:i + batch_size]
+        result = await db.execute(
+            select(FileBlob.sha256).where(
+                FileBlob.sha256.in_([obj.key.rsplit("/", 1)[-1] for obj in batch])
+            )
+        )
+        known = set(result.scalars().all())
+        for obj in batch:
+            if obj.key.rsplit("/", 1)[-1] in known or obj.modified.replace(tzinfo=None) >= cutoff:
+                continue
+            report["orphans_found"] += 1
+            if await budget.acquire():
+                await storage.delete(obj.key)
+                report["orphans_deleted"] += 1
+            else:
+                logger.warning(f"Orphan storage object: {obj.key} ({obj.size} bytes)")
+
+    # sha256 按十六进制前缀的范围查询，可以使用主键索引
+    result = await db.execute(
+        select(FileBlob.sha256, FileBlob.storage_path).where(
+            FileBlob.sha256 >= shard,
+            FileBlob.sha256 < f"{shard}~",
+            FileBlob.storage_path.like(f"{prefix}%")
+        )
+    )
+    for sha256, storage_path in result.all():
+        if storage_path not in listed_keys:
+            report["dangling_blobs"] += 1
+            logger.error(f"Blob {sha256} is missing from storage ({storage_path})")
+
+
+def _next_user_dirs(count: int) -> List[int]:
+    """从Redis中的进度游标开始取下一批本地用户目录（按用户ID循环）"""
+    user_ids = sorted(
+        int(name) for name in os.listdir(UPLOAD_DIR)
+        if name.isdigit() and os.path.isdir(os.path.join(UPLOAD_DIR, name))
+    )
+    if not user_ids:
+        return []
+    redis_client = get_sync_redis()
+    after = int(redis_client.get(RECONCILE_USER_CURSOR_KEY) or 0)
+    selected = [uid for uid in user_ids if uid > after][:count]
+    if len(selected) < count:
+        # 一轮结束，从头开始
+        selected += [uid for uid in user_ids if uid <= after and uid not in selected][:count - len(selected)]
+    redis_client.set(RECONCILE_USER_CURSOR_KEY, selected[-1])
+    return selected
+
+
+async def _reconcile_user_dir(
+    db: AsyncSession,
+    storage: StorageBackend,
+    user_id: int,
+    cutoff: datetime,
+    budget: _DeleteBudget,
+    report: Dict[str, Any]
+) -> None:
+    """
+    对账一个本地用户目录（旧版按用户存放的文件、上传临时文件、断点续传分块）
+
+    - 没有文件记录、内容块或进行中的上传引用、且超过宽限期的文件：孤儿，删除或报告
+    - 文件记录指向该目录但磁盘上不存在：悬空，报告
+
+    迁移 006 把相同内容的所有文件记录（包括其他用户的）指向其中一个已有副本，
+    因此按路径而不是按所有者查找引用：任何文件记录或内容块指向的路径都不是孤儿
+    """
+    user_dir = os.path.join(UPLOAD_DIR, str(user_id))
+    on_disk = [obj async for obj in storage.list_keys(f"{user_id}/")]
+    present = {storage.local_path(obj.key) for obj in on_disk}
+
+    # 记录中的路径可能是相对键或历史绝对路径
+    prefixes = [escape_like(f"{user_id}/") + "%", escape_like(user_dir + os.sep) + "%"]
+    result = await db.execute(
+        select(FileModel.file_path).where(
+            or_(*(FileModel.file_path.like(prefix, escape="\\") for prefix in prefixes))
+        )
+    )
+    referenced = {storage.local_path(path) for path in result.scalars().all()}
+
+    result = await db.execute(
+        select(FileBlob.storage_path).where(
+            or_(*(FileBlob.storage_path.like(prefix, escape="\\") for prefix in prefixes))
+        )
+    )
+    referenced.update(storage.local_path(path) for path in result.scalars().all())
+
+    result = await db.execute(
+        select(UploadSession.temp_path).where(
+            UploadSession.user_id == user_id,
+            UploadSession.status.in_(("uploading", "completing")),
+            UploadSession.expires_at > datetime.utcnow()
+        )
+    )
+    referenced.update(storage.local_path(path) for path in result.scalars().all())
+
+    for obj in on_disk:
+        path = storage.local_path(obj.key)
+        if path in referenced or obj.modified.replace(tzinfo=None) >= cutoff:
+            continue
+        report["orphans_found"] += 1
+        if await budget.acquire():
+            await storage.delete(obj.key)
+            report["orphans_deleted"] += 1
+        else:
+            logger.warning(f"Orphan upload file: {path} ({obj.size} bytes)")
+
+    for path in referenced:
+        if path.startswith(user_dir + os.sep) and path not in present and not path.endswith(".part"):
+            report["dangling_files"] += 1
+            logger.error(f"File row points to missing file {path}")
+
+
+async def _reconcile_storage() -> Dict[str, Any]:
+    """执行一轮对账：若干内容块分片 + 若干本地用户目录"""
+    storage = get_storage()
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.RECONCILE_GRACE_SECONDS)
+    budget = _DeleteBudget(
+        settings.RECONCILE_DELETE_ORPHANS,
+        settings.RECONCILE_MAX_DELETES_PER_RUN,
+        settings.RECONCILE_DELETES_PER_SECOND
+    )
+    report: Dict[str, Any] = {
+        "shards": _next_shards(settings.RECONCILE_SHARDS_PER_RUN),
+        "users": [],
+        "orphans_found": 0,
+        "orphans_deleted": 0,
+        "dangling_blobs": 0,
+        "dangling_files": 0,
+    }
+
+    async with AsyncSessionLocal() as db:
+        for shard in report["shards"]:
+            await _reconcile_blob_shard(
+                db, storage, shard, cutoff, budget, settings.RECONCILE_BATCH_SIZE, report
+            )
+
+        # 旧版文件和上传临时文件只存在于本地磁盘
+        if isinstance(storage, LocalStorage):
+            report["users"] = _next_user_dirs(settings.RECONCILE_USERS_PER_RUN)
+            for user_id in report["users"]:
+                await _reconcile_user_dir(db, storage, user_id, cutoff, budget, report)
+
+    return report
+
+
+@celery_app.task
+def reconcile_storage() -> dict:
+    """
+    存储对账（由 celery beat 定期调度，每次处理一部分分片，多次运行覆盖全部数据）
+    """
+    loop = asyncio.get_event_loop()
+    report = loop.run_until_complete(_reconcile_storage())
+    if report["orphans_found"] or report["dangling_blobs"] or report["dangling_files"]:
+        logger.warning(f"Storage reconcile report: {report}")
+    return report
+
+
+async def _expire_upload_sessions(batch_size: int) -> int:
+    """
+    标记一批过期的上传并删除其临时文件（包括分块租约文件）
+
+    持有未过期租约的上传等租约结束后再处理；先提交状态再删除文件，
+    删除失败时遗留的文件由对账任务清理
+
+    Returns:
+        int: 标记为过期的上传数
+    """
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(UploadSession.id, UploadSession.temp_path)
+            .where(
+                UploadSession.status.in_(("uploading", "completing")),
+                UploadSession.expires_at < now,
+                or_(UploadSession.writer_expires_at.is_(None), UploadSession.writer_expires_at < now),
+            )
+            .order_by(UploadSession.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        expired = result.all()
+        if not expired:
+            return 0
+        await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id.in_([upload_id for upload_id, _ in expired]))
+            .values(status="expired", writer_token=None, writer_expires_at=None)
+        )
+        await db.commit()
+
+    for _, temp_path in expired:
+        for path in [temp_path] + glob.glob(glob.escape(temp_path) + ".*"):
+            await remove_file(path)
+    return len(expired)
+
+
+@celery_app.task
+def expire_upload_sessions() -> dict:
+    """
+    清理过期未完成的断点续传上传（由 celery beat 调度）
+    """
+    loop = asyncio.get_event_loop()
+    expired = loop.run_until_complete(_expire_upload_sessions(settings.UPLOAD_EXPIRE_BATCH_SIZE))
+    if expired:
+        logger.info(f"Expired {expired} upload sessions")
+    return {"expired": expired}
+
+
+async def _set_metadata_state(db: AsyncSession, sha256: str, **values: Any) -> None:
+    """更新元数据状态（保持 updated_at 不变，它只记录引用变化，供回收任务判断宽限期）"""
+    await db.execute(
+        update(FileBlob)
+        .where(FileBlob.sha256 == sha256)
+        .values(
+            metadata_updated_at=datetime.utcnow(),
+            updated_at=FileBlob.updated_at,
+            **values
+        )
+    )
+
+
+async def _claim_metadata(sha256: str) -> Optional[Tuple[str, List[str], Dict[str, Any]]]:
+    """
+    领取内容块的元数据计算（行锁保证同一内容只有一个worker处理）
+
+    Returns:
+        Optional[Tuple[str, List[str], Dict[str, Any]]]:
+            (存储路径, 待执行的阶段, 已有结果)；无需处理时返回None
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(FileBlob).where(FileBlob.sha256 == sha256).with_for_update()
+        )
+        blob = result.scalar_one_or_none()
+        if blob is None:
+            return None
+
+        if blob.metadata_status == "processing" and blob.metadata_updated_at and \
+                blob.metadata_updated_at > datetime.utcnow() - METADATA_PROCESSING_TIMEOUT:
+            return None
+
+        derived = dict(blob.derived_metadata or {})
+        # 已成功的阶段不重复执行；新启用的阶段会在下次触发时补算
+        missing = [name for name in enabled_stages() if name not in derived]
+        if not missing:
+            if blob.metadata_status != "ready":
+                await _set_metadata_state(db, sha256, metadata_status="ready", metadata_error=None)
+                await db.commit()
+            return None
+
+        storage_path = blob.storage_path
+        await _set_metadata_state(
+            db, sha256,
+            metadata_status="processing",
+            metadata_error=None,
+            metadata_attempts=FileBlob.metadata_attempts + 1
+        )
+        await db.commit()
+        return storage_path, missing, derived
+
+
+async def _fetch_local_copy(storage: StorageBackend, key: str) -> Tuple[str, bool]:
+    """
+    获取可直接读取的本地文件
+
+    Returns:
+        Tuple[str, bool]: (本地路径, 是否为需要删除的临时文件)
+    """
+    path = storage.local_path(key)
+    if path is not None:
+        return path, False
+
+    fd, temp_path = tempfile.mkstemp(suffix=".meta")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in storage.open_range(key):
+                f.write(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path, True
+
+
+async def _extract_file_metadata(sha256: str) -> Dict[str, Any]:
+    """
+    依次执行缺失的阶段，每个阶段完成后立即保存结果，客户端可通过文件详情看到进度
+    """
+    claim = await _claim_metadata(sha256)
+    if claim is None:
+        return {"sha256": sha256, "status": "skipped"}
+    storage_path, stages, derived = claim
+
+    storage = get_storage()
+    temp = False
+    path = None
+    try:
+        path, temp = await _fetch_local_copy(storage, storage_path)
+        async with AsyncSessionLocal() as db:
+            for name in stages:
+                # 不适用的阶段记为None，之后不再重复执行
+                derived[name] = get_stage(name)(path)
+                await _set_metadata_state(db, sha256, derived_metadata=dict(derived))
+                await db.commit()
+            await _set_metadata_state(db, sha256, metadata_status="ready")
+            await db.commit()
+    except Exception as e:
+        logger.exception(f"Metadata extraction failed for blob {sha256}")
+        async with AsyncSessionLocal() as db:
+            await _set_metadata_state(
+                db, sha256, metadata_status="failed", metadata_error=str(e)[:1000]
+            )
+            await db.commit()
+        return {"sha256": sha256, "status": "failed", "error": str(e)}
+    finally:
+        if temp and path:
+            os.remove(path)
+
+    return {"sha256": sha256, "status": "ready", "stages": stages}
+
+
+@celery_app.task
+def extract_file_metadata(sha256: str, mime_type: Optional[str] = None) -> dict:
+    """
+    计算内容块的派生元数据（上传完成后触发；未完成的由 retry_file_metadata 重新提交）
+
+    Args:
+        sha256: 内容SHA-256
+        mime_type: 已不使用（阶段只根据内容判断），保留以兼容队列中的旧任务
+    """
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(_extract_file_metadata(sha256))
+
+
+async def _retry_file_metadata(retry_seconds: int, max_attempts: int, batch_size: int) -> List[str]:
+    """
+    选出需要重新计算的内容块并标记为 pending，返回其哈希
+
+    - pending：超过重试间隔仍未处理（迁移前的内容块、提交任务失败或任务丢失）
+    - failed：距上次失败超过重试间隔且尝试次数未达上限
+    - processing：超过 METADATA_PROCESSING_TIMEOUT，视为worker已中断
+
+    标记时刷新 metadata_updated_at，任务排队期间不会被重复提交
+    """
+    now = datetime.utcnow()
+    retry_cutoff = now - timedelta(seconds=retry_seconds)
+    stale_cutoff = now - METADATA_PROCESSING_TIMEOUT
+    last_change = func.coalesce(FileBlob.metadata_updated_at, FileBlob.created_at)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(FileBlob.sha256)
+            .where(
+                FileBlob.ref_count > 0,
+                or_(
+                    and_(FileBlob.metadata_status == "pending", last_change < retry_cutoff),
+                    and_(
+                        FileBlob.metadata_status == "failed",
+                        FileBlob.metadata_attempts < max_attempts,
+                        last_change < retry_cutoff,
+                    ),
+                    and_(FileBlob.metadata_status == "processing", last_change < stale_cutoff),
+                ),
+            )
+            .order_by(last_change)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        hashes = list(result.scalars())
+        if hashes:
+            await db.execute(
+                update(FileBlob)
+                .where(FileBlob.sha256.in_(hashes))
+                .values(
+                    metadata_status="pending",
+                    metadata_updated_at=now,
+                    updated_at=FileBlob.updated_at
+                )
+            )
+            await db.commit()
+    return hashes
+
+
+@celery_app.task
+def retry_file_metadata() -> dict:
+    """
+    定期重新提交未完成的元数据计算（由 celery beat 调度）
+
+    提交失败的内容块保持 pending，下次运行时再次提交
+    """
+    loop = asyncio.get_event_loop()
+    hashes = loop.run_until_complete(
+        _retry_file_metadata(
+            settings.FILE_METADATA_RETRY_SECONDS,
+            settings.FILE_METADATA_MAX_ATTEMPTS,
+            settings.FILE_METADATA_RETRY_BATCH_SIZE
+        )
+    )
+    for sha256 in hashes:
+        extract_file_metadata.delay(sha256)
+    if hashes:
+        logger.info(f"Re-enqueued metadata extraction for {len(hashes)} blobs")
+    return {"enqueued": len(hashes)}
@@ -10,6 +10,8 @@ from sqlalchemy.orm import sessionmaker
 from httpx import AsyncClient
 from app.main import app
 from app.database import Base, get_db
+from app.core.security import create_access_token
+from app.models.user import User
 
 # 测试数据库URL（SQLite）
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -60,3 +62,14 @@ async def client(db_session):
     
     # 清理依赖覆盖
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def auth_user(db_session):
+    """创建测试用户，返回 (用户, 认证请求头)"""
+    user = User(email="owner@example.com", username="owner", hashed_password="x")
+    db_session.add(user)
+    await db_session.commit()
+    await db_session.refresh(user)
+    token = create_access_token({"sub": str(user.id)})
+    return user, {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,28 @@
+"""
+常驻worker协议的最小参考实现（用于测试）
+
+按 app/utils/opencode_sidecar.py 中的协议约定逐行读取请求，
+把消息按空格拆分后作为输出片段返回；消息为 "fail" 时返回错误，为 "exit" 时直接退出
+"""
+import json
+import sys
+
+
+def main() -> None:
+    for line in sys.stdin:
+        request = json.loads(line)
+        message = request["message"]
+        if message == "exit":
+            return
+        if message == "fail":
+            events = [{"type": "error", "error": "requested failure"}]
+        else:
+            events = [{"type": "chunk", "content": part} for part in message.split(" ")]
+            events.append({"type": "done"})
+        for event in events:
+            sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
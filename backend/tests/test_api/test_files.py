@@ -0,0 +1,48 @@
+"""
+文件API测试
+"""
+import pytest
+from httpx import AsyncClient
+
+from app.models.file import File as FileModel
+from app.models.file_blob import FileBlob
+
+SHA = "ab" * 32
+
+
+@pytest.fixture
+async def stored_file(db_session, auth_user):
+    """一个已计算派生元数据的文件"""
+    user, _ = auth_user
+    db_session.add(FileBlob(
+        sha256=SHA, size=5, storage_path="blobs/ab/ab/x", ref_count=1,
+        metadata_status="ready",
+        derived_metadata={"text": {"encoding": "utf-8", "excerpt": "hello" * 800}, "image": None}
+    ))
+    db_file = FileModel(
+        user_id=user.id, filename="a.txt", stored_filename="a.txt", file_path="blobs/ab/ab/x",
+        file_size=5, mime_type="text/plain", content_hash=SHA
+    )
+    db_session.add(db_file)
+    await db_session.commit()
+    return db_file
+
+
+@pytest.mark.asyncio
+async def test_list_files_omits_derived_metadata(client: AsyncClient, auth_user, stored_file):
+    """测试文件列表不返回派生元数据，文件详情返回"""
+    _, headers = auth_user
+
+    response = await client.get("/api/files", headers=headers)
+    assert response.status_code == 200
+    item = response.json()["items"][0]
+    assert item["id"] == stored_file.id
+    assert "derived_metadata" not in item
+    assert "metadata_status" not in item
+
+    response = await client.get(f"/api/files/{stored_file.id}/info", headers=headers)
+    assert response.status_code == 200
+    info = response.json()
+    assert info["metadata_status"] == "ready"
+    assert info["metadata_progress"] == 1.0
+    assert info["derived_metadata"]["text"]["encoding"] == "utf-8"
@@ -0,0 +1,55 @@
+"""
+会话API测试
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+
+from app.models.session import Session
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_cursor(client: AsyncClient, db_session, auth_user):
+    """测试会话列表游标分页：X-Next-Cursor 指向下一页，最后一页不返回"""
+    user, headers = auth_user
+    base = datetime(2024, 1, 1)
+    for i in range(3):
+        db_session.add(Session(
+            user_id=user.id, title=f"s{i}", created_at=base, updated_at=base + timedelta(minutes=i)
+        ))
+    await db_session.commit()
+
+    response = await client.get("/api/sessions", params={"limit": 2}, headers=headers)
+    assert response.status_code == 200
+    assert [s["title"] for s in response.json()] == ["s2", "s1"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await client.get(
+        "/api/sessions", params={"limit": 2, "cursor": cursor}, headers=headers
+    )
+    assert response.status_code == 200
+    assert [s["title"] for s in response.json()] == ["s0"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_create_session_stores_title(client: AsyncClient, auth_user):
+    """测试创建会话写入标题列（兼容旧客户端的 context.title），列表只返回摘要字段"""
+    _, headers = auth_user
+
+    response = await client.post("/api/sessions", json={"title": "新会话"}, headers=headers)
+    assert response.status_code == 201
+    assert response.json()["title"] == "新会话"
+
+    response = await client.post(
+        "/api/sessions", json={"context": {"title": "旧客户端"}}, headers=headers
+    )
+    assert response.status_code == 201
+    assert response.json()["title"] == "旧客户端"
+
+    response = await client.get("/api/sessions", headers=headers)
+    assert response.status_code == 200
+    items = response.json()
+    assert sorted(s["title"] for s in items) == ["新会话", "旧客户端"]
+    assert "context" not in items[0]
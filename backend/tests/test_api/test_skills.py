@@ -0,0 +1,52 @@
+"""
+技能API测试
+"""
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.fixture
+async def tagged_skills(client: AsyncClient, db_session, auth_user):
+    """通过接口创建带标签的技能（同步写入 skill_tags）"""
+    user, headers = auth_user
+    user.permissions = ["developer"]
+    await db_session.commit()
+
+    for name, tags, is_public in [
+        ("both", ["x", "y"], True),
+        ("only-x", ["x"], True),
+        ("private", [" y ", "y"], False),
+    ]:
+        response = await client.post(
+            "/api/skills",
+            json={"name": name, "prompt_template": "p", "tags": tags, "is_public": is_public},
+            headers=headers
+        )
+        assert response.status_code == 201
+    return headers
+
+
+@pytest.mark.asyncio
+async def test_list_skills_requires_all_tags(client: AsyncClient, tagged_skills):
+    """测试多标签过滤只返回同时带有全部标签的技能"""
+    response = await client.get("/api/skills", params={"tags": "x,y"}, headers=tagged_skills)
+    assert response.status_code == 200
+    data = response.json()
+    assert [s["name"] for s in data["items"]] == ["both"]
+    assert data["total"] == 1
+
+    response = await client.get("/api/skills", params={"tags": "y"}, headers=tagged_skills)
+    assert sorted(s["name"] for s in response.json()["items"]) == ["both", "private"]
+
+
+@pytest.mark.asyncio
+async def test_tag_facets(client: AsyncClient, tagged_skills):
+    """测试标签分面计数合并公开技能和自己的非公开技能，并按已选标签过滤"""
+    response = await client.get("/api/skills/tags/facets", headers=tagged_skills)
+    assert response.status_code == 200
+    assert response.json()["items"] == [{"tag": "x", "count": 2}, {"tag": "y", "count": 2}]
+
+    response = await client.get(
+        "/api/skills/tags/facets", params={"tags": "x"}, headers=tagged_skills
+    )
+    assert response.json()["items"] == [{"tag": "x", "count": 2}, {"tag": "y", "count": 1}]
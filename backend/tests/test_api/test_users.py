@@ -0,0 +1,29 @@
+"""
+用户API测试
+"""
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.asyncio
+async def test_storage_usage_and_quota_rejection(client: AsyncClient, db_session, auth_user):
+    """测试存储用量接口，以及超出配额的上传在写入前返回413"""
+    user, headers = auth_user
+    user.storage_quota = 10
+    user.storage_used = 8
+    await db_session.commit()
+
+    response = await client.get("/api/users/me/storage", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"used": 8, "quota": 10, "available": 2}
+
+    response = await client.post(
+        "/api/files/upload",
+        files={"file": ("a.txt", b"hello", "text/plain")},
+        headers=headers
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Storage quota exceeded"
+
+    await db_session.refresh(user)
+    assert user.storage_used == 8
@@ -0,0 +1,87 @@
+"""
+WebSocket连接管理器测试
+"""
+import asyncio
+
+import pytest
+
+from app.api import websocket as ws_module
+from app.api.websocket import ConnectionManager
+from app.core.events import session_channel, ws_channel
+
+
+class FakePubSub:
+    """记录订阅变更的pub/sub替身"""
+
+    def __init__(self):
+        self.channels = set()
+        self.calls = []
+
+    async def subscribe(self, *channels):
+        self.calls.append(("subscribe", channels))
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.calls.append(("unsubscribe", channels))
+        self.channels.difference_update(channels)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        await asyncio.sleep(timeout)
+        return None
+
+    async def close(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.pubsubs = []
+
+    def pubsub(self):
+        pubsub = FakePubSub()
+        self.pubsubs.append(pubsub)
+        return pubsub
+
+
+class FakeWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_subscribes_only_while_session_has_local_connections(monkeypatch):
+    """第一个本地连接订阅会话频道，最后一个断开后退订"""
+    redis = FakeRedis()
+    monkeypatch.setattr(ws_module, "get_redis", lambda: redis)
+    manager = ConnectionManager(distributed=True)
+
+    first = await manager.connect(FakeWebSocket(), "1", "u1")
+    # 监听任务建立订阅连接并订阅已有会话
+    for _ in range(5):
+        await asyncio.sleep(0)
+    pubsub = redis.pubsubs[0]
+    assert pubsub.channels == {session_channel("1"), ws_channel("1")}
+
+    second = await manager.connect(FakeWebSocket(), "1", "u2")
+    other = await manager.connect(FakeWebSocket(), "2", "u1")
+    assert pubsub.channels == {
+        session_channel("1"), ws_channel("1"), session_channel("2"), ws_channel("2")
+    }
+    assert [c for c in pubsub.calls if c[1][0] == session_channel("1")] == [
+        ("subscribe", (session_channel("1"), ws_channel("1")))
+    ]
+
+    manager.disconnect(first)
+    await asyncio.sleep(0)
+    assert session_channel("1") in pubsub.channels
+
+    manager.disconnect(second)
+    manager.disconnect(other)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert pubsub.channels == set()
+
+    await manager.stop_event_listener()
@@ -0,0 +1,211 @@
+"""
+内容块回收与迁移任务测试（SQLite）
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import tasks.file_tasks as file_tasks
+from app.core.storage import LocalStorage
+from app.models.file import File as FileModel
+from app.models.file_blob import FileBlob
+from app.models.upload_session import UploadSession
+from app.utils.blob_store import blob_key
+
+SHA = "ab" * 32
+
+
+@pytest.fixture
+async def env(tmp_path, monkeypatch):
+    """临时数据库和本地存储"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            FileBlob.metadata.create_all,
+            tables=[FileBlob.__table__, FileModel.__table__, UploadSession.__table__]
+        )
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    root = tmp_path / "uploads"
+    root.mkdir()
+    storage = LocalStorage(str(root))
+
+    monkeypatch.setattr(file_tasks, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(file_tasks, "get_storage", lambda: storage)
+    monkeypatch.setattr(file_tasks, "UPLOAD_DIR", str(root))
+    yield session_factory, storage, root
+    await engine.dispose()
+
+
+def _file_row(storage_path: str, user_id: int) -> FileModel:
+    return FileModel(
+        user_id=user_id,
+        filename="a.txt",
+        stored_filename=f"{user_id}.txt",
+        file_path=storage_path,
+        file_size=5,
+        mime_type="text/plain",
+        content_hash=SHA
+    )
+
+
+@pytest.mark.asyncio
+async def test_collect_unreferenced_blobs_deletes_row_then_object(env):
+    """测试回收任务删除记录后删除对象"""
+    session_factory, storage, root = env
+    key = blob_key(SHA)
+    os.makedirs(root / os.path.dirname(key))
+    (root / key).write_bytes(b"hello")
+
+    async with session_factory() as db:
+        db.add(FileBlob(
+            sha256=SHA, size=5, storage_path=key, ref_count=0,
+            updated_at=datetime.utcnow() - timedelta(days=1)
+        ))
+        await db.commit()
+
+    removed = await file_tasks._collect_unreferenced_blobs(grace_seconds=60, batch_size=10)
+
+    assert removed == 1
+    assert not (root / key).exists()
+    async with session_factory() as db:
+        assert (await db.execute(select(FileBlob))).scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_delete_blob_object_skips_reuploaded_content(env):
+    """测试内容被重新登记后回收任务不删除对象"""
+    session_factory, storage, root = env
+    key = blob_key(SHA)
+    os.makedirs(root / os.path.dirname(key))
+    (root / key).write_bytes(b"hello")
+
+    async with session_factory() as db:
+        db.add(FileBlob(sha256=SHA, size=5, storage_path=key, ref_count=1))
+        await db.commit()
+
+    assert await file_tasks._delete_blob_object(SHA, key) is False
+    assert (root / key).exists()
+
+
+@pytest.mark.asyncio
+async def test_relocate_legacy_blobs(env):
+    """测试迁移前的内容块被移动到 blobs/ 下，所有引用它的文件记录随之更新"""
+    session_factory, storage, root = env
+    legacy = root / "1" / "legacy.txt"
+    legacy.parent.mkdir()
+    legacy.write_bytes(b"hello")
+
+    async with session_factory() as db:
+        db.add(FileBlob(sha256=SHA, size=5, storage_path=str(legacy), ref_count=2))
+        db.add(_file_row(str(legacy), user_id=1))
+        db.add(_file_row(str(legacy), user_id=2))
+        await db.commit()
+
+    assert await file_tasks._relocate_legacy_blobs(batch_size=10) == 1
+
+    key = blob_key(SHA)
+    assert (root / key).read_bytes() == b"hello"
+    assert not legacy.exists()
+    async with session_factory() as db:
+        blob = (await db.execute(select(FileBlob))).scalar_one()
+        assert blob.storage_path == key
+        paths = (await db.execute(select(FileModel.file_path))).scalars().all()
+        assert paths == [key, key]
+
+    # 全部移动后为空操作
+    assert await file_tasks._relocate_legacy_blobs(batch_size=10) == 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_user_dir_keeps_shared_legacy_blob(env):
+    """测试用户目录对账不删除其他用户的文件记录或内容块仍引用的副本"""
+    session_factory, storage, root = env
+    shared = root / "1" / "shared.txt"
+    orphan = root / "1" / "orphan.txt"
+    shared.parent.mkdir()
+    shared.write_bytes(b"hello")
+    orphan.write_bytes(b"bye")
+
+    async with session_factory() as db:
+        # 用户1已删除自己的文件，只剩用户2的记录和内容块指向该副本
+        db.add(FileBlob(sha256=SHA, size=5, storage_path=str(shared), ref_count=1))
+        db.add(_file_row(str(shared), user_id=2))
+        await db.commit()
+
+    report = {"orphans_found": 0, "orphans_deleted": 0, "dangling_files": 0}
+    budget = file_tasks._DeleteBudget(True, 10, 0)
+    cutoff = datetime.utcnow() + timedelta(days=1)
+    async with session_factory() as db:
+        await file_tasks._reconcile_user_dir(db, storage, 1, cutoff, budget, report)
+
+    assert shared.exists()
+    assert not orphan.exists()
+    assert report == {"orphans_found": 1, "orphans_deleted": 1, "dangling_files": 0}
+
+
+@pytest.mark.asyncio
+async def test_retry_file_metadata_selects_unfinished_blobs(env):
+    """测试重新提交长时间 pending、可重试的 failed 和中断的 processing 内容块"""
+    session_factory, storage, root = env
+    old = datetime.utcnow() - timedelta(days=1)
+    blobs = {
+        "pending_old": dict(metadata_status="pending", created_at=old),
+        "pending_new": dict(metadata_status="pending"),
+        "failed": dict(metadata_status="failed", metadata_attempts=1, metadata_updated_at=old),
+        "failed_exhausted": dict(metadata_status="failed", metadata_attempts=5, metadata_updated_at=old),
+        "processing_stale": dict(metadata_status="processing", metadata_updated_at=old),
+        "processing": dict(metadata_status="processing", metadata_updated_at=datetime.utcnow()),
+        "ready": dict(metadata_status="ready", metadata_updated_at=old),
+        "unreferenced": dict(metadata_status="pending", created_at=old, ref_count=0),
+    }
+    async with session_factory() as db:
+        for name, values in blobs.items():
+            values.setdefault("ref_count", 1)
+            db.add(FileBlob(sha256=name, size=1, storage_path=name, **values))
+        await db.commit()
+
+    hashes = await file_tasks._retry_file_metadata(retry_seconds=900, max_attempts=5, batch_size=10)
+
+    assert sorted(hashes) == ["failed", "pending_old", "processing_stale"]
+    async with session_factory() as db:
+        rows = {b.sha256: b for b in (await db.execute(select(FileBlob))).scalars()}
+    assert all(rows[name].metadata_status == "pending" for name in hashes)
+    # 刚标记的内容块在任务排队期间不会被重复提交
+    assert await file_tasks._retry_file_metadata(retry_seconds=900, max_attempts=5, batch_size=10) == []
+
+
+@pytest.mark.asyncio
+async def test_expire_upload_sessions(env):
+    """测试过期上传被标记为 expired 并删除临时文件，租约未结束的上传暂不处理"""
+    session_factory, storage, root = env
+    staging = root / "1" / ".uploads"
+    staging.mkdir(parents=True)
+    now = datetime.utcnow()
+    rows = {
+        "expired": dict(expires_at=now - timedelta(hours=1)),
+        "leased": dict(
+            expires_at=now - timedelta(hours=1),
+            writer_token="t", writer_expires_at=now + timedelta(minutes=5)
+        ),
+        "active": dict(expires_at=now + timedelta(hours=1)),
+    }
+    async with session_factory() as db:
+        for upload_id, values in rows.items():
+            temp_path = staging / f"{upload_id}.part"
+            temp_path.write_bytes(b"x")
+            db.add(UploadSession(
+                id=upload_id, user_id=1, filename="a.txt", total_size=1,
+                temp_path=str(temp_path), status="uploading", **values
+            ))
+        await db.commit()
+    (staging / "expired.part.lease").write_bytes(b"x")
+
+    assert await file_tasks._expire_upload_sessions(batch_size=10) == 1
+
+    async with session_factory() as db:
+        statuses = dict((await db.execute(select(UploadSession.id, UploadSession.status))).all())
+    assert statuses == {"expired": "expired", "leased": "uploading", "active": "uploading"}
+    assert sorted(os.listdir(staging)) == ["active.part", "leased.part"]
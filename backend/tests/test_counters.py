@@ -0,0 +1,175 @@
+"""
+写后计数器测试（SQLite + 内存中的Redis替身）
+"""
+import pytest
+from redis.exceptions import ResponseError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.utils.counters as counters
+import tasks.counter_tasks as counter_tasks
+from app.models.counter_flush import CounterFlush
+from app.models.skill import Skill
+from app.models.user import User
+
+
+class FakeRedis:
+    """只实现计数器用到的哈希命令"""
+
+    def __init__(self):
+        self.data = {}
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def rename(self, src, dst):
+        if src not in self.data:
+            raise ResponseError("no such key")
+        self.data[dst] = self.data.pop(src)
+
+    def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    def hsetnx(self, key, field, value):
+        values = self.data.setdefault(key, {})
+        if field in values:
+            return 0
+        values[field] = str(value)
+        return 1
+
+    def hincrby(self, key, field, amount):
+        values = self.data.setdefault(key, {})
+        values[field] = str(int(values.get(field, 0)) + amount)
+        return int(values[field])
+
+    def hmget(self, key, fields):
+        values = self.data.get(key, {})
+        return [values.get(field) for field in fields]
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    async def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+class BrokenRedis:
+    def pipeline(self, transaction=True):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture
+async def env(tmp_path, monkeypatch):
+    """临时数据库（一个技能）和Redis替身"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Skill.metadata.create_all,
+            tables=[User.__table__, Skill.__table__, CounterFlush.__table__]
+        )
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        db.add(User(id=1, username="u", email="u@example.com", hashed_password="x"))
+        db.add(Skill(id=1, user_id=1, name="s", slug="s", prompt_template="p", use_count=10))
+        await db.commit()
+
+    redis = FakeRedis()
+    monkeypatch.setattr(counters, "get_redis", lambda: redis)
+    monkeypatch.setattr(counter_tasks, "get_sync_redis", lambda: redis)
+    monkeypatch.setattr(counter_tasks, "AsyncSessionLocal", session_factory)
+    yield session_factory, redis
+    await engine.dispose()
+
+
+async def _use_count(session_factory) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(Skill.use_count).where(Skill.id == 1))).scalar_one()
+
+
+async def _merged_use_count(session_factory) -> int:
+    async with session_factory() as db:
+        rows = await counters.merge_pending(db, "skills", [{"id": 1, "use_count": 0, "name": "s"}])
+    return rows[0]["use_count"]
+
+
+@pytest.mark.asyncio
+async def test_increment_buffers_in_redis(env):
+    """测试计数在Redis中累加，并记录批次ID"""
+    session_factory, redis = env
+    async with session_factory() as db:
+        await counters.increment(db, "skills", 1, "use_count")
+        await counters.increment(db, "skills", 1, "use_count", 2)
+
+    pending = redis.data[counters.PENDING_KEY.format(table="skills")]
+    assert pending["1:use_count"] == "3"
+    assert counters.FLUSH_ID_FIELD in pending
+    assert await _use_count(session_factory) == 10
+
+
+@pytest.mark.asyncio
+async def test_increment_falls_back_to_database(env, monkeypatch):
+    """测试Redis不可用时直接在数据库中自增"""
+    session_factory, _ = env
+    monkeypatch.setattr(counters, "get_redis", lambda: BrokenRedis())
+    async with session_factory() as db:
+        await counters.increment(db, "skills", 1, "use_count", 2)
+        await db.commit()
+    assert await _use_count(session_factory) == 12
+
+    with pytest.raises(ValueError):
+        async with session_factory() as db:
+            await counters.increment(db, "skills", 1, "unknown")
+
+
+@pytest.mark.asyncio
+async def test_merge_pending_overlays_fresh_counts(env, monkeypatch):
+    """测试合并时重新查询计数（覆盖缓存中的旧值）并加上未写回的增量"""
+    session_factory, _ = env
+    async with session_factory() as db:
+        await counters.increment(db, "skills", 1, "use_count", 5)
+    assert await _merged_use_count(session_factory) == 15
+
+    monkeypatch.setattr(counters, "get_redis", lambda: BrokenRedis())
+    assert await _merged_use_count(session_factory) == 10
+
+
+@pytest.mark.asyncio
+async def test_flush_counters_applies_each_batch_once(env):
+    """测试写回提交后、删除写回中哈希前中断时，读取和重新写回都不会重复计数"""
+    session_factory, redis = env
+    async with session_factory() as db:
+        await counters.increment(db, "skills", 1, "use_count", 5)
+
+    flush_id, raw = counter_tasks._take_pending("skills")
+    assert raw == {"1:use_count": "5"}
+    assert await counter_tasks._apply_deltas("skills", flush_id, {1: {"use_count": 5}}, 100)
+    # 写回中哈希尚未删除，新的增量写入新的待写回哈希
+    async with session_factory() as db:
+        await counters.increment(db, "skills", 1, "use_count")
+    assert await _use_count(session_factory) == 15
+    assert await _merged_use_count(session_factory) == 16
+
+    # 重新写回：已提交的批次被跳过，只写回新的增量
+    assert await counter_tasks._flush_counters(100) == {"skills": 0, "apps": 0}
+    assert await counter_tasks._flush_counters(100) == {"skills": 1, "apps": 0}
+    assert await _use_count(session_factory) == 16
+    assert await _merged_use_count(session_factory) == 16
+    assert redis.data == {}
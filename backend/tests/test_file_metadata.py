@@ -0,0 +1,59 @@
+"""
+派生元数据阶段测试
+"""
+import struct
+
+from app.utils.file_metadata import enabled_stages, get_stage
+
+
+def test_enabled_stages():
+    """测试默认启用的阶段"""
+    assert enabled_stages() == ["text", "image"]
+
+
+def test_text_stage(tmp_path):
+    """测试文本行数、字符数和编码识别"""
+    path = tmp_path / "a.txt"
+    path.write_bytes("第一行\nsecond\nthird".encode("utf-8"))
+    result = get_stage("text")(str(path))
+    assert result["encoding"] == "utf-8"
+    assert result["line_count"] == 3
+    assert result["char_count"] == 16
+    assert result["excerpt"].startswith("第一行")
+    assert result["truncated"] is False
+
+    binary = tmp_path / "b.bin"
+    binary.write_bytes(b"\x00\x01\x02")
+    assert get_stage("text")(str(binary)) is None
+
+
+def test_text_stage_depends_on_content_only(tmp_path):
+    """测试非UTF-8内容按是否含控制字符判断是否为文本"""
+    latin = tmp_path / "a.dat"
+    latin.write_bytes("café\n".encode("latin-1"))
+    assert get_stage("text")(str(latin))["encoding"] == "latin-1"
+
+    binary = tmp_path / "b.dat"
+    binary.write_bytes(b"\x80\x01\x02\xff")
+    assert get_stage("text")(str(binary)) is None
+
+
+def test_image_stage(tmp_path):
+    """测试按文件头读取PNG和JPEG尺寸"""
+    png = tmp_path / "a.png"
+    png.write_bytes(
+        b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x08\x02\x00\x00\x00"
+    )
+    assert get_stage("image")(str(png)) == {"format": "png", "width": 640, "height": 480}
+
+    jpeg = tmp_path / "a.jpg"
+    jpeg.write_bytes(
+        b"\xff\xd8"
+        + b"\xff\xe0" + struct.pack(">H", 4) + b"\x00\x00"
+        + b"\xff\xc0" + struct.pack(">H", 11) + b"\x08" + struct.pack(">HH", 200, 300) + b"\x03\x00\x00\x00"
+    )
+    assert get_stage("image")(str(jpeg)) == {"format": "jpeg", "width": 300, "height": 200}
+
+    text = tmp_path / "a.txt"
+    text.write_bytes(b"not an image")
+    assert get_stage("image")(str(text)) is None
@@ -0,0 +1,73 @@
+"""
+上传文件存储测试
+"""
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from app.utils import file_storage
+from app.utils.file_storage import FileTooLargeError, save_upload_to_temp
+
+
+@pytest.mark.asyncio
+async def test_save_upload_to_temp(tmp_path, monkeypatch):
+    """测试分块写入临时文件并计算大小和哈希"""
+    monkeypatch.setattr(file_storage, "UPLOAD_CHUNK_SIZE", 4)
+    content = b"hello streaming upload"
+    upload = UploadFile(file=io.BytesIO(content), filename="a.txt")
+
+    saved = await save_upload_to_temp(upload, str(tmp_path / "1"), max_size=1024)
+
+    assert saved.size == len(content)
+    assert saved.sha256 == hashlib.sha256(content).hexdigest()
+    with open(saved.path, "rb") as f:
+        assert f.read() == content
+
+
+@pytest.mark.asyncio
+async def test_save_upload_to_temp_too_large(tmp_path, monkeypatch):
+    """测试超过大小限制时中止并删除临时文件"""
+    monkeypatch.setattr(file_storage, "UPLOAD_CHUNK_SIZE", 4)
+    upload = UploadFile(file=io.BytesIO(b"x" * 100), filename="a.txt")
+
+    with pytest.raises(FileTooLargeError):
+        await save_upload_to_temp(upload, str(tmp_path), max_size=10)
+
+    assert os.listdir(tmp_path) == []
+
+
+async def _stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_write_stream_at_resumes_from_offset(tmp_path):
+    """测试从偏移处续写并丢弃未确认的数据"""
+    path = str(tmp_path / "upload.part")
+    await file_storage.create_empty_file(path)
+
+    written = await file_storage.write_stream_at(path, 0, _stream([b"hello ", b"junk"]), max_bytes=100)
+    assert written == 10
+
+    # 服务端只确认了前6个字节，从偏移6续传
+    written = await file_storage.write_stream_at(path, 6, _stream([b"world"]), max_bytes=100)
+    assert written == 5
+    with open(path, "rb") as f:
+        assert f.read() == b"hello world"
+    assert await file_storage.hash_file(path) == hashlib.sha256(b"hello world").hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_copy_into_replaces_unconfirmed_tail(tmp_path):
+    """测试把分块文件写入临时文件的偏移处，并丢弃偏移之后的旧数据"""
+    path = tmp_path / "upload.part"
+    path.write_bytes(b"hello junk")
+    chunk = tmp_path / "upload.part.lease"
+    chunk.write_bytes(b"world")
+
+    await file_storage.copy_into(str(path), 6, str(chunk))
+    assert path.read_bytes() == b"hello world"
@@ -0,0 +1,64 @@
+"""
+HTTP Range 与条件请求工具测试
+"""
+from datetime import datetime
+
+import pytest
+
+from app.utils.http_range import (
+    RangeNotSatisfiable,
+    make_etag,
+    http_date,
+    is_not_modified,
+    if_range_allows,
+    parse_range_header
+)
+
+
+def test_parse_range_header():
+    """测试单段、多段、后缀和开放区间"""
+    assert parse_range_header("bytes=0-99", 1000) == [(0, 99)]
+    assert parse_range_header("bytes=900-", 1000) == [(900, 999)]
+    assert parse_range_header("bytes=-100", 1000) == [(900, 999)]
+    assert parse_range_header("bytes=0-9, 20-29", 1000) == [(0, 9), (20, 29)]
+    # 结束偏移超过文件大小时截断
+    assert parse_range_header("bytes=990-2000", 1000) == [(990, 999)]
+    # 不可满足的区间被跳过
+    assert parse_range_header("bytes=0-9,5000-", 1000) == [(0, 9)]
+
+
+def test_parse_range_header_ignored():
+    """测试格式错误的Range被忽略（返回完整内容）"""
+    assert parse_range_header(None, 1000) is None
+    assert parse_range_header("items=0-9", 1000) is None
+    assert parse_range_header("bytes=9-0", 1000) is None
+    assert parse_range_header("bytes=a-b", 1000) is None
+
+
+def test_parse_range_header_unsatisfiable():
+    """测试所有区间都超出文件范围"""
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=1000-", 1000)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=-10", 0)
+
+
+def test_conditional_requests():
+    """测试 If-None-Match / If-Modified-Since / If-Range"""
+    etag = make_etag("ab" * 32, 10, 0)
+    modified = datetime(2026, 1, 1, 12, 0, 0, 500)
+
+    assert is_not_modified(etag, None, etag, modified)
+    assert is_not_modified(f'"other", W/{etag}', None, etag, modified)
+    assert not is_not_modified('"other"', None, etag, modified)
+    # If-None-Match 存在时忽略 If-Modified-Since
+    assert not is_not_modified('"other"', http_date(modified), etag, modified)
+    assert is_not_modified(None, http_date(modified), etag, modified)
+    assert not is_not_modified(None, "Thu, 01 Jan 2026 11:00:00 GMT", etag, modified)
+
+    assert if_range_allows(None, etag, modified)
+    assert if_range_allows(etag, etag, modified)
+    assert not if_range_allows('"stale"', etag, modified)
+    # 弱ETag不能用于If-Range
+    weak = make_etag(None, 10, 0)
+    assert not if_range_allows(weak, weak, modified)
@@ -0,0 +1,75 @@
+"""
+按行读取测试
+"""
+import mmap
+
+from app.utils.line_index import LineIndex, read_lines, read_tail
+
+
+def test_read_lines(tmp_path):
+    """测试按行号读取（跨越多个检查点）和超出行数"""
+    path = tmp_path / "a.log"
+    path.write_bytes(b"".join(b"line %d\r\n" % i for i in range(2500)))
+
+    chunk = read_lines(str(path), 1999, 3, 1024)
+    assert chunk.lines == [b"line 1999", b"line 2000", b"line 2001"]
+    assert chunk.has_more is True
+    assert chunk.total_lines is None
+
+    chunk = read_lines(str(path), 2498, 10, 1024)
+    assert chunk.lines == [b"line 2498", b"line 2499"]
+    assert chunk.has_more is False
+    assert chunk.total_lines == 2500
+
+    assert read_lines(str(path), 3000, 10, 1024).lines == []
+
+
+def test_read_lines_byte_limit(tmp_path):
+    """测试超过字节上限时截断"""
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"abcdefghij\nxyz")
+    chunk = read_lines(str(path), 0, 10, 4)
+    assert chunk.lines == [b"abcd"]
+    assert chunk.end_byte == 4
+    assert chunk.has_more is True
+
+
+def test_read_tail(tmp_path):
+    """测试从末尾读取"""
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"a\nb\nc\nd\n")
+    chunk = read_tail(str(path), 2, 1024)
+    assert chunk.lines == [b"c", b"d"]
+    assert chunk.start_byte == 4
+    assert chunk.has_more is True
+
+    chunk = read_tail(str(path), 10, 1024)
+    assert chunk.lines == [b"a", b"b", b"c", b"d"]
+    assert chunk.start_line == 0
+    assert chunk.total_lines == 4
+
+
+def test_line_index_stride(tmp_path):
+    """测试稀疏索引只记录检查点"""
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"x\n" * 25)
+    index = LineIndex(50, stride=10)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assert index.line_start(mm, 13) == 26
+        assert list(index.checkpoints) == [0, 20]
+        assert index.line_start(mm, 30) is None
+        assert index.total_lines == 25
+
+
+def test_read_lines_after_reading_to_end(tmp_path):
+    """测试一次读到末尾后，再跳转到之前未扫描过的检查点之后的行"""
+    path = tmp_path / "a.log"
+    path.write_bytes(b"".join(b"line %d\n" % i for i in range(1500)))
+
+    chunk = read_lines(str(path), 0, 2000, 10 ** 7)
+    assert len(chunk.lines) == 1500
+    assert chunk.total_lines == 1500
+
+    chunk = read_lines(str(path), 1200, 5, 10 ** 7)
+    assert chunk.lines == [b"line %d" % i for i in range(1200, 1205)]
+    assert chunk.total_lines == 1500
@@ -1,9 +1,23 @@
 """
 OpenCode Sidecar测试
 """
+import asyncio
+import os
+import sys
+
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from app.utils.opencode_sidecar import OpenCodeSidecar
+from app.utils.opencode_sidecar import (
+    OpenCodeSidecar,
+    OpenCodeProcessPool,
+    OpenCodeExecutionError
+)
+
+# 协议参考实现
+WORKER_COMMAND = [
+    sys.executable,
+    os.path.join(os.path.dirname(__file__), "fixtures", "opencode_pool_worker.py")
+]
 
 
 @pytest.mark.asyncio
@@ -91,3 +105,235 @@ async def test_opencode_sidecar_health_check():
         
         # 验证结果
         assert is_healthy is True
+
+
+def _make_pool_proc(lines):
+    """创建模拟的常驻worker进程"""
+    proc = MagicMock()
+    proc.pid = 1234
+    proc.returncode = None
+    proc.stdin = MagicMock()
+    proc.stdin.drain = AsyncMock()
+    proc.stdout = MagicMock()
+    proc.stdout.readline = AsyncMock(side_effect=lines)
+    proc.wait = AsyncMock(return_value=0)
+    return proc
+
+
+@pytest.mark.asyncio
+async def test_opencode_pool_reuses_worker():
+    """测试进程池复用常驻worker"""
+    pool = OpenCodeProcessPool(WORKER_COMMAND, size=1, max_uses=10)
+    sidecar = OpenCodeSidecar(pool=pool)
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        mock_proc = _make_pool_proc([
+            b'{"type": "chunk", "content": "Hello "}\n',
+            b'{"type": "chunk", "content": "world"}\n',
+            b'{"type": "done"}\n',
+            b'{"type": "done"}\n',
+        ])
+        mock_exec.return_value = mock_proc
+
+        first = await sidecar.execute("Hello", "test-session", "test-user")
+        second = await sidecar.execute("Again", "test-session", "test-user")
+
+        assert first == {"success": True, "output": "Hello world", "error": None}
+        assert second["success"] is True
+        # 两次请求只启动了一个进程
+        assert mock_exec.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_opencode_pool_recycles_after_max_uses():
+    """测试worker达到最大使用次数后被回收"""
+    pool = OpenCodeProcessPool(WORKER_COMMAND, size=1, max_uses=1)
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        mock_exec.side_effect = [
+            _make_pool_proc([b'{"type": "done"}\n']),
+            _make_pool_proc([b'{"type": "done"}\n']),
+            _make_pool_proc([]),
+        ]
+
+        await pool.execute("one", "test-session", "test-user")
+        await pool.execute("two", "test-session", "test-user")
+
+        # 每次使用后回收并补充新worker
+        assert mock_exec.call_count == 3
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_opencode_pool_worker_crash():
+    """测试worker崩溃时返回错误并回收"""
+    pool = OpenCodeProcessPool(WORKER_COMMAND, size=1)
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        crashed = _make_pool_proc([b""])
+        mock_exec.side_effect = [crashed, _make_pool_proc([])]
+
+        result = await pool.execute("Hello", "test-session", "test-user")
+
+        assert result['success'] is False
+        assert result['error'] == "Worker exited unexpectedly"
+        crashed.kill.assert_called_once()
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_opencode_pool_invalid_worker_output():
+    """测试worker输出非协议行时返回执行错误并回收worker"""
+    pool = OpenCodeProcessPool(WORKER_COMMAND, size=1)
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        broken = _make_pool_proc([b"not json\n"])
+        mock_exec.side_effect = [broken, _make_pool_proc([])]
+
+        with pytest.raises(OpenCodeExecutionError, match="Invalid worker output"):
+            async for _ in pool.stream("Hello", "test-session", "test-user"):
+                pass
+
+        broken.kill.assert_called_once()
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_opencode_pool_respawn_failure_wakes_waiter():
+    """测试回收worker后重建失败时，等待中的请求自己启动worker而不是一直等待"""
+    pool = OpenCodeProcessPool(WORKER_COMMAND, size=1)
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        mock_exec.side_effect = [
+            _make_pool_proc([]),
+            OSError("spawn failed"),
+            _make_pool_proc([b'{"type": "done"}\n']),
+        ]
+        worker = await pool.acquire()
+        waiter = asyncio.ensure_future(pool.execute("Hello", "test-session", "test-user"))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        await pool.release(worker, healthy=False)
+        result = await asyncio.wait_for(waiter, timeout=1)
+
+        assert result["success"] is True
+        assert mock_exec.call_count == 3
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_opencode_pool_close_wakes_waiters():
+    """测试关闭进程池时等待中的请求立即失败"""
+    pool = OpenCodeProcessPool(WORKER_COMMAND, size=1)
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        proc = _make_pool_proc([])
+        mock_exec.return_value = proc
+        worker = await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+
+        await pool.close()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(waiter, timeout=1)
+
+        # 使用中的worker归还时终止，不再补充
+        await pool.release(worker)
+        proc.kill.assert_called_once()
+        assert mock_exec.call_count == 1
+
+
+def _make_stream_proc(chunks, returncode=0, stderr=b""):
+    """创建按块输出stdout的模拟进程"""
+    proc = MagicMock()
+    proc.returncode = returncode
+    proc.stdout = MagicMock()
+    proc.stdout.read = AsyncMock(side_effect=list(chunks) + [b""])
+    proc.stderr = MagicMock()
+    proc.stderr.read = AsyncMock(return_value=stderr)
+    proc.wait = AsyncMock(return_value=returncode)
+    return proc
+
+
+@pytest.mark.asyncio
+async def test_opencode_sidecar_stream_split_utf8():
+    """测试流式输出正确解码跨块的多字节UTF-8字符"""
+    sidecar = OpenCodeSidecar()
+    data = "你好, world".encode("utf-8")
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        # 在“好”字的中间切分
+        mock_exec.return_value = _make_stream_proc([data[:4], data[4:8], data[8:]])
+
+        chunks = [
+            chunk async for chunk in sidecar.execute_stream("Hello", "test-session", "test-user")
+        ]
+
+        assert "".join(chunks) == "你好, world"
+        assert all("�" not in chunk for chunk in chunks)
+
+
+@pytest.mark.asyncio
+async def test_opencode_sidecar_stream_failure():
+    """测试流式输出在进程失败时抛出异常"""
+    sidecar = OpenCodeSidecar()
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        mock_exec.return_value = _make_stream_proc([b"partial"], returncode=1, stderr=b"Error output")
+
+        chunks = []
+        with pytest.raises(OpenCodeExecutionError, match="Error output"):
+            async for chunk in sidecar.execute_stream("Hello", "test-session", "test-user"):
+                chunks.append(chunk)
+
+        assert chunks == ["partial"]
+
+
+@pytest.mark.asyncio
+async def test_opencode_pool_stream():
+    """测试进程池模式的流式输出"""
+    sidecar = OpenCodeSidecar(pool=OpenCodeProcessPool(WORKER_COMMAND, size=1))
+
+    with patch('asyncio.create_subprocess_exec') as mock_exec:
+        mock_exec.return_value = _make_pool_proc([
+            '{"type": "chunk", "content": "你"}\n'.encode("utf-8"),
+            '{"type": "chunk", "content": "好"}\n'.encode("utf-8"),
+            b'{"type": "done"}\n',
+        ])
+
+        chunks = [
+            chunk async for chunk in sidecar.execute_stream("Hello", "test-session", "test-user")
+        ]
+
+        assert chunks == ["你", "好"]
+
+
+@pytest.mark.asyncio
+async def test_opencode_pool_worker_protocol():
+    """测试进程池与真实子进程按协议约定交互"""
+    pool = OpenCodeProcessPool(WORKER_COMMAND, size=1, max_uses=10)
+    try:
+        result = await pool.execute("Hello pool world", "test-session", "test-user", timeout=10)
+        assert result == {"success": True, "output": "Hellopoolworld", "error": None}
+
+        chunks = [chunk async for chunk in pool.stream("你 好", "test-session", "test-user", timeout=10)]
+        assert chunks == ["你", "好"]
+
+        failed = await pool.execute("fail", "test-session", "test-user", timeout=10)
+        assert failed["success"] is False
+        assert failed["error"] == "requested failure"
+
+        # worker退出后被丢弃并重建
+        exited = await pool.execute("exit", "test-session", "test-user", timeout=10)
+        assert exited["success"] is False
+        result = await pool.execute("again", "test-session", "test-user", timeout=10)
+        assert result["output"] == "again"
+    finally:
+        await pool.close()
+
+
+def test_opencode_pool_requires_worker_command():
+    """测试进程池必须显式配置worker命令"""
+    with pytest.raises(ValueError):
+        OpenCodeProcessPool([])
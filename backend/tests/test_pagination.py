@@ -0,0 +1,26 @@
+"""
+游标分页测试
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.pagination import encode_cursor, decode_cursor
+
+
+def test_cursor_roundtrip():
+    """测试游标编码后可还原"""
+    created_at = datetime(2024, 1, 15, 10, 30, 45, 123456)
+    cursor = encode_cursor(created_at, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+def test_invalid_cursor():
+    """测试无效游标返回400"""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor")
+
+    assert exc_info.value.status_code == 400
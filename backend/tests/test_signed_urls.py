@@ -0,0 +1,44 @@
+"""
+下载签名URL测试
+"""
+import pytest
+
+from app.utils import signed_urls
+from app.utils.signed_urls import InvalidSignedURL, create_download_token, verify_download_token
+
+
+def test_signed_url_roundtrip():
+    """测试签名令牌生成和校验"""
+    token, expires_at = create_download_token({"k": "blobs/aa/bb/x", "n": "报告.pdf"}, 60)
+
+    claims = verify_download_token(token)
+    assert claims["k"] == "blobs/aa/bb/x"
+    assert claims["n"] == "报告.pdf"
+    assert claims["exp"] == expires_at
+
+
+def test_signed_url_tampered():
+    """测试篡改载荷或签名"""
+    token, _ = create_download_token({"k": "blobs/aa/bb/x"}, 60)
+    other, _ = create_download_token({"k": "blobs/cc/dd/y"}, 60)
+    payload, _, signature = token.partition(".")
+
+    with pytest.raises(InvalidSignedURL):
+        verify_download_token(f"{other.partition('.')[0]}.{signature}")
+    with pytest.raises(InvalidSignedURL):
+        verify_download_token(payload)
+    with pytest.raises(InvalidSignedURL):
+        verify_download_token("not-a-token")
+    with pytest.raises(InvalidSignedURL):
+        verify_download_token(f"{payload}.é")
+    with pytest.raises(InvalidSignedURL):
+        verify_download_token(f"é.{signature}")
+
+
+def test_signed_url_expired(monkeypatch):
+    """测试过期令牌"""
+    token, expires_at = create_download_token({"k": "x"}, 60)
+    monkeypatch.setattr(signed_urls.time, "time", lambda: expires_at + 1)
+
+    with pytest.raises(InvalidSignedURL):
+        verify_download_token(token)
@@ -0,0 +1,75 @@
+"""
+技能目录缓存合并测试
+"""
+import random
+
+import pytest
+
+from app.utils import skill_cache
+from app.utils.skill_cache import CATALOG_PAGE_SIZE, get_public_window, merge_page, page_key
+
+
+def _items(ids):
+    return [{"key": [0.0, f"2026-01-01T00:00:{i:02d}", i], "data": {"id": i}} for i in ids]
+
+
+def test_page_key():
+    """测试参数顺序不影响缓存键，版本号变化时键变化"""
+    assert page_key(1, {"a": 1, "b": None}) == page_key(1, {"b": None, "a": 1})
+    assert page_key(1, {"a": 1}) != page_key(2, {"a": 1})
+
+
+def test_merge_page_matches_full_merge():
+    """测试只用公开技能窗口合并的结果与完整合并后切片一致"""
+    rng = random.Random(7)
+    for _ in range(200):
+        ids = rng.sample(range(60), rng.randint(0, 40))
+        private_ids = set(rng.sample(ids, rng.randint(0, len(ids)))) if ids else set()
+        public = sorted(_items([i for i in ids if i not in private_ids]), key=lambda x: x["key"], reverse=True)
+        private = sorted(_items(private_ids), key=lambda x: x["key"], reverse=True)
+        merged = sorted(public + private, key=lambda x: x["key"], reverse=True)
+
+        offset = rng.randint(0, 45)
+        limit = rng.randint(1, 10)
+        private_head = private[:offset + limit]
+        start = max(0, offset - len(private_head))
+        window = public[start:offset + limit]
+
+        result = merge_page(window, start, private_head, offset, limit)
+        assert result == merged[offset:offset + limit]
+
+
+class FakeRedis:
+    """只实现目录缓存用到的命令"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def hincrby(self, key, field, amount):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_public_window_shares_pages(monkeypatch):
+    """测试不同起点的窗口从同一批固定大小的缓存页中截取"""
+    redis = FakeRedis()
+    monkeypatch.setattr(skill_cache, "get_redis", lambda: redis)
+    public = _items(range(CATALOG_PAGE_SIZE + 30))
+    fetched = []
+
+    async def fetch_page(start, size):
+        fetched.append(start)
+        return public[start:start + size]
+
+    filters = {"search": None}
+    assert await get_public_window(filters, 90, 121, fetch_page) == public[90:121]
+    assert await get_public_window(filters, 95, 116, fetch_page) == public[95:116]
+    assert await get_public_window(filters, 120, 200, fetch_page) == public[120:]
+    # 每页只查询一次
+    assert fetched == [0, CATALOG_PAGE_SIZE]
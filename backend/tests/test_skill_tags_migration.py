@@ -0,0 +1,47 @@
+"""
+skill_tags 迁移回填测试
+"""
+import importlib.util
+from pathlib import Path
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, insert, text
+
+from app.database import Base
+from app.models.skill import Skill
+from app.models.user import User
+
+MIGRATION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "012_skill_tags.py"
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location("migration_012", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_backfill_from_json_tags():
+    """测试回填去除空白和重复、忽略空标签和非数组的 tags"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Skill.__table__])
+
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": 1, "email": "a@example.com", "username": "a", "hashed_password": "x"}
+        ])
+        conn.execute(insert(Skill.__table__), [
+            {"id": 1, "user_id": 1, "name": "a", "slug": "a", "prompt_template": "p",
+             "tags": [" x ", "x", "y", "  "]},
+            {"id": 2, "user_id": 1, "name": "b", "slug": "b", "prompt_template": "p",
+             "tags": {"not": "a list"}},
+            {"id": 3, "user_id": 1, "name": "c", "slug": "c", "prompt_template": "p", "tags": None},
+        ])
+
+        with Operations.context(MigrationContext.configure(conn)):
+            _load_migration().upgrade()
+
+        rows = conn.execute(text("SELECT skill_id, tag FROM skill_tags ORDER BY skill_id, tag")).all()
+
+    assert [tuple(row) for row in rows] == [(1, "x"), (1, "y")]
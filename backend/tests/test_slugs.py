@@ -0,0 +1,74 @@
+"""
+slug分配测试
+"""
+from sqlalchemy import String
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from app.utils import slugs
+from app.utils.slugs import allocate_slug, assign_unique_slug, base_slug
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class _Item(_Base):
+    __tablename__ = "items"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(100))
+    slug: Mapped[str] = mapped_column(String(100), unique=True, nullable=True)
+
+
+async def _session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(_Base.metadata.create_all)
+    return async_sessionmaker(engine, expire_on_commit=False)()
+
+
+def test_base_slug():
+    """测试非ASCII名称转写，无法生成时使用默认值"""
+    assert base_slug("Code Review!", "skill") == "code-review"
+    assert base_slug("代码", "skill") == "dai-ma"
+    assert base_slug("!!!", "skill") == "skill"
+
+
+async def test_allocate_slug():
+    """测试一次查询找到下一个空闲序号，忽略非数字后缀"""
+    db = await _session()
+    db.add_all([
+        _Item(name="a", slug="review"),
+        _Item(name="b", slug="review-2"),
+        _Item(name="c", slug="review-tool"),
+    ])
+    await db.commit()
+
+    assert await allocate_slug(db, _Item, "review") == "review-3"
+    assert await allocate_slug(db, _Item, "other") == "other"
+    assert await allocate_slug(db, _Item, "review-2", exclude_id=2) == "review-2"
+    await db.close()
+
+
+async def test_assign_unique_slug_retries_on_conflict(monkeypatch):
+    """测试分配后发生唯一约束冲突时重新分配"""
+    db = await _session()
+    db.add(_Item(name="a", slug="review"))
+    await db.commit()
+
+    # 模拟并发：第一次分配的结果已被占用
+    calls = []
+
+    async def stale_allocate(session, model, base, exclude_id=None):
+        calls.append(base)
+        if len(calls) == 1:
+            return "review"
+        return await allocate_slug(session, model, base, exclude_id)
+
+    monkeypatch.setattr(slugs, "allocate_slug", stale_allocate)
+    item = _Item(name="Review")
+    assert await assign_unique_slug(db, item, "Review", "item") == "review-1"
+    await db.commit()
+    assert len(calls) == 2
+    await db.close()
@@ -0,0 +1,89 @@
+"""
+存储后端测试
+"""
+import pytest
+
+from app.core.storage import LocalStorage, S3Storage
+
+
+async def _stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _read(storage, key, start=0, end=None) -> bytes:
+    return b"".join([block async for block in storage.open_range(key, start, end)])
+
+
+async def _exercise(storage, tmp_path):
+    """两种后端共用的读写流程"""
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"0123456789")
+
+    await storage.put_file("blobs/aa/bb/obj", str(source))
+    assert not source.exists()
+    stored = await storage.stat("blobs/aa/bb/obj")
+    assert stored.size == 10
+    assert await _read(storage, "blobs/aa/bb/obj") == b"0123456789"
+    assert await _read(storage, "blobs/aa/bb/obj", 2, 5) == b"2345"
+
+    written = await storage.put_stream("streamed", _stream(b"abc", b"def"))
+    assert written == 6
+    assert await _read(storage, "streamed") == b"abcdef"
+
+    listed = [obj async for obj in storage.list_keys("blobs/aa/")]
+    assert [(obj.key, obj.size) for obj in listed] == [("blobs/aa/bb/obj", 10)]
+
+    await storage.delete("blobs/aa/bb/obj")
+    assert await storage.stat("blobs/aa/bb/obj") is None
+    # 删除不存在的对象不报错
+    await storage.delete("blobs/aa/bb/obj")
+
+
+@pytest.mark.asyncio
+async def test_local_storage(tmp_path):
+    """测试本地磁盘存储"""
+    storage = LocalStorage(str(tmp_path / "root"))
+    await _exercise(storage, tmp_path)
+    assert storage.local_path("streamed") == str(tmp_path / "root" / "streamed")
+
+    with pytest.raises(ValueError):
+        storage.local_path("../escape")
+
+    # 历史记录中的绝对路径只允许位于根目录下
+    legacy = str(tmp_path / "root" / "1" / "legacy.txt")
+    assert storage.local_path(legacy) == legacy
+    outside_paths = (
+        str(tmp_path / "outside.txt"),
+        str(tmp_path / "root" / ".." / "outside.txt"),
+        "/etc/passwd",
+    )
+    for outside in outside_paths:
+        with pytest.raises(ValueError):
+            storage.local_path(outside)
+    with pytest.raises(ValueError):
+        await storage.delete(str(tmp_path / "outside.txt"))
+
+
+@pytest.mark.asyncio
+async def test_s3_storage(tmp_path, monkeypatch):
+    """测试S3存储（moto模拟的S3服务）"""
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+    with moto.mock_aws():
+        storage = S3Storage(bucket="test-bucket", region="us-east-1", prefix="files")
+        storage.client.create_bucket(Bucket="test-bucket")
+        await _exercise(storage, tmp_path)
+
+        # 超过分段大小的流式写入走多段上传
+        part = b"x" * S3Storage.MIN_PART_SIZE
+        written = await storage.put_stream("large", _stream(part, part, b"tail"))
+        assert written == 2 * len(part) + 4
+        assert (await storage.stat("large")).size == written
+        assert await _read(storage, "large", written - 4) == b"tail"
+
+        # 空对象可以整体读取
+        assert await storage.put_stream("empty", _stream()) == 0
+        assert await _read(storage, "empty") == b""
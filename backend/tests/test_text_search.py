@@ -0,0 +1,82 @@
+"""
+文本搜索条件测试（SQLite退化路径）
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, literal_column, select
+from sqlalchemy.dialects import postgresql
+
+from app.utils.text_search import escape_like, trigram_match, prefix_tsquery, fulltext_match
+
+metadata = MetaData()
+files = Table(
+    "files",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("filename", String(255)),
+)
+
+
+def _search(engine, term, fuzzy=False):
+    condition, rank = trigram_match(files.c.filename, term, engine.dialect.name, fuzzy=fuzzy)
+    query = select(files.c.filename).where(condition)
+    if rank is not None:
+        query = query.order_by(rank.desc())
+    query = query.order_by(files.c.id)
+    with engine.connect() as conn:
+        return [row.filename for row in conn.execute(query)]
+
+
+def test_escape_like():
+    """测试LIKE通配符转义"""
+    assert escape_like("100%_a\\b") == "100\\%\\_a\\\\b"
+
+
+def test_trigram_match_sqlite():
+    """测试子串匹配不区分大小写、通配符按字面匹配、模糊模式前缀优先"""
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(files.insert(), [
+            {"id": 1, "filename": "old_Report.pdf"},
+            {"id": 2, "filename": "report-2026.csv"},
+            {"id": 3, "filename": "notes.txt"},
+            {"id": 4, "filename": "100%.txt"},
+        ])
+
+    assert _search(engine, "REPORT") == ["old_Report.pdf", "report-2026.csv"]
+    assert _search(engine, "%") == ["100%.txt"]
+    assert _search(engine, "report", fuzzy=True) == ["report-2026.csv", "old_Report.pdf"]
+
+
+def test_trigram_match_postgresql():
+    """测试PostgreSQL模糊模式使用 word_similarity"""
+    condition, rank = trigram_match(files.c.filename, "reprot", "postgresql", fuzzy=True)
+    sql = str(condition.compile(dialect=postgresql.dialect()))
+    assert "<%" in sql and "ILIKE" in sql
+    assert "word_similarity" in str(rank.compile(dialect=postgresql.dialect()))
+
+
+def test_prefix_tsquery():
+    """测试用户输入转换为前缀匹配的 tsquery，运算符被忽略"""
+    assert prefix_tsquery("open code") == "open:* & code:*"
+    assert prefix_tsquery("a & (b | !c):") == "a:* & b:* & c:*"
+    assert prefix_tsquery(" & | ") is None
+
+
+def test_fulltext_match():
+    """测试PostgreSQL使用 tsvector 检索，SQLite按列权重排序"""
+    vector = literal_column("files.search_vector")
+    condition, rank = fulltext_match(vector, [files.c.filename], "rep", "postgresql")
+    assert "@@ to_tsquery" in str(condition.compile(dialect=postgresql.dialect()))
+    assert "ts_rank_cd" in str(rank.compile(dialect=postgresql.dialect()))
+
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(files.insert(), [
+            {"id": 1, "filename": "notes.txt"},
+            {"id": 2, "filename": "Report.pdf"},
+        ])
+    condition, rank = fulltext_match(vector, [files.c.filename], "REP", "sqlite")
+    with engine.connect() as conn:
+        rows = conn.execute(select(files.c.filename).where(condition).order_by(rank.desc()))
+        assert [row.filename for row in rows] == ["Report.pdf"]
@@ -0,0 +1,65 @@
+"""
+流式ZIP打包测试
+"""
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from app.utils.zip_stream import ZipEntry, stream_zip, unique_names, safe_entry_name
+
+
+def test_unique_names():
+    """测试重复文件名加序号"""
+    assert list(unique_names(["a.txt", "b.txt", "a.txt", "a.txt"])) == [
+        "a.txt", "b.txt", "a (1).txt", "a (2).txt"
+    ]
+
+
+def test_unique_names_strip_paths():
+    """测试条目名不含路径（防止 zip-slip），清理后再去重"""
+    assert safe_entry_name("../../etc/passwd") == "passwd"
+    assert safe_entry_name("/abs/a.txt") == "a.txt"
+    assert safe_entry_name("..\\..\\evil.bat") == "evil.bat"
+    assert safe_entry_name("..") == "file"
+    assert safe_entry_name("dir/") == "file"
+    assert safe_entry_name("a\x00b.txt") == "ab.txt"
+    assert list(unique_names(["x/a.txt", "y/a.txt", "a.txt"])) == [
+        "a.txt", "a (1).txt", "a (2).txt"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_zip():
+    """测试流式生成的ZIP可以正常解压，读取失败的文件被跳过"""
+    contents = {
+        "k1": [b"hello ", b"world"],
+        "k2": [b"\x89PNG" * 100],
+        "k3": [],
+    }
+
+    async def open_stream(key):
+        if key not in contents:
+            raise FileNotFoundError(key)
+        for chunk in contents[key]:
+            yield chunk
+
+    now = datetime(2026, 1, 2, 3, 4, 5)
+    entries = [
+        ZipEntry("a.txt", "k1", 11, now, "text/plain"),
+        ZipEntry("b.png", "k2", 400, now, "image/png"),
+        ZipEntry("missing.txt", "gone", 1, now, "text/plain"),
+        ZipEntry("empty.txt", "k3", 0, now, "text/plain"),
+    ]
+
+    data = b"".join([chunk async for chunk in stream_zip(entries, open_stream)])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.namelist() == ["a.txt", "b.png", "empty.txt"]
+        assert archive.read("a.txt") == b"hello world"
+        assert archive.read("b.png") == b"\x89PNG" * 100
+        assert archive.read("empty.txt") == b""
+        assert archive.getinfo("a.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("b.png").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("a.txt").date_time == (2026, 1, 2, 3, 4, 4)
@@ -36,7 +36,7 @@ export default function SessionSidebar() {
 
     try {
       const response = await client.post('/sessions', {
-        context: { title: newSessionTitle }
+        title: newSessionTitle
       })
       addSession(response.data)
       setCurrentSession(response.data)
@@ -93,7 +93,7 @@ export default function SessionSidebar() {
                 <div className="session-info">
                   <MessageOutlined className="session-icon" />
                   <div className="session-title">
-                    {session.context?.title || '未命名会话'}
+                    {session.title || '未命名会话'}
                   </div>
                 </div>
                 <Button
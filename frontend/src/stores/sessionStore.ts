@@ -2,9 +2,12 @@ import { create } from 'zustand'
 
 export interface Session {
   id: string
-  user_id: string
-  messages: any[]
-  context: any
+  title?: string | null
+  status?: string
+  total_messages?: number
+  total_tokens?: number
+  user_id?: string
+  context?: any
   created_at: string
   updated_at: string
 }